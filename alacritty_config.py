@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
 
-import tomllib
+import os
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional
+
+# Alacritty stops following nested imports this deep
+IMPORT_RECURSION_LIMIT = 5
 
 
 class AlacrittyTheme:
@@ -27,20 +30,106 @@ class AlacrittyTheme:
         self.bright_magenta = "#ad7fa8"
         self.bright_cyan = "#34e2e2"
         self.bright_white = "#eeeeec"
+        # The config file and every import that was read or is missing
+        self.sources = []
+        # "color:factor" -> lightened color, see lighten_color
+        self.shades = {}
+
+    def shade(self, hex_color: str, factor: float) -> str:
+        key = f"{hex_color}:{factor}"
+        color = self.shades.get(key)
+        if color is None:
+            color = self.shades[key] = lighten_color(hex_color, factor)
+        return color
+
+
+def lighten_color(hex_color: str, factor: float) -> str:
+    hex_color = hex_color.lstrip('#')
+    r = int(hex_color[0:2], 16)
+    g = int(hex_color[2:4], 16)
+    b = int(hex_color[4:6], 16)
+
+    r = min(255, int(r + (255 - r) * factor))
+    g = min(255, int(g + (255 - g) * factor))
+    b = min(255, int(b + (255 - b) * factor))
+
+    return f'#{r:02x}{g:02x}{b:02x}'
+
+
+def default_alacritty_path() -> Path:
+    return Path.home() / ".config" / "alacritty" / "alacritty.toml"
+
+
+def load_import_chain(config_path: Path, sources: List[Path], stack: List[Path] = None) -> dict:
+    """Load a config file merged over everything it imports.
+
+    Like Alacritty, imports are applied in order with the importing file
+    last, so later files override earlier ones; missing imports are skipped.
+    Imports already being loaded further up the chain are skipped as cycles.
+    Every import that was read is appended to sources, and so is every
+    missing one, so that creating it later is noticed.
+    """
+    # Only needed when the compiled theme is stale
+    import tomllib
+
+    stack = stack or []
+    with open(config_path, 'rb') as f:
+        config = tomllib.load(f)
+
+    general = config.get('general')
+    imports = general.get('import') if isinstance(general, dict) else None
+    if imports is None:
+        # Before Alacritty 0.14 imports lived at the top level
+        imports = config.get('import', [])
+
+    merged = {}
+    if len(stack) < IMPORT_RECURSION_LIMIT:
+        stack = stack + [config_path]
+        for entry in imports if isinstance(imports, list) else []:
+            path = Path(os.path.expanduser(str(entry)))
+            if not path.is_absolute():
+                path = config_path.parent / path
+            path = path.resolve()
+            if path in stack:
+                continue
+            if not path.is_file():
+                if not path.exists() and path not in sources:
+                    sources.append(path)
+                continue
+            try:
+                merge_tables(merged, load_import_chain(path, sources, stack))
+            except (OSError, tomllib.TOMLDecodeError):
+                # A broken import is skipped, as Alacritty does
+                continue
+            if path not in sources:
+                sources.append(path)
+
+    merge_tables(merged, config)
+    return merged
+
+
+def merge_tables(base: dict, override: dict) -> dict:
+    """Recursively merge override into base, replacing non-table values."""
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            merge_tables(base[key], value)
+        else:
+            base[key] = value
+    return base
 
 
 def parse_alacritty_config(config_path: Optional[Path] = None) -> AlacrittyTheme:
     theme = AlacrittyTheme()
 
     if config_path is None:
-        config_path = Path.home() / ".config" / "alacritty" / "alacritty.toml"
+        config_path = default_alacritty_path()
+    theme.sources = [config_path]
 
     if not config_path.exists():
         return theme
 
     try:
-        with open(config_path, 'rb') as f:
-            config = tomllib.load(f)
+        config = load_import_chain(config_path.resolve(), theme.sources)
 
         if 'colors' in config:
             colors = config['colors']
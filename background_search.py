@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+import re
+import threading
+from typing import Callable
+
+from search_index import SearchIndex, SearchResult
+
+
+class BackgroundSearch:
+    """Debounced search on a worker thread, applied back on the Tk thread.
+
+    Every submit() supersedes the previous query: its debounce timer is
+    restarted and any search already running notices the new generation and
+    gives up. The worker only ever sees the immutable SearchIndex snapshot it
+    was handed; results are collected by polling with after(), so the worker
+    never calls into Tk.
+    """
+
+    def __init__(self, root, on_result: Callable, debounce_ms: int = 40, poll_ms: int = 8):
+        self.root = root
+        self.on_result = on_result
+        self.debounce_ms = debounce_ms
+        self.poll_ms = poll_ms
+
+        self.lock = threading.Condition()
+        self.generation = 0
+        self.request = None
+        self.result = None
+        self.thread = None
+
+        # Only touched on the Tk thread
+        self.pending = None
+        self.previous = None
+        self.debounce_id = None
+        self.poll_id = None
+
+    def submit(self, index: SearchIndex, query: str, mode: str):
+        with self.lock:
+            self.generation += 1
+        self.pending = (index, query, mode)
+        if self.debounce_id is not None:
+            self.root.after_cancel(self.debounce_id)
+        self.debounce_id = self.root.after(self.debounce_ms, self.dispatch)
+
+    def dispatch(self):
+        self.debounce_id = None
+        if self.pending is None:
+            return
+
+        index, query, mode = self.pending
+        with self.lock:
+            self.request = (self.generation, index, query, mode, self.previous_for(index))
+            self.lock.notify()
+
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="search", daemon=True)
+            self.thread.start()
+        if self.poll_id is None:
+            self.poll_id = self.root.after(self.poll_ms, self.poll)
+
+    def previous_for(self, index: SearchIndex):
+        # Narrowing is only valid against a result from the same index
+        if self.previous is not None and self.previous[0] is index:
+            return self.previous[1]
+        return None
+
+    def run(self):
+        while True:
+            with self.lock:
+                while self.request is None:
+                    self.lock.wait()
+                generation, index, query, mode, previous = self.request
+                self.request = None
+
+            cancelled = lambda: self.generation != generation
+            error = None
+            try:
+                result = index.search(query, mode, previous, cancelled)
+            except re.error as e:
+                result, error = None, e
+
+            if result is None and error is None:
+                continue
+
+            with self.lock:
+                if generation == self.generation:
+                    self.result = (generation, index, result, error)
+
+    def poll(self):
+        self.poll_id = None
+        with self.lock:
+            completed, self.result = self.result, None
+            generation = self.generation
+
+        if completed is not None and completed[0] == generation:
+            _, index, result, error = completed
+            self.deliver(index, result, error)
+            return
+
+        if self.pending is not None and self.debounce_id is None:
+            self.poll_id = self.root.after(self.poll_ms, self.poll)
+
+    def deliver(self, index: SearchIndex, result: SearchResult, error):
+        self.pending = None
+        if result is not None:
+            self.previous = (index, result)
+        self.on_result(result, error)
+
+    def flush(self):
+        """Finish an outstanding query synchronously, e.g. before n/N."""
+        if self.pending is None:
+            return
+
+        index, query, mode = self.pending
+        self.cancel()
+        error = None
+        try:
+            result = index.search(query, mode, self.previous_for(index))
+        except re.error as e:
+            result, error = None, e
+        self.deliver(index, result, error)
+
+    def cancel(self):
+        with self.lock:
+            self.generation += 1
+            self.request = None
+            self.result = None
+        self.pending = None
+        if self.debounce_id is not None:
+            self.root.after_cancel(self.debounce_id)
+            self.debounce_id = None
+        if self.poll_id is not None:
+            self.root.after_cancel(self.poll_id)
+            self.poll_id = None
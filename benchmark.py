@@ -0,0 +1,563 @@
+#!/usr/bin/env python3
+"""Performance benchmarks for parsing, i3 IPC, layout, search, loading, hover and scrolling.
+
+    ./benchmark.py generate shortcuts.txt --bindings 10000
+    ./benchmark.py run --output baseline.json
+    ./benchmark.py run --baseline baseline.json
+    ./benchmark.py compare baseline.json current.json
+
+The Tk benchmarks need a display; without one a private Xvfb server is
+started if it is installed, otherwise they are skipped.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_SIZES = (100, 1000, 10000, 100000)
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.10
+# Metrics faster than this are too noisy to flag as regressions
+DEFAULT_MIN_MS = 0.05
+RESULTS_VERSION = 1
+
+# Imported by the viewer only when a feature needs them
+DEFERRED_IMPORTS = ('argparse', 'tomllib', 'concurrent.futures', 'difflib', 'tkinter.messagebox',
+                    'ctypes.util')
+
+# Imports listed by the import budget benchmark, besides the viewer's own and the deferred ones
+IMPORT_REPORT_COUNT = 10
+
+# Typed one keystroke at a time by the search benchmarks
+SEARCH_QUERIES = ('firefox', 'workspace 1', 'mod+shift+r')
+
+KEYS = (list("abcdefghijklmnopqrstuvwxyz0123456789") + [f"F{n}" for n in range(1, 13)]
+        + ["Return", "space", "Tab", "Escape", "Left", "Right", "Up", "Down", "Print",
+           "XF86AudioRaiseVolume", "XF86AudioLowerVolume", "XF86AudioMute"])
+MODIFIERS = ("$mod", "$mod+Shift", "$mod+Control", "$mod+Mod1", "Mod4", "Mod1+Control", "Shift", "")
+PROGRAMS = ("firefox", "alacritty", "rofi -show drun", "thunar", "pavucontrol", "i3lock -c 000000",
+            "maim -s ~/shot.png", "playerctl play-pause", "pactl set-sink-volume @DEFAULT_SINK@ +5%",
+            "xdg-open ~/Documents", "code", "emacsclient -c", "brightnessctl set 10%-")
+I3_COMMANDS = ("focus left", "focus right", "move container to workspace number {n}",
+               "workspace number {n}", "fullscreen toggle", "kill", "mode \"resize\"",
+               "layout toggle split", "floating toggle", "split h", "restart", "scratchpad show")
+WORDS = ("--profile", "work", "--new-window", "https://example.org/docs", "-e", "htop", "--class",
+         "floating", "~/scripts/run.sh", "--verbose", "&&", "notify-send", "\"done\"", "|", "tee")
+
+
+def generate_shortcuts(path: Path, bindings: int, groups: Optional[int] = None,
+                       command_length: int = 40, seed: int = 0):
+    """Write a synthetic shortcuts file.
+
+    Commands mix bare i3 commands with exec, exec --no-startup-id, quoted
+    and backgrounded commands, padded with arguments to around
+    command_length characters.
+    """
+    rng = random.Random(seed)
+    groups = groups or max(1, bindings // 20)
+    lines = []
+    group = None
+
+    for i in range(bindings):
+        if i * groups // bindings != group:
+            group = i * groups // bindings
+            lines.append("")
+            lines.append(f"# Group {group} {rng.choice(PROGRAMS).split()[0]}")
+
+        modifier = rng.choice(MODIFIERS)
+        key = rng.choice(KEYS)
+        keybinding = f"{modifier}+{key}" if modifier else key
+
+        if rng.random() < 0.25:
+            lines.append(f"bindsym {keybinding} {rng.choice(I3_COMMANDS).format(n=rng.randint(1, 10))}")
+            continue
+
+        command = rng.choice(PROGRAMS)
+        target = max(1, int(command_length * rng.uniform(0.5, 1.5)))
+        while len(command) < target:
+            command += " " + rng.choice(WORDS)
+
+        style = rng.random()
+        if style < 0.4:
+            lines.append(f"bindsym {keybinding} exec --no-startup-id {command}")
+        elif style < 0.6:
+            lines.append(f"bindsym {keybinding} exec \"{command}\"")
+        elif style < 0.8:
+            lines.append(f"bindsym {keybinding} exec {command} &")
+        else:
+            lines.append(f"bindsym {keybinding} exec {command}")
+
+    Path(path).write_text("\n".join(lines) + "\n")
+
+
+def measure(func: Callable, repeat: int, setup: Optional[Callable] = None) -> List[float]:
+    """Seconds taken by each of repeat calls of func, running setup untimed before each."""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize(samples: List[float], items: int = 1) -> dict:
+    ordered = sorted(samples)
+    summary = {
+        'median_ms': statistics.median(ordered) * 1000,
+        'min_ms': ordered[0] * 1000,
+        'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        'max_ms': ordered[-1] * 1000,
+        'runs': len(ordered),
+    }
+    if items > 1:
+        summary['per_item_us'] = summary['median_ms'] * 1000 / items
+    return summary
+
+
+def bench_parsing(results: dict, path: Path, size: int, repeat: int):
+    import parser
+    from document import build_document
+
+    results[f"parse_shortcuts_file/{size}"] = summarize(
+        measure(lambda: parser.parse_shortcuts_file(path), repeat, parser._file_cache.clear), size)
+
+    lines = [line for line in path.read_text().splitlines() if line.startswith('bindsym')]
+    results[f"parse_bindsym_line/{size}"] = summarize(
+        measure(lambda: [parser.parse_bindsym_line(line) for line in lines], repeat), len(lines))
+
+    groups = parser.parse_shortcuts_file(path)
+    results[f"build_document/{size}"] = summarize(
+        measure(lambda: build_document(groups), repeat), size)
+
+
+def bench_ipc(results: dict, workdir: Path, path: Path, size: int, repeat: int):
+    """Fetching and parsing the shortcuts from a mock i3 over IPC."""
+    import parser
+    from i3_ipc import I3Connection, loaded_texts
+    from mock_i3_ipc import MockI3Server
+
+    server = MockI3Server(workdir / "i3-ipc.sock", [path.resolve()]).start()
+    try:
+        connection = I3Connection(server.path)
+
+        def fetch_and_parse():
+            texts = loaded_texts(connection.get_config())
+            parser.parse_shortcuts_file(path, texts)
+
+        results[f"ipc_get_config_parse/{size}"] = summarize(
+            measure(fetch_and_parse, repeat, parser._text_cache.clear), size)
+        connection.close()
+    finally:
+        server.stop()
+
+
+def bench_search(results: dict, path: Path, size: int, repeat: int):
+    import parser
+    from document import build_document
+    from search_index import SearchIndex
+
+    document = build_document(parser.parse_shortcuts_file(path))
+    results[f"search_index_build/{size}"] = summarize(
+        measure(lambda: SearchIndex(document), repeat), size)
+
+    index = SearchIndex(document)
+    for mode in ('substring', 'fuzzy'):
+        keystrokes = []
+        for _ in range(repeat):
+            for query in SEARCH_QUERIES:
+                previous = None
+                for end in range(1, len(query) + 1):
+                    start = time.perf_counter()
+                    previous = index.search(query[:end], mode, previous)
+                    keystrokes.append(time.perf_counter() - start)
+        results[f"search_keystroke_{mode}/{size}"] = summarize(keystrokes)
+
+
+def bench_startup(results: dict, path: Path, size: int, repeat: int):
+    """Process startup of the text output mode, which never imports tkinter."""
+    launcher = Path(__file__).parent.resolve() / "i3-shortcuts-viewer"
+    for fmt in ('plain', 'jsonl'):
+        command = [sys.executable, str(launcher), 'list', '--format', fmt, '--file', str(path)]
+        results[f"startup_cli_list_{fmt}/{size}"] = summarize(
+            measure(lambda: subprocess.run(command, stdout=subprocess.DEVNULL, check=True), repeat))
+
+
+def bench_import_viewer(results: dict, repeat: int):
+    """Lower bound for the GUI path: a fresh interpreter importing the viewer."""
+    command = [sys.executable, '-c', 'import viewer']
+    cwd = Path(__file__).parent.resolve()
+    results["startup_import_viewer"] = summarize(
+        measure(lambda: subprocess.run(command, cwd=cwd, check=True), repeat))
+
+
+def importtime(command: List[str], cwd: Path) -> Dict[str, tuple]:
+    """{module: (self us, cumulative us)} for one run of command under -X importtime."""
+    process = subprocess.run([command[0], '-X', 'importtime'] + command[1:], cwd=cwd,
+                             stderr=subprocess.PIPE, text=True, check=True)
+    modules = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, module = line[len("import time:"):].split("|")
+        modules[module.strip()] = (int(own), int(cumulative))
+    return modules
+
+
+def bench_import_budget(results: dict, workdir: Path, repeat: int):
+    """Importing the viewer from the precompiled bundle, and with the deferred
+    imports pulled in eagerly, next to startup_import_viewer; then the
+    cumulative import time of the viewer's own modules, the deferred ones
+    (zero while they stay deferred) and the slowest others."""
+    import bundle
+
+    cwd = Path(__file__).parent.resolve()
+    archive = workdir / bundle.DEFAULT_OUTPUT
+    bundle.build_bundle(archive, cwd)
+    commands = {
+        'eager': ([sys.executable, '-c', f"import viewer, {', '.join(DEFERRED_IMPORTS)}"], cwd),
+        # Run from workdir so the source tree is not on sys.path
+        'bundle': ([sys.executable, '-c', f"import sys; sys.path.insert(0, {str(archive)!r}); import viewer"],
+                   workdir),
+    }
+    for name, (command, command_cwd) in commands.items():
+        results[f"startup_import_viewer_{name}"] = summarize(
+            measure(lambda: subprocess.run(command, cwd=command_cwd, check=True), repeat))
+
+    runs = [importtime([sys.executable, '-c', 'import viewer'], cwd) for _ in range(repeat)]
+    own = {path.stem for path in cwd.glob("*.py")}
+    slowest = sorted(runs[-1], key=lambda module: runs[-1][module][0], reverse=True)[:IMPORT_REPORT_COUNT]
+    modules = set(DEFERRED_IMPORTS) | set(slowest)
+    modules.update(module for run in runs for module in run if module in own)
+    for module in sorted(modules):
+        results[f"startup_import_module/{module}"] = summarize(
+            [run.get(module, (0, 0))[1] / 1e6 for run in runs])
+
+    print("slowest imports of viewer (self us, cumulative us):", file=sys.stderr)
+    for module in slowest:
+        own_us, cumulative_us = runs[-1][module]
+        print(f"  {own_us:8} {cumulative_us:8}  {module}", file=sys.stderr)
+
+
+class TkEnvironment:
+    """A private HOME, config, cache and state directory holding a generated
+    shortcuts file, so neither the developer's config nor their usage
+    history affects the numbers."""
+
+    def __init__(self, workdir: Path):
+        self.home = workdir / "home"
+        self.cache = workdir / "cache"
+        self.shortcuts = self.home / ".config" / "i3" / "shortcuts"
+        self.shortcuts.parent.mkdir(parents=True, exist_ok=True)
+        os.environ['HOME'] = str(self.home)
+        os.environ['XDG_CONFIG_HOME'] = str(self.home / ".config")
+        os.environ['XDG_CACHE_HOME'] = str(self.cache)
+        os.environ['XDG_STATE_HOME'] = str(workdir / "state")
+        # Where the viewer looks for config.toml; unlike the checkout, it has none
+        self.script_dir = workdir
+
+    def install(self, source: Path):
+        shutil.copyfile(source, self.shortcuts)
+
+    def clear_cache(self):
+        import parser
+        shutil.rmtree(self.cache, ignore_errors=True)
+        parser._file_cache.clear()
+
+
+def pump_until(root, done: Callable[[], bool], timeout: float = 120.0):
+    deadline = time.perf_counter() + timeout
+    while not done() and time.perf_counter() < deadline:
+        root.update()
+
+
+def open_viewer(tk, script_dir: Path):
+    """Return (root, viewer, seconds until the first screen was in the widget)."""
+    from viewer import ShortcutsViewer
+
+    root = tk.Tk()
+    start = time.perf_counter()
+    viewer = ShortcutsViewer(root, script_dir)
+    first_screen = time.perf_counter() - start
+    return root, viewer, first_screen
+
+
+def open_window(tk, script_dir: Path, pipelined: bool) -> float:
+    """Seconds from nothing to the first screen, Tk root included, with or
+    without the startup pipeline reading files while Tk starts."""
+    from startup import StartupPipeline
+    from viewer import ShortcutsViewer
+
+    start = time.perf_counter()
+    pipeline = None
+    if pipelined:
+        pipeline = StartupPipeline(script_dir)
+        pipeline.start()
+    root = tk.Tk()
+    ShortcutsViewer(root, script_dir, pipeline=pipeline)
+    elapsed = time.perf_counter() - start
+    root.destroy()
+    return elapsed
+
+
+def bench_tk(results: dict, env: TkEnvironment, size: int, repeat: int, script_dir: Path):
+    import tkinter as tk
+    from tracing import tracer
+
+    # Windows are created and destroyed without ever settling; don't buffer phases
+    tracer.startup_finished()
+
+    for label, clear in (("cold", True), ("warm", False)):
+        first_screens, completes = [], []
+        for _ in range(repeat):
+            if clear:
+                env.clear_cache()
+            start = time.perf_counter()
+            root, viewer, first_screen = open_viewer(tk, script_dir)
+            pump_until(root, lambda: viewer.stream is None)
+            completes.append(time.perf_counter() - start)
+            first_screens.append(first_screen)
+            root.destroy()
+        results[f"load_shortcuts_first_screen_{label}/{size}"] = summarize(first_screens)
+        results[f"load_shortcuts_complete_{label}/{size}"] = summarize(completes)
+
+    # Warm caches, so the difference is what the overlap with Tk startup saves
+    for label, pipelined in (("sequential", False), ("pipelined", True)):
+        results[f"startup_window_{label}/{size}"] = summarize(
+            [open_window(tk, script_dir, pipelined) for _ in range(repeat)])
+
+    root, viewer, _ = open_viewer(tk, script_dir)
+    pump_until(root, lambda: viewer.stream is None)
+    root.update()
+
+    # Hover: sweep the pointer down the window, one row change per update
+    hover = []
+    height = viewer.text_widget.winfo_height()
+    for _ in range(repeat):
+        for y in range(0, height, 4):
+            viewer.hover_position = (40, y)
+            start = time.perf_counter()
+            viewer.update_hover()
+            root.update_idletasks()
+            hover.append(time.perf_counter() - start)
+    results[f"hover_update/{size}"] = summarize(hover)
+
+    # Search as typed in the search bar, including highlighting
+    viewer.open_search()
+    typed = []
+    for _ in range(repeat):
+        for query in SEARCH_QUERIES:
+            for end in range(1, len(query) + 1):
+                viewer.search_entry.delete(0, tk.END)
+                viewer.search_entry.insert(0, query[:end])
+                start = time.perf_counter()
+                viewer.on_search_change()
+                viewer.background_search.flush()
+                root.update_idletasks()
+                typed.append(time.perf_counter() - start)
+    viewer.close_search()
+    results[f"search_keystroke_tk/{size}"] = summarize(typed)
+
+    # Scroll pacing: page down repeatedly and record animation frame times
+    scroller = viewer.scroller
+    scroller.intervals.clear()
+    work = []
+    frame = scroller.frame
+
+    def timed_frame():
+        start = time.perf_counter()
+        frame()
+        root.update_idletasks()
+        work.append(time.perf_counter() - start)
+
+    scroller.frame = timed_frame
+    for _ in range(repeat):
+        viewer.yview_moveto(0.0)
+        viewer.scroll_page_down()
+        pump_until(root, lambda: not scroller.running, timeout=10.0)
+    if scroller.intervals:
+        results[f"scroll_frame_interval/{size}"] = summarize(list(scroller.intervals))
+        results[f"scroll_frame_work/{size}"] = summarize(work)
+
+    root.destroy()
+
+
+def start_xvfb():
+    """Start a private Xvfb server and point DISPLAY at it; returns the process or None."""
+    if not shutil.which('Xvfb'):
+        return None
+
+    read_fd, write_fd = os.pipe()
+    process = subprocess.Popen(['Xvfb', '-displayfd', str(write_fd), '-screen', '0', '1280x1024x24',
+                                '-nolisten', 'tcp'], pass_fds=(write_fd,),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        display = f.readline().strip()
+    if not display:
+        process.terminate()
+        return None
+
+    os.environ['DISPLAY'] = f":{display}"
+    return process
+
+
+def run_benchmarks(sizes, repeat: int, tk_suite: bool = True, headless: bool = False,
+                   seed: int = 0) -> dict:
+    results = {}
+    skipped = []
+    xvfb = None
+
+    if tk_suite and (headless or not os.environ.get('DISPLAY')):
+        xvfb = start_xvfb()
+        if xvfb is None and not os.environ.get('DISPLAY'):
+            tk_suite = False
+            skipped.append("tk: no display and Xvfb is not installed")
+
+    old_env = {name: os.environ.get(name)
+               for name in ('HOME', 'XDG_CONFIG_HOME', 'XDG_CACHE_HOME', 'XDG_STATE_HOME')}
+    try:
+        with tempfile.TemporaryDirectory(prefix="i3-shortcuts-bench-") as workdir:
+            workdir = Path(workdir)
+            env = TkEnvironment(workdir) if tk_suite else None
+            bench_import_viewer(results, repeat)
+            bench_import_budget(results, workdir, repeat)
+            for size in sizes:
+                path = workdir / f"shortcuts-{size}"
+                generate_shortcuts(path, size, seed=seed)
+                print(f"benchmarking {size} bindings", file=sys.stderr)
+                bench_parsing(results, path, size, repeat)
+                bench_ipc(results, workdir, path, size, repeat)
+                bench_search(results, path, size, repeat)
+                bench_startup(results, path, size, repeat)
+                if env:
+                    env.install(path)
+                    bench_tk(results, env, size, repeat, env.script_dir)
+    finally:
+        for name, value in old_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        if xvfb:
+            xvfb.terminate()
+            xvfb.wait()
+
+    return {
+        'version': RESULTS_VERSION,
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'sizes': list(sizes),
+            'repeat': repeat,
+            'seed': seed,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'skipped': skipped,
+        },
+        'results': results,
+    }
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD,
+                    min_ms: float = DEFAULT_MIN_MS) -> List[tuple]:
+    """Return (name, baseline ms, current ms, ratio, regressed) for metrics in both runs."""
+    rows = []
+    for name, base in baseline['results'].items():
+        now = current['results'].get(name)
+        if now is None:
+            continue
+        base_ms, now_ms = base['median_ms'], now['median_ms']
+        ratio = now_ms / base_ms if base_ms else float('inf')
+        regressed = ratio > 1 + threshold and max(base_ms, now_ms) >= min_ms
+        rows.append((name, base_ms, now_ms, ratio, regressed))
+    return rows
+
+
+def print_results(data: dict):
+    for name, summary in data['results'].items():
+        extra = f"  {summary['per_item_us']:.3f} us/item" if 'per_item_us' in summary else ""
+        print(f"{name:45} {summary['median_ms']:10.3f} ms  p95 {summary['p95_ms']:10.3f} ms{extra}")
+    for reason in data['meta']['skipped']:
+        print(f"skipped {reason}")
+
+
+def print_comparison(rows: List[tuple], threshold: float) -> int:
+    regressions = 0
+    for name, base_ms, now_ms, ratio, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:45} {base_ms:10.3f} -> {now_ms:10.3f} ms  {ratio - 1:+7.1%}{flag}")
+        regressions += regressed
+    print(f"{regressions} regression(s) past {threshold:.0%}")
+    return regressions
+
+
+def load_results(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="i3 shortcuts viewer benchmarks")
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+
+    generate = commands.add_parser('generate', help="write a synthetic shortcuts file")
+    generate.add_argument('output')
+    generate.add_argument('--bindings', type=int, default=1000)
+    generate.add_argument('--groups', type=int, default=None)
+    generate.add_argument('--command-length', type=int, default=40)
+    generate.add_argument('--seed', type=int, default=0)
+
+    run = commands.add_parser('run', help="run the benchmarks")
+    run.add_argument('--sizes', default=",".join(map(str, DEFAULT_SIZES)),
+                     help="comma separated binding counts")
+    run.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--output', help="write results as JSON")
+    run.add_argument('--baseline', help="compare against a previous results file")
+    run.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    run.add_argument('--no-tk', action='store_true', help="skip the benchmarks that need a display")
+    run.add_argument('--headless', action='store_true', help="always run Tk under a private Xvfb")
+
+    compare = commands.add_parser('compare', help="compare two results files")
+    compare.add_argument('baseline')
+    compare.add_argument('current')
+    compare.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    compare.add_argument('--min-ms', type=float, default=DEFAULT_MIN_MS)
+
+    args = arg_parser.parse_args(argv)
+
+    if args.command == 'generate':
+        generate_shortcuts(Path(args.output), args.bindings, args.groups, args.command_length, args.seed)
+        return 0
+
+    if args.command == 'compare':
+        rows = compare_results(load_results(args.baseline), load_results(args.current),
+                               args.threshold, args.min_ms)
+        return 1 if print_comparison(rows, args.threshold) else 0
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    data = run_benchmarks(sizes, args.repeat, tk_suite=not args.no_tk, headless=args.headless,
+                          seed=args.seed)
+    print_results(data)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(data, f, indent=1)
+    if args.baseline:
+        rows = compare_results(load_results(args.baseline), data, args.threshold)
+        return 1 if print_comparison(rows, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Build a single-file zipapp of the viewer with precompiled bytecode.
+
+    ./bundle.py                                   # writes ./i3-shortcuts-viewer.pyz
+    ./bundle.py --output ~/.local/bin/i3-shortcuts-viewer
+
+Every module is stored uncompressed, as its source plus an unchecked
+hash-based .pyc (PEP 552) for the interpreter running this script, so
+zipimport loads the bytecode without compiling or comparing timestamps.
+The sources are only read for tracebacks. A different Python version
+ignores the .pyc files and compiles the sources instead, so rebuild the
+bundle after upgrading Python.
+"""
+
+import argparse
+import importlib.util
+import marshal
+import os
+import sys
+import zipfile
+from pathlib import Path
+
+DEFAULT_OUTPUT = "i3-shortcuts-viewer.pyz"
+INTERPRETER = "/usr/bin/env python3"
+# Development tools that the viewer and the text commands never import
+EXCLUDED = {'benchmark.py', 'bundle.py', 'mock_i3_ipc.py'}
+
+
+def bundle_sources(source_dir: Path) -> dict:
+    """{name in the archive: source text}; the launcher script becomes __main__."""
+    sources = {'__main__.py': (source_dir / "i3-shortcuts-viewer").read_text(encoding='utf-8')}
+    for path in sorted(source_dir.glob("*.py")):
+        if path.name not in EXCLUDED:
+            sources[path.name] = path.read_text(encoding='utf-8')
+    return sources
+
+
+def compile_pyc(source: str, filename: str) -> bytes:
+    """Hash-based .pyc contents that are used without checking the source."""
+    code = compile(source, filename, 'exec', dont_inherit=True)
+    source_hash = importlib.util.source_hash(source.encode('utf-8'))
+    # Flags 0b01: hash-based, check_source unset
+    return importlib.util.MAGIC_NUMBER + (1).to_bytes(4, 'little') + source_hash + marshal.dumps(code)
+
+
+def build_bundle(output: Path, source_dir: Path) -> int:
+    """Write the zipapp to output. Returns the number of modules in it."""
+    sources = bundle_sources(source_dir)
+    tmp_path = output.with_name(f".{output.name}.tmp{os.getpid()}")
+    with open(tmp_path, 'wb') as f:
+        f.write(f"#!{INTERPRETER}\n".encode())
+        with zipfile.ZipFile(f, 'w', zipfile.ZIP_STORED) as archive:
+            for name, source in sources.items():
+                archive.writestr(name, source)
+                # Named as zipimport names the sources it compiles itself
+                archive.writestr(name[:-3] + ".pyc", compile_pyc(source, f"{output}/{name}"))
+    tmp_path.chmod(0o755)
+    os.replace(tmp_path, output)
+    return len(sources)
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Build a precompiled single-file zipapp")
+    arg_parser.add_argument('--output', default=DEFAULT_OUTPUT,
+                            help=f"where to write the bundle (default ./{DEFAULT_OUTPUT})")
+    args = arg_parser.parse_args(argv)
+
+    source_dir = Path(__file__).parent.resolve()
+    output = Path(args.output).expanduser()
+    count = build_bundle(output, source_dir)
+    print(f"{output}: {count} modules, Python {sys.version_info.major}.{sys.version_info.minor} bytecode")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
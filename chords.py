@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""Keybindings normalized to chords: an X modifier mask and a keysym.
+
+"$mod+Shift+Q", "Shift+Mod4+q" and a Tk key event for Super+Shift+q all
+become (0x41, "q"), so a chord can be looked up in one dict access and
+different spellings of the same binding are recognised as duplicates.
+"""
+
+import os
+from bisect import bisect_right
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from parser import DEFAULT_MODE
+
+# X11 modifier masks; Tk's event.state uses the same bits on X11
+SHIFT = 0x01
+LOCK = 0x02
+CONTROL = 0x04
+MOD1 = 0x08
+MOD2 = 0x10
+MOD3 = 0x20
+MOD4 = 0x40
+MOD5 = 0x80
+MODIFIER_MASK = 0xFF
+
+MODIFIERS = {
+    'shift': SHIFT,
+    'lock': LOCK,
+    'control': CONTROL,
+    'ctrl': CONTROL,
+    'mod1': MOD1,
+    'alt': MOD1,
+    'mod2': MOD2,
+    'mod3': MOD3,
+    'mod4': MOD4,
+    'super': MOD4,
+    'mod5': MOD5,
+}
+
+# Names used when printing a chord, in i3's usual order
+MODIFIER_NAMES = [(MOD4, 'Mod4'), (MOD1, 'Mod1'), (MOD3, 'Mod3'), (MOD5, 'Mod5'),
+                  (CONTROL, 'Control'), (SHIFT, 'Shift'), (MOD2, 'Mod2'), (LOCK, 'Lock')]
+
+# i3 matches bindings regardless of Caps Lock and Num Lock
+IGNORED_MODIFIERS = LOCK | MOD2
+
+# Used when the i3 config doesn't set these
+DEFAULT_VARIABLES = {'$mod': 'Mod4'}
+
+# Keysyms that only exist as a modifier; pressing one doesn't complete a chord
+MODIFIER_KEYSYMS = {
+    'shift_l', 'shift_r', 'control_l', 'control_r', 'alt_l', 'alt_r', 'meta_l', 'meta_r',
+    'super_l', 'super_r', 'hyper_l', 'hyper_r', 'caps_lock', 'num_lock', 'iso_level3_shift',
+    'mode_switch',
+}
+
+# Shift changes the keysym X reports; i3 binds "Shift+slash", Tk reports
+# "question". US layout, which is what most configs are written against.
+SHIFTED_KEYSYMS = {
+    'exclam': '1', 'at': '2', 'numbersign': '3', 'dollar': '4', 'percent': '5',
+    'asciicircum': '6', 'ampersand': '7', 'asterisk': '8', 'parenleft': '9', 'parenright': '0',
+    'underscore': 'minus', 'plus': 'equal', 'braceleft': 'bracketleft',
+    'braceright': 'bracketright', 'bar': 'backslash', 'colon': 'semicolon',
+    'quotedbl': 'apostrophe', 'less': 'comma', 'greater': 'period', 'question': 'slash',
+    'asciitilde': 'grave',
+}
+
+Chord = Tuple[int, str]
+# A chord within an i3 binding mode
+ModeChord = Tuple[str, Chord]
+
+
+def i3_config_path() -> Optional[Path]:
+    """The main i3 config, where $mod is usually set."""
+    config_home = Path(os.environ.get('XDG_CONFIG_HOME') or Path.home() / ".config")
+    for path in (config_home / "i3" / "config", Path.home() / ".i3" / "config"):
+        if path.is_file():
+            return path
+    return None
+
+
+def read_variables(lines: Iterable[str]) -> Dict[str, str]:
+    """`set $name value` lines, as {"$name": "value"}."""
+    variables = {}
+    for line in lines:
+        parts = line.split(None, 2)
+        if len(parts) == 3 and parts[0] == 'set' and parts[1].startswith('$'):
+            variables[parts[1]] = parts[2].strip()
+    return variables
+
+
+def load_variables(path: Optional[Path] = None) -> Dict[str, str]:
+    variables = dict(DEFAULT_VARIABLES)
+    path = path or i3_config_path()
+    if path is None:
+        return variables
+    try:
+        with open(path, 'r', errors='replace') as f:
+            variables.update(read_variables(f))
+    except OSError:
+        pass
+    return variables
+
+
+def normalize_keysym(keysym: str) -> str:
+    # X keysym names differ only in case between a letter's two levels,
+    # and i3 configs spell named keys either way ("Return", "return")
+    return keysym.lower()
+
+
+def parse_modifiers(prefix: str, variables: Dict[str, str]) -> Optional[int]:
+    """Mask for a "$mod+Shift+" prefix, or None if it has an unknown modifier."""
+    mask = 0
+    for name in prefix.split('+'):
+        if not name:
+            continue
+        if name.startswith('$'):
+            value = variables.get(name)
+            if value is None or value.startswith('$'):
+                return None
+            inner = parse_modifiers(value, variables)
+            if inner is None:
+                return None
+            mask |= inner
+            continue
+        bit = MODIFIERS.get(name.lower())
+        if bit is None:
+            return None
+        mask |= bit
+    return mask
+
+
+def parse_chord(keybinding: str, variables: Dict[str, str] = DEFAULT_VARIABLES) -> Optional[Chord]:
+    """(mask, keysym) for a bindsym keybinding, or None if it can't be normalized."""
+    split = keybinding.rfind('+', 0, len(keybinding) - 1) + 1
+    return make_chord(parse_modifiers(keybinding[:split], variables), keybinding[split:], variables)
+
+
+def make_chord(mask: Optional[int], key: str, variables: Dict[str, str]) -> Optional[Chord]:
+    if key.startswith('$'):
+        key = variables.get(key, '')
+    # A leading "-" is a bindsym flag such as --release, not a key
+    if mask is None or not key or key.startswith('-'):
+        return None
+    return mask, normalize_keysym(key)
+
+
+def format_chord(chord: Chord) -> str:
+    mask, keysym = chord
+    names = [name for bit, name in MODIFIER_NAMES if mask & bit]
+    return "+".join(names + [keysym])
+
+
+def event_chords(state: int, keysym: str) -> List[Chord]:
+    """Chords a key press could mean, most specific first."""
+    state &= MODIFIER_MASK
+    keysym = normalize_keysym(keysym)
+    candidates = [(state, keysym), (state & ~IGNORED_MODIFIERS, keysym)]
+    if state & SHIFT:
+        base = SHIFTED_KEYSYMS.get(keysym)
+        if base:
+            candidates.append((state & ~IGNORED_MODIFIERS, base))
+        # A binding written with the shifted keysym and no Shift, e.g. "$mod+question"
+        candidates.append((state & ~(IGNORED_MODIFIERS | SHIFT), keysym))
+    return candidates
+
+
+class ChordIndex:
+    """Document rows by chord, built once per load.
+
+    rows[(mode, chord)] lists every row bound to the chord in that i3
+    binding mode, in file order. More than one row is a duplicate when they
+    run the same command and a conflict when they don't; i3 itself only
+    keeps one of them. The same chord in two modes is neither.
+    """
+
+    def __init__(self, groups, variables: Dict[str, str] = DEFAULT_VARIABLES):
+        self.rows: Dict[ModeChord, List[int]] = {}
+        # Rows whose keybinding couldn't be normalized, e.g. an undefined variable
+        self.unresolved: List[int] = []
+        self.groups = groups
+        # First row of each group, to find a row's group again
+        self.group_starts: List[int] = []
+
+        # Prefixes are interned and few, so each is parsed once
+        masks = {}
+        rows = self.rows
+        row = 0
+        for group in groups:
+            self.group_starts.append(row)
+            for prefix, key, mode in zip(group.modifiers, group.keys, group.modes):
+                mask = masks.get(prefix, -1)
+                if mask == -1:
+                    mask = masks[prefix] = parse_modifiers(prefix, variables)
+                chord = make_chord(mask, key, variables)
+                if chord is None:
+                    self.unresolved.append(row)
+                else:
+                    bound = rows.get((mode, chord))
+                    if bound is None:
+                        rows[(mode, chord)] = [row]
+                    else:
+                        bound.append(row)
+                row += 1
+
+    def __len__(self):
+        return len(self.rows)
+
+    def lookup(self, chord: Chord, mode: str = DEFAULT_MODE) -> List[int]:
+        return self.rows.get((mode, chord), [])
+
+    def find_event(self, state: int, keysym: str,
+                   mode: str = DEFAULT_MODE) -> Tuple[Optional[Chord], List[int]]:
+        """The chord and rows for a key press in mode, or (None, []) when nothing is bound."""
+        for chord in event_chords(state, keysym):
+            rows = self.rows.get((mode, chord))
+            if rows:
+                return chord, rows
+        return None, []
+
+    def clashes(self) -> List[Tuple[ModeChord, List[int]]]:
+        """((mode, chord), rows) for every chord bound more than once within
+        one mode, in file order."""
+        return sorted(((key, rows) for key, rows in self.rows.items() if len(rows) > 1),
+                      key=lambda item: item[1][0])
+
+    def shortcut(self, row: int):
+        """(group, index in the group) of a row."""
+        g = bisect_right(self.group_starts, row) - 1
+        return self.groups[g], row - self.group_starts[g]
+
+    def command(self, row: int) -> str:
+        group, index = self.shortcut(row)
+        return group.commands[index]
+
+    def is_conflict(self, rows: List[int]) -> bool:
+        return len({self.command(row) for row in rows}) > 1
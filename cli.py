@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Tk-free output of the parsed shortcuts, for rofi, dmenu, fzf and scripts.
+
+Nothing here imports tkinter, so this path starts much faster than the
+viewer. Groups are written and flushed as the parser produces them.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Iterator, Optional, TextIO, Tuple
+
+from chords import ChordIndex, format_chord, load_variables
+from launcher import spawn
+from parser import DEFAULT_MODE, iter_shortcut_groups, resolve_root
+
+CLI_COMMANDS = ('list', 'select', 'check')
+FORMATS = ('plain', 'tsv', 'jsonl')
+MENUS = {
+    'rofi': ['rofi', '-dmenu', '-i', '-p', 'shortcut'],
+    'dmenu': ['dmenu', '-i', '-l', '20'],
+    'fzf': ['fzf', '--no-sort', '--prompt', 'shortcut> '],
+}
+
+
+def iter_shortcuts(filepath: str = None) -> Iterator[Tuple[str, str, str, Optional[Tuple[str, int]], bool]]:
+    """Yield (group, keybinding, command, source, is_exec) in file order."""
+    for group in iter_shortcut_groups(filepath):
+        for index, (command, source_file) in enumerate(zip(group.commands, group.source_files)):
+            source = (source_file, group.source_lines[index]) if source_file else None
+            yield group.name, group.keybinding(index), command, source, bool(group.execs[index])
+
+
+def format_shortcut(fmt: str, group: str, keybinding: str, command: str,
+                    source: Optional[Tuple[str, int]] = None) -> str:
+    if fmt == 'tsv':
+        return "\t".join(field.replace("\t", " ") for field in (group, keybinding, command))
+    if fmt == 'jsonl':
+        import json
+        record = {'group': group, 'keybinding': keybinding, 'command': command}
+        if source:
+            record['file'], record['line'] = source
+        return json.dumps(record, ensure_ascii=False)
+    return f"{keybinding:40} {command}"
+
+
+def write_shortcuts(out: TextIO, fmt: str = FORMATS[0], filepath: str = None) -> int:
+    """Write one line per binding, flushing after every group. Returns the count."""
+    count = 0
+    current_group = None
+    for group, keybinding, command, source, _ in iter_shortcuts(filepath):
+        if group != current_group and count:
+            out.flush()
+        current_group = group
+        out.write(format_shortcut(fmt, group, keybinding, command, source) + "\n")
+        count += 1
+    out.flush()
+    return count
+
+
+def select_command(menu: str, filepath: str = None) -> Optional[Tuple[str, bool]]:
+    """Pipe the bindings into a menu and return the (command, is_exec) that was picked."""
+    filepath = resolve_root(filepath)
+    process = subprocess.Popen(MENUS[menu], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               text=True)
+    commands = {}
+    try:
+        for group, keybinding, command, _, is_exec in iter_shortcuts(filepath):
+            line = format_shortcut('plain', group, keybinding, command)
+            commands.setdefault(line, (command, is_exec))
+            process.stdin.write(line + "\n")
+        process.stdin.close()
+    except BrokenPipeError:
+        # The menu exited before reading everything, e.g. an early Escape
+        pass
+    finally:
+        choice = process.stdout.read()
+        process.wait()
+
+    if process.returncode != 0:
+        return None
+    return commands.get(choice.rstrip("\n"))
+
+
+def write_clashes(out: TextIO, filepath: str = None) -> int:
+    """Report chords bound more than once. Returns the number of conflicts."""
+    index = ChordIndex(list(iter_shortcut_groups(filepath)), load_variables())
+    conflicts = 0
+    for (mode, chord), rows in index.clashes():
+        conflict = index.is_conflict(rows)
+        conflicts += conflict
+        in_mode = f' in mode "{mode}"' if mode != DEFAULT_MODE else ""
+        out.write(f"{'conflict' if conflict else 'duplicate'}: {format_chord(chord)}{in_mode}\n")
+        for row in rows:
+            group, i = index.shortcut(row)
+            where = f"{group.source_files[i]}:{group.source_lines[i]}: " if group.source_files[i] else ""
+            out.write(f"  {where}{group.keybinding(i)} {group.commands[i]}\n")
+    for row in index.unresolved:
+        group, i = index.shortcut(row)
+        out.write(f"unresolved: {group.keybinding(i)}\n")
+    out.flush()
+    return conflicts
+
+
+def run_command(command: str, is_exec: bool = True):
+    # This process exits straight away, so the command is left to init to reap
+    spawn(command, is_exec)
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(prog="i3-shortcuts-viewer",
+                                         description="Print or pick i3 shortcuts without a window")
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+
+    list_parser = commands.add_parser('list', help="print the shortcuts")
+    list_parser.add_argument('--format', choices=FORMATS, default=FORMATS[0])
+    list_parser.add_argument('--file', help="shortcuts file (default ~/.config/i3/shortcuts)")
+
+    select_parser = commands.add_parser('select', help="pick a shortcut in a menu and run its command")
+    select_parser.add_argument('--menu', choices=sorted(MENUS), default='rofi')
+    select_parser.add_argument('--file', help="shortcuts file (default ~/.config/i3/shortcuts)")
+    select_parser.add_argument('--print', action='store_true', dest='print_only',
+                               help="print the chosen command instead of running it")
+
+    check_parser = commands.add_parser('check', help="report bindings whose key chords clash")
+    check_parser.add_argument('--file', help="shortcuts file (default ~/.config/i3/shortcuts)")
+
+    args = arg_parser.parse_args(argv)
+
+    try:
+        if args.command == 'list':
+            write_shortcuts(sys.stdout, args.format, args.file)
+            return 0
+        if args.command == 'check':
+            return 1 if write_clashes(sys.stdout, args.file) else 0
+
+        picked = select_command(args.menu, args.file)
+        if picked is None:
+            return 1
+        command, is_exec = picked
+        if args.print_only:
+            print(command)
+        else:
+            run_command(command, is_exec)
+        return 0
+    except BrokenPipeError:
+        # Reader went away (e.g. `| head`); don't let the flush at exit complain
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except OSError as e:
+        print(f"i3-shortcuts-viewer: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
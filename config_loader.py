@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 
-import tomllib
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
+
+
+VIRTUALIZE_THRESHOLD = 5000
 
 
 class Config:
@@ -10,20 +12,29 @@ class Config:
         self.font_size = 10
         self.header_font_size = 12
         self.wrap_command = True
+        # None renders everything up to VIRTUALIZE_THRESHOLD lines, then virtualizes
+        self.virtualize = None
+        # Most frecent shortcuts pinned above the list; 0 turns the panel off
+        self.recent_shortcuts = 0
+        # Read the shortcuts i3 has loaded over its IPC socket when possible
+        self.i3_ipc = True
 
 
-def load_config(script_dir: Optional[Path] = None) -> Config:
-    config = Config()
-
-    config_locations = []
+def config_locations(script_dir: Optional[Path] = None) -> List[Path]:
+    locations = []
 
     if script_dir:
-        config_locations.append(script_dir / "config.toml")
+        locations.append(script_dir / "config.toml")
 
-    config_locations.append(Path.home() / ".config" / "i3-shortcut-viewer" / "config.toml")
+    locations.append(Path.home() / ".config" / "i3-shortcut-viewer" / "config.toml")
+    return locations
+
+
+def load_config(script_dir: Optional[Path] = None) -> Config:
+    config = Config()
 
     config_path = None
-    for path in config_locations:
+    for path in config_locations(script_dir):
         if path.exists():
             config_path = path
             break
@@ -32,6 +43,9 @@ def load_config(script_dir: Optional[Path] = None) -> Config:
         return config
 
     try:
+        # Only needed when the compiled theme is stale
+        import tomllib
+
         with open(config_path, 'rb') as f:
             data = tomllib.load(f)
 
@@ -46,6 +60,15 @@ def load_config(script_dir: Optional[Path] = None) -> Config:
             display = data['display']
             if 'wrap_command' in display:
                 config.wrap_command = bool(display['wrap_command'])
+            if 'virtualize' in display and display['virtualize'] != 'auto':
+                config.virtualize = bool(display['virtualize'])
+            if 'recent' in display:
+                config.recent_shortcuts = max(int(display['recent']), 0)
+
+        if 'source' in data:
+            source = data['source']
+            if 'i3_ipc' in source:
+                config.i3_ipc = bool(source['i3_ipc'])
 
     except Exception:
         pass
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+
+import os
+import socket
+from pathlib import Path
+from typing import Callable, Optional
+
+COMMANDS = ('show', 'hide', 'toggle', 'quit')
+# A client that hasn't sent its command by then is dropped
+CLIENT_TIMEOUT_MS = 500
+
+
+def socket_path() -> Path:
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return Path(runtime_dir) / "i3-shortcut-viewer.sock"
+    return Path(f"/tmp/i3-shortcut-viewer-{os.getuid()}.sock")
+
+
+def send_command(command: str, path: Optional[Path] = None, timeout: float = 1.0) -> bool:
+    """Send a command to a running daemon. Returns False if none is listening."""
+    path = path or socket_path()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(str(path))
+        sock.sendall(command.encode() + b"\n")
+        return sock.recv(16).startswith(b"ok")
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+class DaemonServer:
+    """Listens on the UNIX socket from inside the Tk event loop.
+
+    The listening socket and each client connection are registered with Tk
+    as file handlers, so commands are read and dispatched on the main thread
+    without blocking, polling or extra threads.
+    """
+
+    def __init__(self, root, handler: Callable[[str], None], path: Optional[Path] = None):
+        self.root = root
+        self.handler = handler
+        self.path = path or socket_path()
+        self.sock = None
+        # Connected client socket -> [bytes read so far, timeout after() id]
+        self.clients = {}
+
+    def start(self) -> bool:
+        """Bind the socket. Returns False if another daemon already owns it."""
+        if self.path.exists():
+            if send_command('ping', self.path):
+                return False
+            try:
+                self.path.unlink()
+            except OSError:
+                pass
+
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            self.sock.bind(str(self.path))
+        finally:
+            os.umask(old_umask)
+        self.sock.listen(8)
+        self.sock.setblocking(False)
+
+        import tkinter
+        self.root.tk.createfilehandler(self.sock, tkinter.READABLE, self._on_readable)
+        return True
+
+    def stop(self):
+        if self.sock is None:
+            return
+        for conn in list(self.clients):
+            self._close_client(conn)
+        try:
+            self.root.tk.deletefilehandler(self.sock)
+        except Exception:
+            pass
+        self.sock.close()
+        self.sock = None
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+    def _on_readable(self, file, mask):
+        try:
+            conn, _ = self.sock.accept()
+        except OSError:
+            return
+
+        # Read from the event loop as well, so a client that connects and
+        # stalls can't block the window
+        conn.setblocking(False)
+        self.clients[conn] = [b"", self.root.after(CLIENT_TIMEOUT_MS, self._close_client, conn)]
+
+        import tkinter
+        self.root.tk.createfilehandler(conn, tkinter.READABLE, self._on_client_readable)
+
+    def _on_client_readable(self, conn, mask):
+        client = self.clients.get(conn)
+        if client is None:
+            return
+        try:
+            data = conn.recv(64)
+        except BlockingIOError:
+            return
+        except OSError:
+            self._close_client(conn)
+            return
+
+        client[0] += data
+        if data and b"\n" not in client[0] and len(client[0]) < 64:
+            return
+
+        command = client[0].decode(errors='replace').strip()
+        reply = b"ok\n" if command == 'ping' or command in COMMANDS else b"error\n"
+        try:
+            # Fits in the empty socket buffer; a client that went away is ignored
+            conn.send(reply)
+        except OSError:
+            pass
+        self._close_client(conn)
+
+        if command in COMMANDS:
+            self.handler(command)
+
+    def _close_client(self, conn):
+        client = self.clients.pop(conn, None)
+        if client is None:
+            return
+        self.root.after_cancel(client[1])
+        try:
+            self.root.tk.deletefilehandler(conn)
+        except Exception:
+            pass
+        conn.close()
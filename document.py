@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from parser import ShortcutGroup
+
+SEPARATOR = "─" * 80
+WRAP_INDICATOR = "↳ "
+DEFAULT_WRAP_WIDTH = 60
+
+
+def wrap_command_text(command: str, max_width: int = DEFAULT_WRAP_WIDTH, wrap: bool = True,
+                      measure: Callable[[str], int] = len) -> List[str]:
+    """Word-wrap a command to max_width, in characters or in whatever unit
+    measure returns (pixels for a font's measure)."""
+    if not wrap:
+        return [command]
+
+    if measure(command) <= max_width:
+        return [command]
+
+    lines = []
+    current_words = []
+    current_width = 0
+    space = measure(" ")
+
+    for word in command.split():
+        width = measure(word)
+        if current_words and current_width + space + width > max_width:
+            lines.append(" ".join(current_words))
+            current_words = [word]
+            current_width = width
+        else:
+            current_width += space + width if current_words else width
+            current_words.append(word)
+
+    if current_words:
+        lines.append(" ".join(current_words))
+
+    return lines if lines else [command]
+
+
+def keybinding_width(groups: List[ShortcutGroup], measure: Callable[[str], int] = len) -> int:
+    return max((measure(modifiers + key) for group in groups
+                for modifiers, key in zip(group.modifiers, group.keys)), default=0)
+
+
+class Ranges:
+    """Tag ranges (start_line, start_col, end_line, end_col) in four arrays.
+
+    Ranges are appended in start order, so start_lines doubles as the
+    bisection key for finding the ranges that start in a span of lines.
+    """
+
+    __slots__ = ('start_lines', 'start_cols', 'end_lines', 'end_cols')
+
+    def __init__(self, ranges=()):
+        self.start_lines = array('I')
+        self.start_cols = array('I')
+        self.end_lines = array('I')
+        self.end_cols = array('I')
+        for r in ranges:
+            self.append(*r)
+
+    def append(self, start_line: int, start_col: int, end_line: int, end_col: int):
+        self.start_lines.append(start_line)
+        self.start_cols.append(start_col)
+        self.end_lines.append(end_line)
+        self.end_cols.append(end_col)
+
+    def extend_flat(self, values: List[int]):
+        """Append ranges given as one flat list of four values per range."""
+        self.start_lines.extend(values[0::4])
+        self.start_cols.extend(values[1::4])
+        self.end_lines.extend(values[2::4])
+        self.end_cols.extend(values[3::4])
+
+    def __len__(self):
+        return len(self.start_lines)
+
+    def __getitem__(self, index: int) -> Tuple[int, int, int, int]:
+        return self.start_lines[index], self.start_cols[index], self.end_lines[index], self.end_cols[index]
+
+    def __iter__(self) -> Iterator[Tuple[int, int, int, int]]:
+        return zip(self.start_lines, self.start_cols, self.end_lines, self.end_cols)
+
+    def __eq__(self, other):
+        if not isinstance(other, Ranges):
+            return NotImplemented
+        return (self.start_lines == other.start_lines and self.start_cols == other.start_cols
+                and self.end_lines == other.end_lines and self.end_cols == other.end_cols)
+
+    def between(self, lo: int, hi: int) -> Iterator[Tuple[int, int, int, int]]:
+        return zip(self.start_lines[lo:hi], self.start_cols[lo:hi], self.end_lines[lo:hi], self.end_cols[lo:hi])
+
+
+class Rows:
+    """Shortcut rows as columns: where each row's lines are, and the
+    command and search key it shares with its ShortcutGroup."""
+
+    __slots__ = ('starts', 'ends', 'splits', 'commands', 'search_keys')
+
+    def __init__(self):
+        self.starts = array('I')
+        self.ends = array('I')
+        # Length of the keybinding, i.e. where the tab is in the search key
+        self.splits = array('I')
+        self.commands = []
+        self.search_keys = []
+
+    def append(self, start: int, end: int, split: int, command: str, key: str):
+        self.starts.append(start)
+        self.ends.append(end)
+        self.splits.append(split)
+        self.commands.append(command)
+        self.search_keys.append(key)
+
+    def extend(self, starts: List[int], ends: List[int], splits: List[int],
+               commands: List[str], keys: List[str]):
+        self.starts.extend(starts)
+        self.ends.extend(ends)
+        self.splits.extend(splits)
+        self.commands.extend(commands)
+        self.search_keys.extend(keys)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index: int) -> Tuple[int, int, str]:
+        """(start_line, end_line, command) of a row."""
+        return self.starts[index], self.ends[index], self.commands[index]
+
+    def __iter__(self) -> Iterator[Tuple[int, int, str]]:
+        return zip(self.starts, self.ends, self.commands)
+
+
+class Document:
+    """Laid-out text for the viewer, computed without touching Tk."""
+
+    def __init__(self):
+        # Display lines without their trailing newline; line 1 is lines[0]
+        self.lines = []
+        # Tag name -> Ranges, sorted by start
+        self.tags = {}
+        # Every shortcut row
+        self.rows = Rows()
+        # (start_line, end_line, first_row, end_row) covering each group's lines
+        self.blocks = []
+        # Width of the widest keybinding, in the unit the layout was measured in
+        self.keybinding_width = 0
+
+    @property
+    def text(self) -> str:
+        return "".join(line + "\n" for line in self.lines)
+
+    def text_between(self, first: int, last: int) -> str:
+        return "".join(line + "\n" for line in self.lines[first - 1:last])
+
+    def tag_indices(self, first: int = 1, last: int = None, target: int = 1) -> Dict[str, List[str]]:
+        """Flat Tk index lists per tag for ranges starting in lines first..last.
+
+        Indices are shifted so that document line first lands on widget line
+        target, so the result can be applied to a widget holding a slice.
+        """
+        if last is None:
+            last = len(self.lines)
+
+        offset = first - target
+        indices = {}
+        for tag, ranges in self.tags.items():
+            lo = bisect_left(ranges.start_lines, first)
+            hi = bisect_right(ranges.start_lines, last)
+            if lo == hi:
+                continue
+            flat = []
+            for sl, sc, el, ec in ranges.between(lo, hi):
+                flat.append(f"{sl - offset}.{sc}")
+                flat.append(f"{el - offset}.{ec}")
+            indices[tag] = flat
+        return indices
+
+    def to_dict(self) -> dict:
+        return {
+            'lines': self.lines,
+            'tags': {tag: [list(r) for r in ranges] for tag, ranges in self.tags.items()},
+            'rows': [[start, end, split] for start, end, split
+                     in zip(self.rows.starts, self.rows.ends, self.rows.splits)],
+            'blocks': [list(block) for block in self.blocks],
+            'keybinding_width': self.keybinding_width,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, groups: List[ShortcutGroup]) -> 'Document':
+        """Rebuild a document laid out from groups; rows share their strings."""
+        document = cls()
+        document.lines = [str(line) for line in data['lines']]
+        document.tags = {
+            str(tag): Ranges(tuple(int(v) for v in r) for r in ranges)
+            for tag, ranges in data['tags'].items()
+        }
+        commands = [command for group in groups for command in group.commands]
+        keys = [key for group in groups for key in group.search_keys]
+        if len(commands) != len(data['rows']):
+            raise ValueError("rows don't match the groups")
+        for (start, end, split), command, key in zip(data['rows'], commands, keys):
+            document.rows.append(int(start), int(end), int(split), command, key)
+        document.blocks = [tuple(int(v) for v in block) for block in data['blocks']]
+        document.keybinding_width = int(data['keybinding_width'])
+        return document
+
+
+class DocumentBuilder:
+    """Lays out groups one at a time, in a single pass over each.
+
+    Lines, rows and per-tag ranges are only ever appended, so a document can
+    be rendered and searched while groups are still arriving.
+    """
+
+    def __init__(self, wrap: bool = True, max_width: int = DEFAULT_WRAP_WIDTH,
+                 measure: Callable[[str], int] = len):
+        self.document = Document()
+        self.wrap = wrap
+        self.max_width = max_width
+        self.measure = measure
+        self.ranges = {tag: Ranges() for tag in ('header', 'separator', 'keybinding', 'command', 'wrap_indicator')}
+
+    def add_group(self, group: ShortcutGroup):
+        document = self.document
+        lines = document.lines
+        rows = document.rows
+        # Collected as flat lists and moved into the arrays once per group
+        keybindings = []
+        commands = []
+        indicators = []
+        row_starts = []
+        row_ends = []
+        splits = []
+        indicator_end = 1 + len(WRAP_INDICATOR)
+        wrap = self.wrap
+        max_width = self.max_width
+        measure = self.measure
+        widest = document.keybinding_width
+
+        block_start = len(lines) + 1
+        first_row = len(rows)
+        if document.blocks:
+            lines.append("")
+
+        lines.append(group.name)
+        line = len(lines)
+        self.ranges['header'].append(line, 0, line + 1, 0)
+        lines.append(SEPARATOR)
+        self.ranges['separator'].append(line + 1, 0, line + 2, 0)
+
+        for modifiers, key, command in zip(group.modifiers, group.keys, group.commands):
+            keybinding = modifiers + key
+            command_lines = wrap_command_text(command, max_width, wrap, measure)
+            widest = max(widest, measure(keybinding))
+
+            lines.append(f"{keybinding}\t{command_lines[0]}")
+            start_line = line = len(lines)
+            split = len(keybinding)
+            keybindings += (line, 0, line, split)
+            commands += (line, split + 1, line + 1, 0)
+
+            for continuation_line in command_lines[1:]:
+                lines.append(f"\t{WRAP_INDICATOR}{continuation_line}")
+                line += 1
+                indicators += (line, 1, line, indicator_end)
+                commands += (line, indicator_end, line + 1, 0)
+
+            row_starts.append(start_line)
+            row_ends.append(line)
+            splits.append(split)
+
+        self.ranges['keybinding'].extend_flat(keybindings)
+        self.ranges['command'].extend_flat(commands)
+        self.ranges['wrap_indicator'].extend_flat(indicators)
+        rows.extend(row_starts, row_ends, splits, group.commands, group.search_keys)
+
+        lines.append("")
+        document.blocks.append((block_start, len(lines), first_row, len(rows)))
+        document.keybinding_width = widest
+
+        for tag, ranges in self.ranges.items():
+            if ranges and tag not in document.tags:
+                document.tags[tag] = ranges
+
+    def finish(self) -> Document:
+        if not self.document.blocks:
+            self.document.lines.append("No shortcuts found.")
+        return self.document
+
+
+def build_document(groups: List[ShortcutGroup], wrap: bool = True,
+                   max_width: int = DEFAULT_WRAP_WIDTH, measure: Callable[[str], int] = len) -> Document:
+    builder = DocumentBuilder(wrap, max_width, measure)
+    for group in groups:
+        builder.add_group(group)
+    return builder.finish()
+
+
+def apply_document(text_widget, document: Document, first: int = 1, last: int = None,
+                   target: int = 1) -> int:
+    """Insert lines first..last at widget line target with one insert and one
+    tag_add per tag. Returns the number of widget calls made."""
+    if last is None:
+        last = len(document.lines)
+
+    # An explicit empty tag list stops the text inheriting tags from its neighbours
+    text_widget.insert(f"{target}.0", document.text_between(first, last), ())
+    calls = 1
+    for tag, indices in document.tag_indices(first, last, target).items():
+        text_widget.tag_add(tag, *indices)
+        calls += 1
+    return calls
+
+
+def diff_documents(old: Document, old_groups: List[ShortcutGroup],
+                   new: Document, new_groups: List[ShortcutGroup]) -> List[Tuple[int, int, int, int]]:
+    """Line ranges that differ between two layouts of the same settings.
+
+    Groups are compared first; groups that were replaced one-for-one under
+    the same name are then compared row by row. Returns ascending, disjoint
+    (old_start, old_end, new_start, new_end) half-open 1-based line ranges:
+    replacing old lines [old_start, old_end) with new lines
+    [new_start, new_end) in each range turns old into new.
+    """
+    if not old.blocks or not new.blocks:
+        return [(1, len(old.lines) + 1, 1, len(new.lines) + 1)]
+
+    def group_key(groups, i):
+        return (i > 0, groups[i].name, tuple(groups[i].shortcuts))
+
+    old_keys = [group_key(old_groups, i) for i in range(len(old_groups))]
+    new_keys = [group_key(new_groups, i) for i in range(len(new_groups))]
+
+    # Only live reloads diff, so difflib stays off the startup path
+    from difflib import SequenceMatcher
+
+    ops = []
+    matcher = SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+
+        if tag == 'replace' and i2 - i1 == j2 - j1 and all(
+                old_keys[i1 + k][:2] == new_keys[j1 + k][:2] for k in range(i2 - i1)):
+            for k in range(i2 - i1):
+                ops.extend(diff_rows(old, old_groups[i1 + k], old.blocks[i1 + k],
+                                     new, new_groups[j1 + k], new.blocks[j1 + k]))
+            continue
+
+        ops.append((block_start(old, i1), block_start(old, i2), block_start(new, j1), block_start(new, j2)))
+
+    return ops
+
+
+def diff_layout(old: Document, new: Document) -> List[Tuple[int, int, int, int]]:
+    """Line ranges that differ between two layouts of the same groups,
+    e.g. before and after re-wrapping for a new width.
+
+    Only rows whose wrapped lines changed produce ranges; adjacent changed
+    rows are merged. Same format as diff_documents.
+    """
+    if len(old.rows) != len(new.rows) or len(old.blocks) != len(new.blocks):
+        return [(1, len(old.lines) + 1, 1, len(new.lines) + 1)]
+
+    ops = []
+    old_lines, new_lines = old.lines, new.lines
+    for old_start, old_end, new_start, new_end in zip(old.rows.starts, old.rows.ends,
+                                                      new.rows.starts, new.rows.ends):
+        if old_end - old_start == new_end - new_start and \
+                old_lines[old_start - 1:old_end] == new_lines[new_start - 1:new_end]:
+            continue
+        if ops and ops[-1][1] == old_start:
+            ops[-1] = (ops[-1][0], old_end + 1, ops[-1][2], new_end + 1)
+        else:
+            ops.append((old_start, old_end + 1, new_start, new_end + 1))
+    return ops
+
+
+def map_line(ops: List[Tuple[int, int, int, int]], line: int) -> int:
+    """Where an old document line ends up after applying diff ops."""
+    shift = 0
+    for old_start, old_end, new_start, new_end in ops:
+        if line < old_start:
+            break
+        if line < old_end:
+            return new_start
+        shift = new_end - old_end
+    return line + shift
+
+
+def block_start(document: Document, index: int) -> int:
+    if index < len(document.blocks):
+        return document.blocks[index][0]
+    return len(document.lines) + 1
+
+
+def diff_rows(old: Document, old_group: ShortcutGroup, old_block: tuple,
+              new: Document, new_group: ShortcutGroup, new_block: tuple) -> List[Tuple[int, int, int, int]]:
+    def row_start(document, block, index):
+        first_row, end_row = block[2], block[3]
+        if first_row + index < end_row:
+            return document.rows.starts[first_row + index]
+        # Past the last row: the group's trailing blank line
+        return block[1]
+
+    from difflib import SequenceMatcher
+
+    ops = []
+    matcher = SequenceMatcher(None, old_group.shortcuts, new_group.shortcuts, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != 'equal':
+            ops.append((row_start(old, old_block, i1), row_start(old, old_block, i2),
+                        row_start(new, new_block, j1), row_start(new, new_block, j2)))
+    return ops
+
+
+def header_line(document: Document, index: int) -> int:
+    """The header line of block index; blocks after the first start with a blank line."""
+    return document.blocks[index][0] + (1 if index else 0)
+
+
+def elided_lines(document: Document, match_lines: Optional[List[int]] = None,
+                 folded=()) -> Tuple[List[Tuple[int, int]], List[int]]:
+    """Line ranges (first, last) to hide, and the header lines of folded groups.
+
+    With match_lines, the sorted lines of search matches, rows without a
+    match are hidden and so are groups with none, unless the group's
+    header matched. Folded groups (indices into blocks) keep only their
+    header. Adjacent ranges are merged, so there is one range per gap.
+    """
+    starts, ends = document.rows.starts, document.rows.ends
+    hidden = []
+    headers = []
+
+    def hide(first, last):
+        if hidden and hidden[-1][1] + 1 >= first:
+            hidden[-1] = (hidden[-1][0], max(hidden[-1][1], last))
+        elif first <= last:
+            hidden.append((first, last))
+
+    m = 0
+    for index, (block_start, block_end, first_row, end_row) in enumerate(document.blocks):
+        header = header_line(document, index)
+        last_row_line = ends[end_row - 1] if end_row > first_row else header + 1
+
+        if match_lines is not None:
+            lo = bisect_left(match_lines, block_start, m)
+            m = bisect_right(match_lines, block_end, lo)
+            if lo == m:
+                hide(block_start, block_end)
+                continue
+
+        if index in folded:
+            headers.append(header)
+            hide(header + 1, last_row_line)
+            continue
+        if match_lines is None or match_lines[lo] <= header:
+            continue
+
+        # Keep the header and separator, and each row with a match
+        shown = header + 2
+        for line in match_lines[lo:m]:
+            if line < shown:
+                continue
+            row = bisect_right(starts, line, first_row, end_row) - 1
+            if row < first_row or line > ends[row]:
+                continue
+            hide(shown, starts[row] - 1)
+            shown = ends[row] + 1
+        hide(shown, last_row_line)
+
+    return hidden, headers
+
+
+class RowIndex:
+    """Maps a document line to its shortcut row by bisecting row start lines.
+
+    Reads the document's own row columns, so rows appended while streaming
+    are found without copying anything.
+    """
+
+    def __init__(self, rows: Optional[Rows] = None):
+        self.rows = rows if rows is not None else Rows()
+
+    def find(self, line: int) -> Optional[int]:
+        i = bisect_right(self.rows.starts, line) - 1
+        if i >= 0 and line <= self.rows.ends[i]:
+            return i
+        return None
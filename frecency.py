@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""How often and how recently each shortcut has been run.
+
+Every run is appended to a log as one JSON line. Once the log is long
+enough it is folded into a snapshot, a small file of per-shortcut totals
+sorted by score, and emptied. Loading reads the snapshot and replays the
+few log lines written since, so it stays cheap however long the history.
+"""
+
+import fcntl
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from tracing import tracer
+
+USAGE_VERSION = 1
+# A run counts half as much after this many seconds
+HALF_LIFE = 7 * 24 * 3600
+# The log is folded into the snapshot once it has this many lines
+COMPACT_LINES = 256
+# The snapshot keeps only the highest scores
+MAX_ENTRIES = 1000
+
+Key = Tuple[str, str]  # (keybinding, command)
+
+
+def default_state_dir() -> Path:
+    base = os.environ.get('XDG_STATE_HOME')
+    base = Path(base) if base else Path.home() / ".local" / "state"
+    return base / "i3-shortcut-viewer"
+
+
+def decayed(score: float, since: float, now: float, half_life: float = HALF_LIFE) -> float:
+    return score * 0.5 ** (max(now - since, 0.0) / half_life)
+
+
+def add_run(entries: Dict[Key, list], key: Key, when: float, half_life: float = HALF_LIFE):
+    """Count one run of key at time when. Entries are [count, last run, score at last run]."""
+    entry = entries.get(key)
+    if entry is None:
+        entries[key] = [1, when, 1.0]
+    else:
+        entry[2] = decayed(entry[2], entry[1], when, half_life) + 1.0
+        entry[0] += 1
+        entry[1] = max(entry[1], when)
+
+
+def read_snapshot(path: Path) -> Dict[Key, list]:
+    """The snapshot's entries; empty if it is missing or unreadable."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data['version'] != USAGE_VERSION:
+            return {}
+        return {(str(keybinding), str(command)): [int(count), float(last), float(score)]
+                for keybinding, command, count, last, score in data['entries']}
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+
+
+def replay_log(entries: Dict[Key, list], log, half_life: float = HALF_LIFE) -> int:
+    """Add the runs in log to entries. Returns the number of lines read."""
+    lines = 0
+    for line in log:
+        lines += 1
+        try:
+            when, keybinding, command = json.loads(line)
+            add_run(entries, (str(keybinding), str(command)), float(when), half_life)
+        except (ValueError, TypeError):
+            # A line cut short by a crash mid-write
+            continue
+    return lines
+
+
+class FrecencyStore:
+    """Run counts with exponential decay, persisted as a log plus a snapshot.
+
+    All disk access happens on one writer thread, so the caller never waits
+    on the disk. The thread loads the history first; until then scores()
+    only knows the runs recorded since, and loaded is False. record()
+    updates the in-memory scores and hands the log line to the thread.
+    Compaction also runs there, under an exclusive lock on the log, from
+    what is on disk rather than from memory; another viewer writing to the
+    same log loses nothing.
+    """
+
+    def __init__(self, state_dir: Optional[Path] = None, half_life: float = HALF_LIFE,
+                 compact_lines: int = COMPACT_LINES):
+        self.state_dir = state_dir or default_state_dir()
+        self.log_path = self.state_dir / "usage.log"
+        self.snapshot_path = self.state_dir / "usage.snapshot"
+        self.half_life = half_life
+        self.compact_lines = compact_lines
+
+        # Replaced, never changed, by the writer thread; guarded by lock
+        self.entries: Dict[Key, list] = {}
+        self.loaded = False
+        # Runs recorded before the history was loaded, added to it once it is
+        self.unloaded_runs = []
+        # Log lines written since the last compaction, as far as this process
+        # knows; only touched by the writer thread
+        self.logged = 0
+
+        self.lock = threading.Condition()
+        self.queue = []
+        self.writing = False
+        self.thread = None
+
+    def start(self):
+        """Start the writer thread, which loads the history in the background."""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="frecency", daemon=True)
+                self.thread.start()
+
+    def load(self):
+        """Read the snapshot and log. Runs on the writer thread, or on the
+        caller's when the thread was never started."""
+        entries = read_snapshot(self.snapshot_path)
+        try:
+            with open(self.log_path, encoding='utf-8') as log:
+                self.logged = replay_log(entries, log, self.half_life)
+        except OSError:
+            pass
+        with self.lock:
+            for key, when in self.unloaded_runs:
+                add_run(entries, key, when, self.half_life)
+            self.unloaded_runs = []
+            self.entries = entries
+            self.loaded = True
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+    def record(self, keybinding: str, command: str, when: Optional[float] = None):
+        """Count a run now; the log line is written in the background."""
+        when = time.time() if when is None else when
+        key = (keybinding, command)
+        with self.lock:
+            add_run(self.entries, key, when, self.half_life)
+            if not self.loaded:
+                self.unloaded_runs.append((key, when))
+            self.queue.append(json.dumps([when, keybinding, command], ensure_ascii=False) + "\n")
+            self.lock.notify()
+        self.start()
+
+    def scores(self, now: Optional[float] = None) -> Dict[Key, float]:
+        now = time.time() if now is None else now
+        with self.lock:
+            entries = list(self.entries.items())
+        return {key: decayed(score, last, now, self.half_life)
+                for key, (_, last, score) in entries}
+
+    def recent(self, count: Optional[int] = None, now: Optional[float] = None) -> List[Key]:
+        """The count highest-scoring shortcuts, or all of them, best first."""
+        scores = self.scores(now)
+        return sorted(scores, key=scores.get, reverse=True)[:count]
+
+    def run(self):
+        if not self.loaded:
+            start = time.monotonic()
+            self.load()
+            tracer.span('load usage (worker)', start, time.monotonic())
+        while True:
+            with self.lock:
+                while not self.queue:
+                    self.lock.wait()
+                lines, self.queue = self.queue, []
+                self.writing = True
+            try:
+                self.append(lines)
+                if self.logged >= self.compact_lines:
+                    self.compact()
+            except OSError:
+                pass
+            finally:
+                with self.lock:
+                    self.writing = False
+                    self.lock.notify_all()
+
+    def append(self, lines: List[str]):
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.log_path, 'a', encoding='utf-8') as log:
+            fcntl.flock(log, fcntl.LOCK_EX)
+            log.write("".join(lines))
+        self.logged += len(lines)
+
+    def compact(self):
+        """Fold the log into the snapshot and empty the log."""
+        with open(self.log_path, 'a+', encoding='utf-8') as log:
+            fcntl.flock(log, fcntl.LOCK_EX)
+            entries = read_snapshot(self.snapshot_path)
+            log.seek(0)
+            replay_log(entries, log, self.half_life)
+
+            now = time.time()
+            ranked = sorted(entries.items(), reverse=True,
+                            key=lambda item: decayed(item[1][2], item[1][1], now, self.half_life))
+            data = {
+                'version': USAGE_VERSION,
+                'entries': [[keybinding, command, count, last, score]
+                            for (keybinding, command), (count, last, score) in ranked[:MAX_ENTRIES]],
+            }
+            tmp_path = self.snapshot_path.with_suffix(f".tmp{os.getpid()}")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.snapshot_path)
+            # A crash right here counts this log's runs twice, which beats losing them
+            log.truncate(0)
+        self.logged = 0
+
+    def flush(self, timeout: float = 1.0):
+        """Wait for queued lines to reach the log, e.g. before exiting."""
+        deadline = time.monotonic() + timeout
+        with self.lock:
+            while self.queue or self.writing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                self.lock.wait(remaining)
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""Raw i3 IPC: the loaded config and reload notifications, without i3ipc.
+
+Messages are the "i3-ipc" magic, a native-endian payload length and
+message type, then a JSON payload. See https://i3wm.org/docs/ipc.html.
+"""
+
+import json
+import os
+import socket
+import struct
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+I3_SOCKET_ENV = 'I3SOCK'
+
+MAGIC = b"i3-ipc"
+HEADER = struct.Struct(f"={len(MAGIC)}sII")
+
+# Message types
+SUBSCRIBE = 2
+GET_VERSION = 7
+GET_CONFIG = 9
+
+# Replies to subscriptions have this bit set in their type
+EVENT_MASK = 1 << 31
+
+# Any of these makes the loaded config worth fetching again
+RELOAD_EVENTS = ['config', 'shutdown']
+
+RECONNECT_MS = 1000
+RECONNECT_ATTEMPTS = 30
+# How often the Tk thread checks on a connect running on a worker
+CONNECT_POLL_MS = 10
+
+
+class I3IpcError(Exception):
+    pass
+
+
+def i3_socket_path() -> Optional[Path]:
+    path = os.environ.get(I3_SOCKET_ENV)
+    return Path(path) if path else None
+
+
+def pack_message(message_type: int, payload: bytes = b"") -> bytes:
+    return HEADER.pack(MAGIC, len(payload), message_type) + payload
+
+
+def recv_exact(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise I3IpcError("i3 closed the connection")
+        data += chunk
+    return bytes(data)
+
+
+def recv_message(sock: socket.socket):
+    """Read one message. Returns (type, decoded JSON payload)."""
+    magic, length, message_type = HEADER.unpack(recv_exact(sock, HEADER.size))
+    if magic != MAGIC:
+        raise I3IpcError("not an i3 IPC message")
+    try:
+        return message_type, json.loads(recv_exact(sock, length))
+    except ValueError as e:
+        raise I3IpcError(f"invalid i3 IPC payload: {e}")
+
+
+class I3Connection:
+    def __init__(self, path: Optional[Path] = None, timeout: float = 1.0):
+        path = path or i3_socket_path()
+        if path is None:
+            raise I3IpcError(f"${I3_SOCKET_ENV} is not set")
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(str(path))
+        except OSError:
+            self.sock.close()
+            raise
+
+    def request(self, message_type: int, payload=None):
+        data = json.dumps(payload).encode() if payload is not None else b""
+        self.sock.sendall(pack_message(message_type, data))
+        while True:
+            reply_type, reply = recv_message(self.sock)
+            # Events may arrive ahead of the reply on a subscribed connection
+            if reply_type == message_type:
+                return reply
+
+    def get_config(self) -> dict:
+        return self.request(GET_CONFIG)
+
+    def subscribe(self, events: List[str]) -> bool:
+        reply = self.request(SUBSCRIBE, events)
+        return isinstance(reply, dict) and bool(reply.get('success'))
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    def close(self):
+        self.sock.close()
+
+
+def loaded_texts(config: dict) -> Dict[Path, str]:
+    """Files i3 has loaded, keyed by resolved path, as they were when loaded.
+
+    i3 only reports paths for included files (4.20 and later); the main
+    config comes without one and is left out.
+    """
+    if not isinstance(config, dict):
+        raise I3IpcError("unexpected GET_CONFIG reply")
+    texts = {}
+    for included in config.get('included_configs') or []:
+        path = included.get('path')
+        text = included.get('raw_contents')
+        if path and text is not None:
+            texts[Path(path).resolve()] = text
+    return texts
+
+
+def connect(path: Optional[Path] = None) -> Tuple[I3Connection, I3Connection, Dict[Path, str]]:
+    """(connection, subscribed events connection, loaded texts).
+
+    Blocks on the socket, so it is run on a worker thread; it doesn't touch Tk.
+    """
+    connection = events = None
+    try:
+        connection = I3Connection(path)
+        texts = loaded_texts(connection.get_config())
+        events = I3Connection(path)
+        if not events.subscribe(RELOAD_EVENTS):
+            raise I3IpcError("subscription refused")
+    except BaseException:
+        for opened in (connection, events):
+            if opened is not None:
+                opened.close()
+        raise
+    return connection, events, texts
+
+
+def texts_content(texts: Dict[Path, str]) -> bytes:
+    """All of texts as one blob, for hashing."""
+    return "\0".join(f"{path}\0{texts[path]}" for path in sorted(texts)).encode()
+
+
+class I3ConfigSource:
+    """The config i3 has loaded, kept current by subscribing to reloads.
+
+    One connection answers GET_CONFIG; a second one is subscribed and
+    registered with Tk as a file handler, so a reload is noticed without
+    polling. Connecting and the first fetch run on a worker thread and are
+    picked up with after(), and on_reload is called once the texts are in.
+    When i3 goes away (exit or restart) the texts are dropped, so callers
+    fall back to the files on disk, and reconnection is retried.
+    """
+
+    def __init__(self, root, on_reload: Callable[[], None], path: Optional[Path] = None):
+        self.root = root
+        self.on_reload = on_reload
+        self.path = path
+        self.connection = None
+        self.events = None
+        self.texts: Optional[Dict[Path, str]] = None
+        self.reconnect_id = None
+        self.reconnect_attempts = 0
+        # The connect() running on a worker: a startup Task, or one of ours
+        self.pending = None
+        self.poll_id = None
+
+    @property
+    def connected(self) -> bool:
+        return self.connection is not None
+
+    def start(self, pending=None):
+        """Connect and fetch the loaded config without blocking the Tk thread.
+
+        pending is a connect() already started, e.g. by the startup
+        pipeline; otherwise one is started here.
+        """
+        if self.connected or self.pending is not None:
+            return
+        if pending is None:
+            from startup import Task
+            pending = Task('i3 ipc connect', connect, self.path)
+        self.pending = pending
+        self.poll_id = self.root.after(CONNECT_POLL_MS, self.poll)
+
+    def poll(self):
+        self.poll_id = None
+        if not self.pending.done.is_set():
+            self.poll_id = self.root.after(CONNECT_POLL_MS, self.poll)
+            return
+
+        pending, self.pending = self.pending, None
+        try:
+            self.connection, self.events, self.texts = pending.result()
+        except (OSError, I3IpcError):
+            # Not reachable; only a connection that was lost is retried
+            if self.reconnect_attempts:
+                self.schedule_reconnect()
+            return
+
+        import tkinter
+        self.root.tk.createfilehandler(self.events.sock, tkinter.READABLE, self._on_event)
+        self.reconnect_attempts = 0
+        self.on_reload()
+
+    def texts_for(self, shortcuts_path: Path) -> Optional[Dict[Path, str]]:
+        """The loaded texts, if i3 has loaded shortcuts_path; otherwise None."""
+        if self.texts is None:
+            return None
+        try:
+            if shortcuts_path.resolve() not in self.texts:
+                return None
+        except OSError:
+            return None
+        return self.texts
+
+    def _on_event(self, sock, mask):
+        try:
+            recv_message(self.events.sock)
+            texts = loaded_texts(self.connection.get_config())
+        except (OSError, I3IpcError):
+            self.disconnect()
+            self.on_reload()
+            self.schedule_reconnect()
+            return
+
+        if texts != self.texts:
+            self.texts = texts
+            self.on_reload()
+
+    def schedule_reconnect(self):
+        if self.reconnect_id is None and self.reconnect_attempts < RECONNECT_ATTEMPTS:
+            self.reconnect_id = self.root.after(RECONNECT_MS, self.reconnect)
+
+    def reconnect(self):
+        self.reconnect_id = None
+        self.reconnect_attempts += 1
+        self.start()
+
+    def disconnect(self):
+        if self.events is not None:
+            try:
+                self.root.tk.deletefilehandler(self.events.sock)
+            except Exception:
+                pass
+            self.events.close()
+            self.events = None
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        self.texts = None
+
+    def stop(self):
+        if self.reconnect_id is not None:
+            self.root.after_cancel(self.reconnect_id)
+            self.reconnect_id = None
+        if self.poll_id is not None:
+            self.root.after_cancel(self.poll_id)
+            self.poll_id = None
+        if self.pending is not None:
+            # A connect still running is left to finish; its sockets close when collected
+            pending, self.pending = self.pending, None
+            if pending.done.is_set() and pending.error is None and pending.value:
+                for connection in pending.value[:2]:
+                    connection.close()
+        self.disconnect()
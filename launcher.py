@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import select
+import shlex
+import signal
+import socket
+import time
+from collections import deque
+from typing import Callable, List, Optional
+
+from tracing import tracer
+
+# Characters that only mean something to a shell; commands without any are
+# split with shlex and executed directly
+SHELL_CHARS = frozenset('|&;<>()$`\\*?[]{}~#\n')
+# Leading words that are shell syntax or builtins rather than programs
+SHELL_WORDS = frozenset(('cd', 'exec', 'export', 'if', 'for', 'while', 'case', 'source', '.',
+                         'eval', 'set', 'unset', 'ulimit', 'umask', '!', 'time'))
+
+# A second click on the same command within this many seconds is ignored
+DEBOUNCE_SECONDS = 0.4
+# sh exits with these when the command itself couldn't be found or run
+SHELL_EXEC_FAILURES = {126: "permission denied", 127: "command not found"}
+# How often children spawned without the helper are checked for exit
+REAP_INTERVAL_MS = 500
+
+
+def shell_free_argv(command: str) -> Optional[List[str]]:
+    """command split into argv, or None if it needs a shell to run."""
+    if SHELL_CHARS.intersection(command):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None
+    if not argv or argv[0] in SHELL_WORDS or '=' in argv[0]:
+        return None
+    return argv
+
+
+def needs_shell(command: str, is_exec: bool = True) -> bool:
+    return is_exec and shell_free_argv(command) is None
+
+
+def command_argv(command: str, is_exec: bool = True) -> List[str]:
+    """argv to run command with: i3-msg for i3 commands, i.e. bindings
+    without exec, otherwise split directly, or through /bin/sh when needed."""
+    if not is_exec:
+        return ['i3-msg', '-q', command]
+    return shell_free_argv(command) or ['/bin/sh', '-c', command]
+
+
+def spawn(command: str, is_exec: bool = True) -> int:
+    """Start command in its own session with no inherited output. Returns the pid.
+
+    is_exec is whether the binding used exec; other commands go to i3.
+    posix_spawn doesn't copy the caller's page tables, and exec failures are
+    raised here as OSError.
+    """
+    argv = command_argv(command, is_exec)
+    file_actions = [(os.POSIX_SPAWN_OPEN, fd, os.devnull, os.O_RDWR, 0) for fd in (0, 1, 2)]
+    return os.posix_spawnp(argv[0], argv, os.environ, file_actions=file_actions, setsid=True)
+
+
+class Launcher:
+    """Runs shortcut commands from a small helper process.
+
+    The helper is forked once, before Tk has loaded anything, so each launch
+    costs a message over a socket pair instead of forking the whole viewer.
+    The helper spawns the command, reaps it when it exits and replies with
+    the outcome; replies are read from the Tk event loop, so nothing here
+    blocks the UI. Without a helper, commands are spawned in-process and
+    reaped on a timer.
+    """
+
+    def __init__(self, debounce: float = DEBOUNCE_SECONDS):
+        self.debounce = debounce
+        self.sock = None
+        self.helper_pid = None
+        self.root = None
+        # Called with (command, message) when a command fails to start
+        self.on_failure: Optional[Callable[[str, str], None]] = None
+
+        self.next_id = 0
+        self.pending = {}  # request id -> (command, send time)
+        self.buffer = b""
+        self.children = {}  # pid -> (command, is_exec), for in-process spawns
+        self.reap_id = None
+        self.last_launch = (None, 0.0)
+
+        # Recent send-to-spawned latencies in seconds
+        self.latencies = deque(maxlen=256)
+
+    def start(self) -> bool:
+        """Fork the helper. Call before creating the Tk root."""
+        try:
+            parent_sock, child_sock = socket.socketpair()
+            pid = os.fork()
+        except OSError:
+            return False
+
+        if pid == 0:
+            parent_sock.close()
+            status = 0
+            try:
+                run_helper(child_sock)
+            except BaseException:
+                status = 1
+            finally:
+                # Never run the parent's atexit handlers or Tk teardown
+                os._exit(status)
+
+        child_sock.close()
+        parent_sock.setblocking(False)
+        self.sock = parent_sock
+        self.helper_pid = pid
+        return True
+
+    def attach(self, root):
+        """Read helper replies from root's event loop."""
+        self.root = root
+        if self.sock is not None:
+            import tkinter
+            root.tk.createfilehandler(self.sock, tkinter.READABLE, self._on_readable)
+
+    def launch(self, command: str, is_exec: bool = True) -> bool:
+        """Start command, or send it to i3 unless is_exec. Returns False if
+        it was debounced."""
+        now = time.monotonic()
+        last_command, last_time = self.last_launch
+        if command == last_command and now - last_time < self.debounce:
+            return False
+        self.last_launch = (command, now)
+
+        if self.sock is not None:
+            self.next_id += 1
+            request = {'id': self.next_id, 'command': command, 'exec': is_exec}
+            message = json.dumps(request).encode() + b"\n"
+            try:
+                self.sock.send(message)
+                self.pending[self.next_id] = (command, now)
+                return True
+            except OSError:
+                # The helper is gone or stuck; carry on without it
+                self.stop_helper()
+
+        try:
+            self.children[spawn(command, is_exec)] = (command, is_exec)
+        except OSError as e:
+            self.report_failure(command, str(e))
+            return True
+        self.record_latency(time.monotonic() - now, now)
+        self.schedule_reap()
+        return True
+
+    def record_latency(self, latency: float, start: float):
+        self.latencies.append(latency)
+        if tracer.enabled:
+            tracer.observe('launch latency', latency, start)
+
+    def report_failure(self, command: str, message: str):
+        if tracer.enabled:
+            tracer.count('launch failures')
+        if self.on_failure:
+            self.on_failure(command, message)
+
+    def _on_readable(self, sock, mask):
+        try:
+            data = self.sock.recv(65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.stop_helper()
+            return
+
+        *lines, self.buffer = (self.buffer + data).split(b"\n")
+        for line in lines:
+            try:
+                reply = json.loads(line)
+            except ValueError:
+                continue
+            self.handle_reply(reply)
+
+    def handle_reply(self, reply: dict):
+        request_id = reply.get('id')
+        if 'pid' in reply:
+            command, sent = self.pending.get(request_id, (None, None))
+            if sent is not None:
+                self.record_latency(time.monotonic() - sent, sent)
+            return
+        command, _ = self.pending.pop(request_id, (None, None))
+        if command is None:
+            return
+        if 'error' in reply:
+            self.report_failure(command, reply['error'])
+        elif 'exit' in reply:
+            self.report_failure(command, SHELL_EXEC_FAILURES.get(reply['exit'], f"exit status {reply['exit']}"))
+
+    def schedule_reap(self):
+        if self.reap_id is None and self.children and self.root is not None:
+            self.reap_id = self.root.after(REAP_INTERVAL_MS, self.reap)
+
+    def reap(self):
+        self.reap_id = None
+        for pid, (command, is_exec) in list(self.children.items()):
+            try:
+                done, status = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                done, status = pid, 0
+            if done:
+                del self.children[pid]
+                code = os.waitstatus_to_exitcode(status)
+                if code in SHELL_EXEC_FAILURES and needs_shell(command, is_exec):
+                    self.report_failure(command, SHELL_EXEC_FAILURES[code])
+        self.schedule_reap()
+
+    def stop_helper(self):
+        if self.sock is None:
+            return
+        if self.root is not None:
+            try:
+                self.root.tk.deletefilehandler(self.sock)
+            except Exception:
+                pass
+        self.sock.close()
+        self.sock = None
+        self.pending.clear()
+        if self.helper_pid is not None:
+            # The helper exits as soon as it sees the socket close
+            try:
+                os.waitpid(self.helper_pid, 0)
+            except ChildProcessError:
+                pass
+            self.helper_pid = None
+
+    def stop(self):
+        if self.reap_id is not None and self.root is not None:
+            self.root.after_cancel(self.reap_id)
+            self.reap_id = None
+        self.stop_helper()
+
+
+def run_helper(sock: socket.socket):
+    """Helper loop: spawn requested commands and reap them as they exit.
+
+    SIGCHLD wakes the loop through a pipe, so exits are reaped as they
+    happen. The loop ends when the viewer closes its end of the socket;
+    running commands are left to carry on in their own sessions.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    wake_r, wake_w = os.pipe()
+    os.set_blocking(wake_w, False)
+    signal.set_wakeup_fd(wake_w)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
+    children = {}  # pid -> (request id, whether sh runs the command)
+    buffer = b""
+
+    def reply(message: dict):
+        try:
+            sock.sendall(json.dumps(message).encode() + b"\n")
+        except OSError:
+            pass
+
+    while True:
+        try:
+            readable, _, _ = select.select([sock, wake_r], [], [])
+        except InterruptedError:
+            continue
+
+        if wake_r in readable:
+            os.read(wake_r, 512)
+            while children:
+                try:
+                    pid, status = os.waitpid(-1, os.WNOHANG)
+                except ChildProcessError:
+                    break
+                if not pid:
+                    break
+                request_id, shell = children.pop(pid, (None, False))
+                code = os.waitstatus_to_exitcode(status)
+                if shell and code in SHELL_EXEC_FAILURES:
+                    reply({'id': request_id, 'exit': code})
+                else:
+                    reply({'id': request_id, 'done': code})
+
+        if sock in readable:
+            data = sock.recv(65536)
+            if not data:
+                return
+            *lines, buffer = (buffer + data).split(b"\n")
+            for line in lines:
+                try:
+                    request = json.loads(line)
+                    command = request['command']
+                    is_exec = bool(request.get('exec', True))
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    continue
+                try:
+                    pid = spawn(command, is_exec)
+                except OSError as e:
+                    reply({'id': request['id'], 'error': str(e)})
+                    continue
+                children[pid] = (request['id'], needs_shell(command, is_exec))
+                reply({'id': request['id'], 'pid': pid})
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from parser import ShortcutGroup
+from document import Document
+from watcher import file_signature
+
+CACHE_VERSION = 7
+MAX_ENTRIES = 16
+MAX_BYTES = 8 * 1024 * 1024
+# Hex digits in an entry's file name
+KEY_LENGTH = 32
+# A temporary file this old was left by a writer that crashed or was killed
+STALE_TMP_SECONDS = 60
+
+
+def default_cache_dir() -> Path:
+    base = os.environ.get('XDG_CACHE_HOME')
+    base = Path(base) if base else Path.home() / ".cache"
+    return base / "i3-shortcut-viewer"
+
+
+def settings_key(config, theme, width: int) -> dict:
+    """The subset of settings that affects parsing and layout; width is the
+    text area's width in pixels."""
+    return {
+        'wrap_command': bool(config.wrap_command),
+        'width': width,
+        'font_size': config.font_size,
+        'header_font_size': config.header_font_size,
+        'font_family': theme.font_family,
+    }
+
+
+class LayoutCache:
+    """On-disk cache of parsed shortcut groups and their laid-out document.
+
+    Entries are keyed by the shortcuts file's content hash plus the layout
+    settings, so an edit to either simply misses and the stale entry ages out.
+    Files pulled in through include directives, and the directories their
+    patterns were matched in, are recorded with their mtime and size, and an
+    entry is stale as soon as one of them changes. A new file that a glob
+    include would match therefore makes the entry stale too.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None,
+                 max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(content: bytes, settings: dict) -> Tuple[str, str]:
+        content_hash = hashlib.sha256(content).hexdigest()
+        return LayoutCache.hash_key(content_hash, settings), content_hash
+
+    @staticmethod
+    def hash_key(content_hash: str, settings: dict) -> str:
+        """The key for content already hashed, e.g. when the settings changed
+        between the lookup and the store."""
+        blob = json.dumps([CACHE_VERSION, content_hash, settings], sort_keys=True)
+        return hashlib.sha256(blob.encode()).hexdigest()[:KEY_LENGTH]
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def load(self, key: str, content_hash: str) -> Optional[Tuple[List[ShortcutGroup], Document, List[Path]]]:
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            self._discard(path)
+            return None
+
+        try:
+            if (data['version'] != CACHE_VERSION or data['key'] != key
+                    or data['content_hash'] != content_hash):
+                self._discard(path)
+                return None
+
+            dependencies = [Path(p) for p, _, _ in data['dependencies']]
+            signature = tuple(None if mtime is None else (mtime, size)
+                              for _, mtime, size in data['dependencies'])
+            if file_signature(dependencies) != signature:
+                self._discard(path)
+                return None
+
+            groups = []
+            for name, shortcuts in data['groups']:
+                group = ShortcutGroup(str(name))
+                for keybinding, command, source_file, source_line, is_exec, mode in shortcuts:
+                    source = (source_file, source_line) if source_file else None
+                    group.add_shortcut(str(keybinding), str(command), source, bool(is_exec), str(mode))
+                groups.append(group)
+            document = Document.from_dict(data['document'], groups)
+        except (KeyError, TypeError, ValueError):
+            self._discard(path)
+            return None
+
+        try:
+            # Refresh the mtime so eviction is least-recently-used
+            os.utime(path)
+        except OSError:
+            pass
+
+        return groups, document, dependencies
+
+    def store(self, key: str, content_hash: str, groups: List[ShortcutGroup], document: Document,
+              dependencies: List[Path] = ()):
+        signature = file_signature(dependencies)
+        data = {
+            'version': CACHE_VERSION,
+            'key': key,
+            'content_hash': content_hash,
+            'dependencies': [[str(p), s[0] if s else None, s[1] if s else None]
+                             for p, s in zip(dependencies, signature)],
+            'groups': [
+                [group.name, [[modifiers + key, command, source_file, source_line or None, is_exec, mode]
+                              for modifiers, key, command, source_file, source_line, is_exec, mode
+                              in zip(group.modifiers, group.keys, group.commands, group.source_files,
+                                     group.source_lines, group.execs, group.modes)]]
+                for group in groups
+            ],
+            'document': document.to_dict(),
+        }
+
+        path = self._entry_path(key)
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except OSError:
+            # E.g. a full disk; don't leave a partial file behind
+            self._discard(tmp_path)
+            return
+
+        self.evict()
+
+    def evict(self):
+        self.sweep_tmp()
+        try:
+            entries = []
+            for path in self.cache_dir.glob("*.json"):
+                # Other files share the directory, e.g. the compiled theme
+                if len(path.stem) != KEY_LENGTH:
+                    continue
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        except OSError:
+            return
+
+        entries.sort(reverse=True)
+        total = 0
+        for count, (_, size, path) in enumerate(entries):
+            total += size
+            if count >= self.max_entries or total > self.max_bytes:
+                self._discard(path)
+
+    def sweep_tmp(self):
+        """Remove temporary files left behind by writers that died mid-write."""
+        cutoff = time.time() - STALE_TMP_SECONDS
+        try:
+            for path in self.cache_dir.glob("*.tmp*"):
+                try:
+                    if path.stat().st_mtime < cutoff:
+                        path.unlink()
+                except OSError:
+                    continue
+        except OSError:
+            pass
+
+    def _discard(self, path: Path):
+        try:
+            path.unlink()
+        except OSError:
+            pass
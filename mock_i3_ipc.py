@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""A stand-in for i3's IPC socket, for trying the IPC binding source without i3.
+
+It answers GET_VERSION, GET_CONFIG and SUBSCRIBE like i3 does and sends a
+config event to subscribers on reload(). From the command line it serves
+the given files as i3's included configs and reloads them on SIGHUP:
+
+    ./mock_i3_ipc.py --socket /tmp/mock-i3.sock ~/.config/i3/shortcuts
+    I3SOCK=/tmp/mock-i3.sock ./i3-shortcuts-viewer
+    kill -HUP <pid>    # like `i3-msg reload`
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import threading
+from pathlib import Path
+from typing import List
+
+from i3_ipc import (EVENT_MASK, GET_CONFIG, GET_VERSION, HEADER, I3IpcError, SUBSCRIBE,
+                    pack_message, recv_exact)
+
+# The viewer treats any event on its subscription as a reload, so these only
+# need EVENT_MASK set to be told apart from replies
+EVENT_TYPES = {'shutdown': EVENT_MASK | 6, 'config': EVENT_MASK | 9}
+
+
+class MockI3Server:
+    def __init__(self, path: Path, files: List[Path], config: str = ""):
+        self.path = Path(path)
+        self.files = [Path(f) for f in files]
+        self.config = config
+        self.included = []
+        self.sock = None
+        self.subscribers = {}  # client socket -> subscribed event names
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.load()
+
+    def load(self):
+        included = []
+        for path in self.files:
+            try:
+                text = path.read_text(errors='replace')
+            except OSError:
+                continue
+            included.append({'path': str(path), 'raw_contents': text, 'variable_replaced_contents': text})
+        self.included = included
+
+    def start(self):
+        if self.path.exists():
+            self.path.unlink()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(str(self.path))
+        self.sock.listen(8)
+        threading.Thread(target=self.accept_loop, daemon=True).start()
+        return self
+
+    def accept_loop(self):
+        while True:
+            try:
+                client, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self.serve, args=(client,), daemon=True).start()
+
+    def serve(self, client: socket.socket):
+        try:
+            while True:
+                magic, length, message_type = HEADER.unpack(recv_exact(client, HEADER.size))
+                payload = recv_exact(client, length)
+                self.requests += 1
+                self.send(client, message_type, self.reply(client, message_type, payload))
+        except (OSError, I3IpcError):
+            pass
+        finally:
+            with self.lock:
+                self.subscribers.pop(client, None)
+            client.close()
+
+    def reply(self, client: socket.socket, message_type: int, payload: bytes):
+        if message_type == GET_CONFIG:
+            return {'config': self.config, 'included_configs': self.included}
+        if message_type == GET_VERSION:
+            return {'major': 4, 'minor': 24, 'patch': 0, 'human_readable': "4.24 (mock)"}
+        if message_type == SUBSCRIBE:
+            try:
+                events = json.loads(payload)
+            except ValueError:
+                return {'success': False}
+            with self.lock:
+                self.subscribers[client] = set(events)
+            return {'success': True}
+        return {'success': False, 'error': "not supported by the mock"}
+
+    def send(self, client: socket.socket, message_type: int, payload):
+        with self.lock:
+            client.sendall(pack_message(message_type, json.dumps(payload).encode()))
+
+    def reload(self):
+        """Re-read the files and notify subscribers, like `i3-msg reload`."""
+        self.load()
+        self.emit('config', {'change': 'reload'})
+
+    def emit(self, event: str, payload: dict):
+        with self.lock:
+            clients = [client for client, events in self.subscribers.items() if event in events]
+        for client in clients:
+            try:
+                self.send(client, EVENT_TYPES[event], payload)
+            except OSError:
+                pass
+
+    def stop(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        with self.lock:
+            for client in self.subscribers:
+                try:
+                    client.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Serve files over a mock i3 IPC socket")
+    arg_parser.add_argument('--socket', default=f"/tmp/mock-i3-{os.getuid()}.sock")
+    arg_parser.add_argument('files', nargs='+', help="files to report as i3's included configs")
+    args = arg_parser.parse_args(argv)
+
+    server = MockI3Server(Path(args.socket), [Path(f).resolve() for f in args.files]).start()
+    signal.signal(signal.SIGHUP, lambda signum, frame: server.reload())
+    print(f"I3SOCK={server.path}", flush=True)
+    try:
+        while True:
+            signal.pause()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,81 +1,477 @@
 #!/usr/bin/env python3
 
+import glob
+import mmap
+import os
+import sys
+from array import array
 from pathlib import Path
-from typing import List, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+def split_keybinding(keybinding: str) -> Tuple[str, str]:
+    """("$mod+Shift+", "Return") for "$mod+Shift+Return"; the prefix is interned."""
+    # A trailing "+" is the key itself, not a separator
+    split = keybinding.rfind('+', 0, len(keybinding) - 1) + 1
+    return sys.intern(keybinding[:split]), keybinding[split:]
+
+
+def search_key(keybinding: str, command: str) -> str:
+    """Lower-cased "keybinding<TAB>command", the text of the row's first line.
+
+    lower() rather than casefold(), which can change lengths and so break
+    the mapping from match offsets back to columns.
+    """
+    return f"{keybinding}\t{command}".lower()
+
+
+# The mode i3 starts in; bindings outside a `mode` block belong to it
+DEFAULT_MODE = 'default'
 
 
 class ShortcutGroup:
+    """A named group of shortcuts, stored column by column.
+
+    Row i is modifiers[i] + keys[i] bound to commands[i]. Modifier prefixes
+    and source file names repeat across thousands of rows and are interned,
+    line numbers live in an array, and there is no per-row object. The
+    document, search index and click handling refer to these same strings.
+    """
+
+    __slots__ = ('name', 'modifiers', 'keys', 'commands', 'search_keys', 'execs', 'modes',
+                 'source_files', 'source_lines')
+
     def __init__(self, name: str):
         self.name = name
-        self.shortcuts = []
+        self.modifiers = []
+        self.keys = []
+        self.commands = []
+        # search_key() of each row
+        self.search_keys = []
+        # 1 where the binding ran its command with exec, 0 for an i3 command
+        self.execs = array('B')
+        # i3 binding mode each shortcut is active in, interned
+        self.modes = []
+        # File and line each shortcut came from; None and 0 when unknown
+        self.source_files = []
+        self.source_lines = array('I')
+
+    def __len__(self):
+        return len(self.commands)
+
+    def add_shortcut(self, keybinding: str, command: str, source: Optional[Tuple[str, int]] = None,
+                     is_exec: bool = True, mode: str = DEFAULT_MODE):
+        modifiers, key = split_keybinding(keybinding)
+        self.modifiers.append(modifiers)
+        self.keys.append(key)
+        self.commands.append(command)
+        self.search_keys.append(search_key(keybinding, command))
+        self.execs.append(is_exec)
+        self.modes.append(sys.intern(mode))
+        if source and source[0]:
+            self.source_files.append(sys.intern(source[0]))
+            self.source_lines.append(source[1])
+        else:
+            self.source_files.append(None)
+            self.source_lines.append(0)
+
+    def keybinding(self, index: int) -> str:
+        return self.modifiers[index] + self.keys[index]
+
+    @property
+    def shortcuts(self) -> List[Tuple[str, str]]:
+        """(keybinding, command) pairs, built on demand."""
+        return [(modifiers + key, command)
+                for modifiers, key, command in zip(self.modifiers, self.keys, self.commands)]
+
+    @property
+    def sources(self) -> List[Optional[Tuple[str, int]]]:
+        return [(name, line) if name is not None else None
+                for name, line in zip(self.source_files, self.source_lines)]
+
+
+class SourceFile:
+    """The parse of a single file: group headers, bindings and includes in order."""
+
+    def __init__(self, path: Path, mtime_ns: int, size: int, events: list):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        # ('group', name) | ('bind', keybinding, command, lineno, is_exec, mode)
+        # | ('include', pattern, lineno)
+        self.events = events
+
+
+class IncludeGraph:
+    def __init__(self, root: Optional[Path] = None):
+        self.root = root
+        # Every file reached from root, root first, in discovery order
+        self.files = [root] if root else []
+        # (including file, lineno) -> files that include directive expanded to
+        self.includes = {}
+        # (including file, included file) pairs that were skipped as cycles
+        self.cycles = []
+        # Directories include patterns were matched in; a file created in
+        # one of them can change what an include expands to
+        self.directories = []
+
+    def add_include(self, pattern: str, base_dir: Path):
+        for directory in include_directories(expand_include(pattern, base_dir)):
+            if directory not in self.directories:
+                self.directories.append(directory)
+
+    def dependencies(self) -> List[Path]:
+        """Every path besides the root whose change can change the parse."""
+        return self.files[1:] + self.directories
+
+
+# Files at least this large are scanned through mmap instead of buffered reads
+MMAP_THRESHOLD = 4 * 1024 * 1024
 
-    def add_shortcut(self, keybinding: str, command: str):
-        self.shortcuts.append((keybinding, command))
+# Parsed files keyed by resolved path; reused while mtime and size are unchanged
+_file_cache: Dict[Path, SourceFile] = {}
+# Parsed text supplied by i3 keyed by path; reused while the text is unchanged
+_text_cache: Dict[Path, Tuple[str, list]] = {}
 
 
-def parse_shortcuts_file(filepath: str = None) -> List[ShortcutGroup]:
+def default_shortcuts_path() -> Path:
+    return Path.home() / ".config" / "i3" / "shortcuts"
+
+
+def parse_shortcuts_file(filepath: str = None, texts: Optional[Dict[Path, str]] = None) -> List[ShortcutGroup]:
+    groups, _ = parse_include_graph(filepath, texts)
+    return groups
+
+
+def resolve_root(filepath: str = None) -> Path:
     if filepath is None:
-        filepath = Path.home() / ".config" / "i3" / "shortcuts"
+        filepath = default_shortcuts_path()
     else:
         filepath = Path(filepath)
 
     if not filepath.exists():
         raise FileNotFoundError(f"Shortcuts file not found: {filepath}")
 
-    groups = []
-    current_group = ShortcutGroup("General")
+    return filepath.resolve()
 
-    with open(filepath, 'r') as f:
-        for line in f:
-            line = line.rstrip()
 
-            if not line.strip():
-                continue
+def parse_include_graph(filepath: str = None,
+                        texts: Optional[Dict[Path, str]] = None) -> Tuple[List[ShortcutGroup], IncludeGraph]:
+    """Parse a shortcuts file and everything it includes.
+
+    Include paths may use ~, environment variables and glob patterns, and are
+    resolved relative to the directory of the file containing the include.
+    Like i3, each file is included at most once, which also breaks cycles.
+    Unchanged files are served from a cache keyed by mtime and size, and the
+    files of each level of the include tree are read concurrently.
 
-            if line.startswith('#'):
-                comment_text = line.lstrip('#').strip()
-                if comment_text:
-                    if current_group.shortcuts:
-                        groups.append(current_group)
-                    current_group = ShortcutGroup(comment_text)
+    texts maps resolved paths to the contents i3 has loaded (see i3_ipc.py).
+    When given, files are parsed from it instead of the disk, and includes
+    only expand to files i3 has loaded.
+    """
+    root = resolve_root(filepath)
+    graph = IncludeGraph(root)
+    sources = {}
+    seen = {root}
+    pending = [root]
+
+    while pending:
+        sources.update(scan_files(pending) if texts is None else scan_texts(pending, texts))
+        discovered = []
+        for path in pending:
+            source = sources.get(path)
+            if source is None:
                 continue
+            for event in source.events:
+                if event[0] != 'include':
+                    continue
+                children = resolve_include(event[1], path.parent, texts)
+                graph.includes[(path, event[2])] = children
+                graph.add_include(event[1], path.parent)
+                for child in children:
+                    if child not in seen:
+                        seen.add(child)
+                        discovered.append(child)
+                        graph.files.append(child)
+        pending = discovered
+
+    def events_for(path):
+        source = sources.get(path)
+        return source.events if source else ()
+
+    groups = list(merge_groups(root, events_for, graph, texts))
+    # Files that vanished between discovery and reading are not dependencies
+    graph.files = [path for path in graph.files if path in sources]
+    return groups, graph
+
+
+def iter_shortcut_groups(filepath: str = None, graph: IncludeGraph = None,
+                         texts: Optional[Dict[Path, str]] = None) -> Iterator[ShortcutGroup]:
+    """Yield groups as soon as they are complete, for progressive rendering.
+
+    Files are read lazily as their include directives are reached, so the
+    first groups arrive before the rest of the include tree has been read.
+    If graph is given it is filled in as the include tree is discovered.
+    texts is as for parse_include_graph.
+    """
+    root = resolve_root(filepath)
+    if graph is None:
+        graph = IncludeGraph(root)
+    graph.root = root
+    graph.files = [root]
+    graph.directories = []
+
+    if texts is None:
+        return merge_groups(root, iter_file_events, graph)
+    return merge_groups(root, lambda path: text_events(path, texts), graph, texts)
+
+
+def merge_groups(root: Path, events_for: Callable[[Path], Iterable[tuple]],
+                 graph: IncludeGraph, texts: Optional[Dict[Path, str]] = None) -> Iterator[ShortcutGroup]:
+    state = {'group': ShortcutGroup("General")}
+    yield from merge_source(root, events_for, graph, state, [root], {root}, texts)
+    if len(state['group']):
+        yield state['group']
+
+
+def merge_source(path: Path, events_for: Callable[[Path], Iterable[tuple]], graph: IncludeGraph,
+                 state: dict, stack: List[Path], emitted: set,
+                 texts: Optional[Dict[Path, str]] = None) -> Iterator[ShortcutGroup]:
+    name = sys.intern(str(path))
+    for event in events_for(path):
+        kind = event[0]
+        if kind == 'group':
+            if len(state['group']):
+                yield state['group']
+            state['group'] = ShortcutGroup(event[1])
+        elif kind == 'bind':
+            state['group'].add_shortcut(event[1], event[2], (name, event[3]), event[4], event[5])
+        else:
+            key = (path, event[2])
+            if key not in graph.includes:
+                graph.includes[key] = resolve_include(event[1], path.parent, texts)
+                graph.add_include(event[1], path.parent)
+            for child in graph.includes[key]:
+                if child in stack:
+                    graph.cycles.append((path, child))
+                    continue
+                if child in emitted:
+                    continue
+                emitted.add(child)
+                if child not in graph.files:
+                    graph.files.append(child)
+                stack.append(child)
+                yield from merge_source(child, events_for, graph, state, stack, emitted, texts)
+                stack.pop()
+
+
+def expand_include(pattern: str, base_dir: Path) -> str:
+    """An include pattern with ~ and variables expanded, made absolute."""
+    pattern = os.path.expanduser(os.path.expandvars(pattern.strip().strip('"\'')))
+    if not os.path.isabs(pattern):
+        pattern = str(base_dir / pattern)
+    return pattern
+
 
-            if line.strip().startswith('bindsym'):
-                keybinding, command = parse_bindsym_line(line)
-                if keybinding and command:
-                    current_group.add_shortcut(keybinding, command)
+def include_directories(pattern: str) -> List[Path]:
+    """The directories whose listings decide what an expanded pattern matches."""
+    directory = os.path.dirname(pattern)
+    if not glob.has_magic(directory):
+        return [Path(directory).resolve()]
+    matches = [Path(match).resolve() for match in sorted(glob.glob(directory)) if os.path.isdir(match)]
+    return include_directories(directory) + matches
 
-    if current_group.shortcuts:
+
+def resolve_include(pattern: str, base_dir: Path, texts: Optional[Dict[Path, str]] = None) -> List[Path]:
+    pattern = expand_include(pattern, base_dir)
+    paths = [Path(match).resolve() for match in sorted(glob.glob(pattern)) if os.path.isfile(match)]
+    if texts is not None:
+        paths = [path for path in paths if path in texts]
+    return paths
+
+
+def scan_files(paths: List[Path]) -> Dict[Path, SourceFile]:
+    if len(paths) == 1:
+        source = scan_file(paths[0])
+        return {paths[0]: source} if source else {}
+
+    # Brings in logging and more; only include-heavy configs get here
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=min(8, len(paths))) as executor:
+        scanned = executor.map(scan_file, paths)
+    return {path: source for path, source in zip(paths, scanned) if source}
+
+
+def scan_file(path: Path) -> Optional[SourceFile]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+
+    cached = _file_cache.get(path)
+    if cached and cached.mtime_ns == st.st_mtime_ns and cached.size == st.st_size:
+        return cached
+
+    try:
+        events = list(iter_scan_lines(iter_file_lines(path, st.st_size)))
+    except OSError:
+        return None
+
+    source = SourceFile(path, st.st_mtime_ns, st.st_size, events)
+    _file_cache[path] = source
+    return source
+
+
+def scan_texts(paths: List[Path], texts: Dict[Path, str]) -> Dict[Path, SourceFile]:
+    return {path: SourceFile(path, 0, len(texts[path]), text_events(path, texts))
+            for path in paths if path in texts}
+
+
+def text_events(path: Path, texts: Dict[Path, str]) -> list:
+    text = texts.get(path)
+    if text is None:
+        return []
+    cached = _text_cache.get(path)
+    if cached and cached[0] == text:
+        return cached[1]
+    events = scan_lines(text.splitlines())
+    _text_cache[path] = (text, events)
+    return events
+
+
+def iter_file_events(path: Path) -> Iterator[tuple]:
+    """Like scan_file, but yields events while the file is still being read."""
+    try:
+        st = path.stat()
+    except OSError:
+        return
+
+    cached = _file_cache.get(path)
+    if cached and cached.mtime_ns == st.st_mtime_ns and cached.size == st.st_size:
+        yield from cached.events
+        return
+
+    events = []
+    try:
+        for event in iter_scan_lines(iter_file_lines(path, st.st_size)):
+            events.append(event)
+            yield event
+    except OSError:
+        return
+
+    _file_cache[path] = SourceFile(path, st.st_mtime_ns, st.st_size, events)
+
+
+def iter_file_lines(path: Path, size: int) -> Iterator[str]:
+    """Lines of a file; large files are scanned through a read-only mmap."""
+    if size < MMAP_THRESHOLD:
+        with open(path, 'r', errors='replace') as f:
+            yield from f
+        return
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for raw in iter(mm.readline, b''):
+            yield raw.decode('utf-8', errors='replace')
+
+
+def scan_lines(lines: Iterable[str]) -> list:
+    return list(iter_scan_lines(lines))
+
+
+def iter_scan_lines(lines: Iterable[str]) -> Iterator[tuple]:
+    mode = DEFAULT_MODE
+    for lineno, line in enumerate(lines, 1):
+        line = line.rstrip()
+
+        if not line.strip():
+            continue
+
+        if line.startswith('#'):
+            comment_text = line.lstrip('#').strip()
+            if comment_text:
+                yield ('group', comment_text)
+            continue
+
+        stripped = line.strip()
+        if stripped.startswith('bindsym'):
+            keybinding, command, is_exec = parse_binding(line)
+            if keybinding and command:
+                yield ('bind', keybinding, command, lineno, is_exec, mode)
+        elif stripped == '}':
+            mode = DEFAULT_MODE
+        elif stripped.startswith('mode') and stripped[4:5].isspace() and stripped.endswith('{'):
+            mode = parse_mode_name(stripped[4:-1]) or DEFAULT_MODE
+        elif stripped.startswith('include') and stripped[7:8].isspace():
+            yield ('include', stripped[8:].strip(), lineno)
+
+
+def parse_shortcuts_lines(lines: Iterable[str], filename: str = None) -> List[ShortcutGroup]:
+    """Parse shortcuts from lines of text, without following includes."""
+    groups = []
+    current_group = ShortcutGroup("General")
+
+    for event in scan_lines(lines):
+        if event[0] == 'group':
+            if len(current_group):
+                groups.append(current_group)
+            current_group = ShortcutGroup(event[1])
+        elif event[0] == 'bind':
+            current_group.add_shortcut(event[1], event[2], (filename, event[3]) if filename else None,
+                                       event[4], event[5])
+
+    if len(current_group):
         groups.append(current_group)
 
     return groups
 
 
+def parse_mode_name(text: str) -> str:
+    """The name in `mode [--pango_markup] "name" {`, given what lies between."""
+    name = text.strip()
+    if name.startswith('--pango_markup'):
+        name = name[14:].strip()
+    if len(name) > 1 and name[0] == name[-1] and name[0] in '"\'':
+        name = name[1:-1]
+    return sys.intern(name)
+
+
 def parse_bindsym_line(line: str) -> Tuple[str, str]:
+    keybinding, command, _ = parse_binding(line)
+    return keybinding, command
+
+
+def parse_binding(line: str) -> Tuple[str, str, bool]:
+    """(keybinding, command, whether the command is run with exec).
+
+    exec and its --no-startup-id are stripped, so the command is what a
+    shell would run; any other command is an i3 command and is kept as is.
+    """
     line = line.strip()
     if not line.startswith('bindsym'):
-        return None, None
+        return None, None, False
 
     line = line[7:].strip()
 
     parts = line.split(None, 1)
     if len(parts) < 2:
-        return None, None
+        return None, None, False
 
     keybinding = parts[0]
-    command = parts[1]
+    words = parts[1].split(None, 1)
+    if words[0] != 'exec':
+        return keybinding, parts[1].strip(), False
 
-    if command.startswith('exec'):
-        command = command[4:].strip()
-
-    command = command.replace('--no-startup-id', '').strip()
+    command = words[1] if len(words) > 1 else ""
+    words = command.split(None, 1)
+    if words and words[0] == '--no-startup-id':
+        command = words[1] if len(words) > 1 else ""
 
     if command.startswith('"') and command.endswith('"'):
         command = command[1:-1]
 
     command = command.rstrip('&').strip()
 
-    return keybinding, command
+    return keybinding, command, True
 
 
 if __name__ == "__main__":
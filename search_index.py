@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+
+import re
+from array import array
+from typing import Callable, List, Optional, Tuple
+
+from document import WRAP_INDICATOR, Document
+
+MODES = ('substring', 'regex', 'fuzzy')
+
+# Command lines after the first of a wrapped row start after the indicator
+CONTINUATION_COL = 1 + len(WRAP_INDICATOR)
+
+
+def trigrams(text: str):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """Trigram index over the searchable fields of a laid-out document.
+
+    Every group name, keybinding and command line is a segment with a known
+    document position. Substring queries intersect the posting lists of their
+    trigrams and only verify those candidates; a query that extends the
+    previous one only re-checks the segments that matched before. Matches are
+    (line, col, length) in document coordinates and never span two segments.
+
+    A segment is a span texts[id][starts[id]:ends[id]]. The keybinding and
+    the command of an unwrapped row are both spans of the row's search key,
+    which is shared with the ShortcutGroup rather than copied; only group
+    names and wrapped command lines get lower-cased strings of their own.
+    """
+
+    def __init__(self, document: Document):
+        self.lines = array('I')
+        self.cols = array('I')
+        self.texts = []
+        self.starts = array('I')
+        self.ends = array('I')
+        self.postings = {}
+        self.headers = 0
+        self.rows = 0
+        self.extend(document)
+
+    def extend(self, document: Document):
+        """Index headers and rows appended to the document since the last call.
+
+        Segments are only ever appended, so a search running on another
+        thread keeps seeing a consistent prefix of the index.
+        """
+        segments = []
+        headers = document.tags.get('header')
+        if headers is not None:
+            for line in headers.start_lines[self.headers:]:
+                text = document.lines[line - 1].lower()
+                segments.append((line, 0, text, 0, len(text)))
+            self.headers = len(headers)
+
+        rows = document.rows
+        for start, end, split, key in zip(rows.starts[self.rows:], rows.ends[self.rows:],
+                                          rows.splits[self.rows:], rows.search_keys[self.rows:]):
+            segments.append((start, 0, key, 0, split))
+            if start == end:
+                segments.append((start, split + 1, key, split + 1, len(key)))
+                continue
+            for line in range(start, end + 1):
+                text = document.lines[line - 1]
+                col = split + 1 if line == start else CONTINUATION_COL
+                segments.append((line, col, text[col:].lower(), 0, len(text) - col))
+        self.rows = len(rows)
+        segments.sort(key=lambda segment: segment[:2])
+
+        for segment_id, (line, col, text, start, end) in enumerate(segments, len(self.texts)):
+            # Store the segment before posting it, so readers never see a dangling id
+            self.lines.append(line)
+            self.cols.append(col)
+            self.starts.append(start)
+            self.ends.append(end)
+            self.texts.append(text)
+            for trigram in trigrams(text[start:end]):
+                posting = self.postings.get(trigram)
+                if posting is None:
+                    posting = self.postings[trigram] = array('I')
+                posting.append(segment_id)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def candidates(self, needle: str, mode: str, previous: Optional['SearchResult']):
+        if (previous is not None and previous.mode == mode and mode != 'regex'
+                and previous.indexed == len(self.texts) and needle.startswith(previous.needle)):
+            # Every segment matching the extended query matched its prefix too
+            return previous.segments
+
+        if mode == 'substring' and len(needle) >= 3:
+            postings = []
+            for trigram in trigrams(needle):
+                posting = self.postings.get(trigram)
+                if posting is None:
+                    return []
+                postings.append(posting)
+            postings.sort(key=len)
+            result = set(postings[0])
+            for posting in postings[1:]:
+                result.intersection_update(posting)
+                if not result:
+                    return []
+            return sorted(result)
+
+        return range(len(self.texts))
+
+    def search(self, query: str, mode: str = 'substring', previous: Optional['SearchResult'] = None,
+               cancelled: Optional[Callable[[], bool]] = None) -> Optional['SearchResult']:
+        """Match query against the index, narrowing from a previous result.
+
+        The index is only ever appended to, so this is safe to call from a
+        worker thread. Returns None if cancelled() became true part way
+        through.
+        Raises re.error for an invalid regex.
+        """
+        needle = query.lower()
+        indexed = len(self.texts)
+        if not query:
+            return SearchResult(query, mode, needle, [], [], indexed)
+
+        matcher = None
+        if mode == 'regex':
+            matcher = re.compile(query, re.IGNORECASE)
+
+        matched_segments = []
+        matches = []
+        for checked, segment_id in enumerate(self.candidates(needle, mode, previous)):
+            if cancelled is not None and checked % 256 == 0 and cancelled():
+                return None
+
+            text = self.texts[segment_id]
+            start, end = self.starts[segment_id], self.ends[segment_id]
+            if mode == 'regex':
+                # Sliced, so ^ anchors at the start of the segment
+                spans = [(start + m.start(), m.end() - m.start())
+                         for m in matcher.finditer(text[start:end]) if m.end() > m.start()]
+            elif mode == 'fuzzy':
+                span = fuzzy_span(needle, text, start, end)
+                spans = [span] if span else []
+            else:
+                spans = substring_spans(needle, text, start, end)
+
+            if spans:
+                matched_segments.append(segment_id)
+                line, col = self.lines[segment_id], self.cols[segment_id] - start
+                for position, length in spans:
+                    matches.append((line, col + position, length))
+
+        return SearchResult(query, mode, needle, matches, matched_segments, indexed)
+
+
+class SearchResult:
+    def __init__(self, query: str, mode: str, needle: str,
+                 matches: List[Tuple[int, int, int]], segments: List[int], indexed: int):
+        self.query = query
+        self.mode = mode
+        self.needle = needle
+        # (line, col, length) in document order
+        self.matches = matches
+        # Ids of the segments that matched, for narrowing the next query
+        self.segments = segments
+        # Size of the index when searched; narrowing is only valid at that size
+        self.indexed = indexed
+
+
+def substring_spans(needle: str, text: str, lo: int = 0, hi: int = None) -> List[Tuple[int, int]]:
+    """(position, length) of each occurrence of needle in text[lo:hi]."""
+    if hi is None:
+        hi = len(text)
+    spans = []
+    start = text.find(needle, lo, hi)
+    while start != -1:
+        spans.append((start, len(needle)))
+        start = text.find(needle, start + len(needle), hi)
+    return spans
+
+
+def fuzzy_span(needle: str, text: str, lo: int = 0, hi: int = None) -> Optional[Tuple[int, int]]:
+    """Span covering the first in-order occurrence of needle's characters in text[lo:hi]."""
+    if hi is None:
+        hi = len(text)
+    start = -1
+    pos = lo
+    for ch in needle:
+        pos = text.find(ch, pos, hi)
+        if pos == -1:
+            return None
+        if start == -1:
+            start = pos
+        pos += 1
+    return start, pos - start
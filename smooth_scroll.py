@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+import math
+import time
+from collections import deque
+from typing import Callable
+
+from tracing import tracer
+
+
+class SmoothScroller:
+    """Momentum scrolling measured in pixels and integrated against the clock.
+
+    Each impulse adds velocity so that, left alone, the view glides exactly
+    the requested distance. Velocity decays exponentially with elapsed time,
+    and every frame advances by the integral over the time that really
+    passed, so a late or dropped frame makes a longer step instead of a
+    slower scroll. Speed therefore doesn't depend on document length. The
+    timer only runs while the view is moving.
+    """
+
+    def __init__(self, root, scroll: Callable[[int], bool], frame_ms: int = 16,
+                 time_constant: float = 0.1, settle_speed: float = 20.0):
+        self.root = root
+        # Scrolls the view by a number of pixels; returns False if it couldn't move
+        self.scroll = scroll
+        self.frame_ms = frame_ms
+        self.time_constant = time_constant
+        self.settle_speed = settle_speed  # pixels per second
+
+        self.velocity = 0.0
+        self.remainder = 0.0  # Sub-pixel distance carried to the next frame
+        self.last_frame = None
+        self.frame_id = None
+
+        # Recent frame intervals in seconds, for tuning
+        self.intervals = deque(maxlen=512)
+
+    @property
+    def running(self) -> bool:
+        return self.frame_id is not None
+
+    def impulse(self, distance: float, limit: float = None):
+        """Glide by distance pixels (negative scrolls up), on top of any motion.
+
+        With limit, the pending glide distance is capped at limit pixels.
+        """
+        if not distance:
+            return
+        if (distance > 0) != (self.velocity > 0):
+            # Reversing direction cancels the remaining glide
+            self.velocity = 0.0
+            self.remainder = 0.0
+        self.velocity += distance / self.time_constant
+        if limit is not None:
+            cap = limit / self.time_constant
+            self.velocity = max(-cap, min(cap, self.velocity))
+
+        if self.frame_id is None:
+            self.last_frame = time.monotonic()
+            self.frame_id = self.root.after(self.frame_ms, self.frame)
+
+    def frame(self):
+        now = time.monotonic()
+        elapsed = now - self.last_frame
+        self.intervals.append(elapsed)
+        if tracer.enabled:
+            tracer.observe('scroll frame interval', elapsed, self.last_frame)
+        self.last_frame = now
+
+        # Exact distance covered while decaying over the elapsed time
+        decay = math.exp(-elapsed / self.time_constant)
+        self.remainder += self.velocity * self.time_constant * (1 - decay)
+        self.velocity *= decay
+
+        pixels = int(self.remainder)
+        self.remainder -= pixels
+        moved = self.scroll(pixels) if pixels else True
+
+        if not moved or abs(self.velocity) < self.settle_speed:
+            self.stop()
+            return
+
+        delay = self.frame_ms - (time.monotonic() - now) * 1000
+        self.frame_id = self.root.after(max(1, int(delay)), self.frame)
+
+    def stop(self):
+        if self.frame_id is not None:
+            self.root.after_cancel(self.frame_id)
+            self.frame_id = None
+        self.velocity = 0.0
+        self.remainder = 0.0
+        self.last_frame = None
+
+    def frame_stats(self) -> dict:
+        """Summary of recent frame intervals in milliseconds."""
+        if not self.intervals:
+            return {'frames': 0}
+        ordered = sorted(self.intervals)
+        return {
+            'frames': len(ordered),
+            'mean_ms': sum(ordered) / len(ordered) * 1000,
+            'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+            'max_ms': ordered[-1] * 1000,
+            'late': sum(1 for interval in ordered if interval * 1000 > self.frame_ms * 1.5),
+        }
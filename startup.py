@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Theme, config and shortcuts read on worker threads while Tk starts.
+
+None of this needs Tk. The compiled theme (or the TOML files behind it)
+and the shortcuts file are read as soon as the process starts, and the
+config i3 has loaded is fetched over IPC once the config asks for it; the
+layout cache entry is decoded once the viewer knows how wide its text
+area is. _tkinter releases the GIL while Tcl runs, so the workers make
+progress while tk.Tk() connects to the display and the widgets are built.
+"""
+
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from i3_ipc import connect, texts_content
+from layout_cache import LayoutCache
+from parser import default_shortcuts_path
+from theme_cache import load_theme
+from tracing import tracer
+
+
+class Task:
+    """A call running on its own thread. result() waits for it and
+    re-raises anything it raised, on the caller's thread."""
+
+    def __init__(self, name: str, func, *args):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.value = None
+        self.error = None
+        self.duration = 0.0
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self.run, name=name, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        start = time.monotonic()
+        try:
+            self.value = self.func(*self.args)
+        except BaseException as e:
+            self.error = e
+        finally:
+            end = time.monotonic()
+            self.duration = end - start
+            tracer.span(f"{self.name} (worker)", start, end)
+            self.done.set()
+
+    def result(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+def read_shortcuts_file(path: Path) -> bytes:
+    if not path.exists():
+        raise FileNotFoundError(f"Shortcuts file not found: {path}")
+    return path.read_bytes()
+
+
+class StartupPipeline:
+    """Startup work handed to threads, then joined by the viewer.
+
+    Each result is only used once, by the first viewer built; later
+    rebuilds read everything themselves.
+    """
+
+    def __init__(self, script_dir: Optional[Path] = None):
+        self.script_dir = script_dir
+        self.tasks = []
+        self.theme_task = None
+        self.content_task = None
+        self.layout_task = None
+        self.i3_task = None
+        # Time the Tk thread spent blocked on a task
+        self.waited = 0.0
+
+    def run(self, name: str, func, *args) -> Task:
+        task = Task(name, func, *args)
+        self.tasks.append(task)
+        return task
+
+    def start(self):
+        self.theme_task = self.run('load_theme', load_theme, self.script_dir)
+        self.content_task = self.run('read shortcuts', read_shortcuts_file, default_shortcuts_path())
+        self.i3_task = self.run('i3 ipc connect', self.connect_i3)
+
+    def connect_i3(self):
+        # Only once the config is known to want it; None when it doesn't
+        _, config = self.theme_task.result()
+        return connect() if config.i3_ipc else None
+
+    def join(self, task: Task):
+        start = time.monotonic()
+        try:
+            return task.result()
+        finally:
+            self.waited += time.monotonic() - start
+
+    def theme(self):
+        """(theme, config), as load_theme() returns them."""
+        return self.join(self.theme_task)
+
+    def lookup_layout(self, texts: Optional[Dict[Path, str]], settings: dict):
+        """Start decoding the layout cache entry; texts are what i3 has
+        loaded, or None to use the file read at start()."""
+        self.layout_task = self.run('layout cache lookup', self.read_layout, texts, settings)
+
+    def read_layout(self, texts, settings):
+        # Raises for a missing file even when i3 has the texts, as cache_lookup does
+        content = self.content_task.result()
+        if texts is not None:
+            content = texts_content(texts)
+        cache = LayoutCache()
+        key, content_hash = cache.make_key(content, settings)
+        return cache, key, content_hash, cache.load(key, content_hash)
+
+    def layout(self):
+        """(cache, key, content_hash, cached entry or None), as ShortcutsViewer.cache_lookup."""
+        return self.join(self.layout_task)
+
+    def finish(self):
+        """Record how much of the workers' time the Tk thread didn't wait for."""
+        work = sum(task.duration for task in self.tasks if task.done.is_set())
+        if tracer.enabled:
+            tracer.observe('startup overlap saved', max(work - self.waited, 0.0))
+        return work - self.waited
@@ -0,0 +1,73 @@
+import select
+import time
+
+import pytest
+
+import parser
+
+
+class EventLoop:
+    """Enough of a Tk root for code that only uses after() and file handlers:
+    timers and readable files are dispatched by run(), on the test's thread."""
+
+    def __init__(self):
+        self.tk = self
+        self.handlers = {}
+        self.timers = {}
+        self.next_id = 0
+
+    def createfilehandler(self, file, mask, callback):
+        self.handlers[file] = callback
+
+    def deletefilehandler(self, file):
+        self.handlers.pop(file, None)
+
+    def after(self, ms, func, *args):
+        self.next_id += 1
+        self.timers[self.next_id] = (time.monotonic() + ms / 1000, func, args)
+        return self.next_id
+
+    def after_idle(self, func, *args):
+        return self.after(0, func, *args)
+
+    def after_cancel(self, after_id):
+        self.timers.pop(after_id, None)
+
+    def run(self, seconds: float, until=None):
+        """Dispatch events for up to seconds, or until until() is true."""
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline and not (until and until()):
+            if self.handlers:
+                readable, _, _ = select.select(list(self.handlers), [], [], 0.005)
+            else:
+                readable = []
+                time.sleep(0.002)
+            for file in readable:
+                callback = self.handlers.get(file)
+                if callback is not None:
+                    callback(file, 0)
+            now = time.monotonic()
+            for after_id, (when, func, args) in sorted(self.timers.items(), key=lambda item: item[1][0]):
+                if when <= now and self.timers.pop(after_id, None) is not None:
+                    func(*args)
+
+
+@pytest.fixture
+def loop():
+    return EventLoop()
+
+
+@pytest.fixture(autouse=True)
+def clear_parser_caches():
+    parser._file_cache.clear()
+    parser._text_cache.clear()
+    yield
+    parser._file_cache.clear()
+    parser._text_cache.clear()
+
+
+def write(path, text: str):
+    """Write text to path, creating its directory; returns the resolved path."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path.resolve()
@@ -0,0 +1,48 @@
+import pytest
+
+from background_search import BackgroundSearch
+from document import build_document
+from parser import parse_shortcuts_lines
+from search_index import SearchIndex
+
+TEXT = """# Apps
+bindsym $mod+Return exec alacritty
+bindsym $mod+d exec rofi -show drun
+"""
+
+
+@pytest.fixture
+def index():
+    return SearchIndex(build_document(parse_shortcuts_lines(TEXT.splitlines())))
+
+
+def test_only_the_last_query_is_delivered(loop, index):
+    results = []
+    search = BackgroundSearch(loop, lambda result, error: results.append((result, error)))
+    for query in ("r", "ro", "rof"):
+        search.submit(index, query, 'substring')
+    loop.run(2, until=lambda: results)
+    loop.run(0.1)
+    assert len(results) == 1
+    result, error = results[0]
+    assert (result.query, error) == ("rof", None)
+    assert len(result.matches) == 1
+
+
+def test_invalid_regex_is_reported(loop, index):
+    results = []
+    search = BackgroundSearch(loop, lambda result, error: results.append((result, error)))
+    search.submit(index, "(", 'regex')
+    loop.run(2, until=lambda: results)
+    result, error = results[0]
+    assert result is None and error is not None
+
+
+def test_flush_delivers_synchronously(loop, index):
+    results = []
+    search = BackgroundSearch(loop, lambda result, error: results.append(result))
+    search.submit(index, "mod", 'substring')
+    search.flush()
+    assert [len(result.matches) for result in results] == [2]
+    loop.run(0.2)
+    assert len(results) == 1
@@ -0,0 +1,59 @@
+import json
+import os
+
+import pytest
+
+from benchmark import TkEnvironment, compare_results, generate_shortcuts, main, summarize
+from parser import parse_shortcuts_file
+
+
+def results(**medians):
+    return {'results': {name: {'median_ms': ms} for name, ms in medians.items()}}
+
+
+def test_generated_file_parses_to_the_requested_size(tmp_path):
+    path = tmp_path / "shortcuts"
+    generate_shortcuts(path, 200, groups=10, seed=1)
+    groups = parse_shortcuts_file(path)
+    assert len(groups) == 10
+    assert sum(len(group.shortcuts) for group in groups) == 200
+
+    again = tmp_path / "again"
+    generate_shortcuts(again, 200, groups=10, seed=1)
+    assert again.read_text() == path.read_text()
+
+
+def test_summarize():
+    summary = summarize([0.003, 0.001, 0.002], items=10)
+    assert summary['median_ms'] == pytest.approx(2.0)
+    assert summary['min_ms'] == pytest.approx(1.0)
+    assert summary['max_ms'] == pytest.approx(3.0)
+    assert summary['runs'] == 3
+    assert summary['per_item_us'] == pytest.approx(200.0)
+    assert 'per_item_us' not in summarize([0.001])
+
+
+def test_compare_flags_regressions_past_threshold_and_floor():
+    rows = compare_results(results(slow=1.0, same=1.0, tiny=0.001, gone=1.0),
+                           results(slow=1.2, same=1.05, tiny=0.01), threshold=0.1, min_ms=0.05)
+    flagged = {name: regressed for name, _, _, _, regressed in rows}
+    assert flagged == {'slow': True, 'same': False, 'tiny': False}
+
+
+def test_compare_command_exit_status(tmp_path, capsys):
+    baseline, current = tmp_path / "baseline.json", tmp_path / "current.json"
+    baseline.write_text(json.dumps(results(parse=1.0)))
+    current.write_text(json.dumps(results(parse=1.5)))
+    assert main(['compare', str(baseline), str(current)]) == 1
+    assert main(['compare', str(baseline), str(current), '--threshold', '0.6']) == 0
+    assert "REGRESSION" in capsys.readouterr().out
+
+
+def test_tk_environment_is_private(tmp_path, monkeypatch):
+    for name in ('HOME', 'XDG_CONFIG_HOME', 'XDG_CACHE_HOME', 'XDG_STATE_HOME'):
+        monkeypatch.setenv(name, "/nonexistent")
+    env = TkEnvironment(tmp_path)
+    assert os.environ['HOME'] == str(env.home)
+    assert os.environ['XDG_CONFIG_HOME'] == str(env.home / ".config")
+    assert os.environ['XDG_STATE_HOME'] == str(tmp_path / "state")
+    assert not (env.script_dir / "config.toml").exists()
@@ -0,0 +1,35 @@
+import importlib.util
+import subprocess
+import sys
+import zipfile
+from pathlib import Path
+
+from bundle import EXCLUDED, build_bundle
+
+SOURCE_DIR = Path(__file__).resolve().parent.parent
+
+
+def test_bundle_holds_sources_and_unchecked_bytecode(tmp_path):
+    output = tmp_path / "viewer.pyz"
+    count = build_bundle(output, SOURCE_DIR)
+    assert output.read_bytes().startswith(b"#!/usr/bin/env python3\n")
+    assert not list(tmp_path.glob(".*.tmp*"))
+
+    with zipfile.ZipFile(output) as archive:
+        names = set(archive.namelist())
+        assert len(names) == 2 * count
+        assert {'__main__.py', '__main__.pyc', 'parser.py', 'parser.pyc'} <= names
+        assert not names & EXCLUDED
+        pyc = archive.read('parser.pyc')
+    assert pyc[:4] == importlib.util.MAGIC_NUMBER
+    assert int.from_bytes(pyc[4:8], 'little') == 1
+
+
+def test_bundle_runs_the_text_commands(tmp_path):
+    output = tmp_path / "viewer.pyz"
+    build_bundle(output, SOURCE_DIR)
+    shortcuts = tmp_path / "shortcuts"
+    shortcuts.write_text("# Apps\nbindsym $mod+d exec rofi\n")
+    result = subprocess.run([sys.executable, str(output), 'list', '--format', 'tsv', '--file', str(shortcuts)],
+                            capture_output=True, text=True, timeout=30)
+    assert result.stdout == "Apps\t$mod+d\trofi\n"
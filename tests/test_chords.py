@@ -0,0 +1,88 @@
+from chords import (CONTROL, LOCK, MOD1, MOD2, MOD4, SHIFT, ChordIndex, event_chords, format_chord,
+                    parse_chord, parse_modifiers, read_variables)
+from parser import parse_shortcuts_lines
+
+TEXT = """# Apps
+bindsym $mod+Return exec alacritty
+bindsym $mod+d exec rofi -show drun
+# Windows
+bindsym $mod+Shift+q kill
+bindsym Mod4+return exec xterm
+bindsym $alt+Tab focus right
+bindsym $mod+question exec help
+bindsym $undefined+x exec nothing
+bindsym $mod+D exec rofi -show drun
+"""
+
+
+def test_parse_chord():
+    assert parse_chord("$mod+Return") == (MOD4, "return")
+    assert parse_chord("Ctrl+Mod1+Delete") == (CONTROL | MOD1, "delete")
+    assert parse_chord("$mod+plus") == (MOD4, "plus")
+    assert parse_chord("$mod++") == (MOD4, "+")
+    assert parse_chord("$mod+x", {'$mod': 'Mod1'}) == (MOD1, "x")
+    assert parse_chord("$nope+x") is None
+    assert parse_chord("Hyper+x") is None
+    assert parse_chord("--release") is None
+
+
+def test_parse_modifiers_expands_nested_variables():
+    variables = {'$mod': 'Mod4', '$both': 'Shift+$mod', '$loop': '$loop'}
+    assert parse_modifiers("$both+", variables) == MOD4 | SHIFT
+    assert parse_modifiers("$loop+", variables) is None
+
+
+def test_read_variables():
+    lines = ["set $mod Mod1", "  set $term  alacritty -e", "# set $x y", "bindsym $mod+x exec x"]
+    assert read_variables(lines) == {'$mod': 'Mod1', '$term': 'alacritty -e'}
+
+
+def test_event_chords_ignore_lock_and_num_lock():
+    candidates = event_chords(MOD4 | LOCK | MOD2, "D")
+    assert candidates[1] == (MOD4, "d")
+    assert (MOD4, "question") in event_chords(MOD4 | SHIFT, "question")
+
+
+def test_format_chord():
+    assert format_chord((MOD4 | SHIFT, "q")) == "Mod4+Shift+q"
+
+
+def test_chord_index_lookup_and_clashes():
+    groups = parse_shortcuts_lines(TEXT.splitlines())
+    index = ChordIndex(groups, {'$mod': 'Mod4', '$alt': 'Mod1'})
+
+    assert index.unresolved == [6]
+    assert index.lookup((MOD4 | SHIFT, "q")) == [2]
+    assert index.find_event(MOD4 | MOD2, "Return") == ((MOD4, "return"), [0, 3])
+    assert index.find_event(MOD1, "Tab")[1] == [4]
+    assert index.find_event(MOD4 | SHIFT, "question")[1] == [5]
+    assert index.find_event(CONTROL, "x") == (None, [])
+
+    clashes = index.clashes()
+    assert clashes == [(('default', (MOD4, "return")), [0, 3]), (('default', (MOD4, "d")), [1, 7])]
+    assert index.is_conflict(clashes[0][1])
+    assert not index.is_conflict(clashes[1][1])
+    assert index.shortcut(3) == (groups[1], 1)
+
+
+def test_same_chord_in_different_modes_is_no_clash():
+    lines = [
+        "bindsym $mod+h focus left",
+        "mode \"resize\" {",
+        "    bindsym h resize shrink width 10 px",
+        "    bindsym Escape mode \"default\"",
+        "    bindsym Escape mode \"default\"",
+        "}",
+        "mode --pango_markup \"<b>move</b> mode\" {",
+        "    bindsym h move left",
+        "    bindsym Escape mode \"default\"",
+        "}",
+        "bindsym h exec xdotool key h",
+    ]
+    index = ChordIndex(parse_shortcuts_lines(lines), {'$mod': 'Mod4'})
+
+    assert index.clashes() == [(('resize', (0, "escape")), [2, 3])]
+    assert index.lookup((0, "h")) == [6]
+    assert index.lookup((0, "h"), 'resize') == [1]
+    assert index.lookup((0, "h"), '<b>move</b> mode') == [4]
+    assert index.find_event(0, "Escape") == (None, [])
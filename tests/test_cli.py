@@ -0,0 +1,70 @@
+import io
+import json
+
+import cli
+from cli import format_shortcut, main, select_command, write_clashes, write_shortcuts
+from tests.conftest import write
+
+TEXT = """# Apps
+bindsym $mod+Return exec alacritty
+# Media
+bindsym XF86AudioMute exec pactl set-sink-mute 0 toggle
+"""
+
+
+def test_formats():
+    assert format_shortcut('plain', "Apps", "$mod+d", "rofi") == f"{'$mod+d':40} rofi"
+    assert format_shortcut('tsv', "Apps", "$mod+d", "rofi\t-show") == "Apps\t$mod+d\trofi -show"
+    assert json.loads(format_shortcut('jsonl', "Apps", "$mod+d", "rofi", ("/f", 3))) == \
+        {'group': "Apps", 'keybinding': "$mod+d", 'command': "rofi", 'file': "/f", 'line': 3}
+
+
+def test_write_shortcuts(tmp_path):
+    path = write(tmp_path / "shortcuts", TEXT)
+    out = io.StringIO()
+    assert write_shortcuts(out, 'jsonl', path) == 2
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [(r['group'], r['command'], r['line']) for r in records] == \
+        [("Apps", "alacritty", 2), ("Media", "pactl set-sink-mute 0 toggle", 4)]
+
+
+def test_select_command_returns_the_picked_command(tmp_path, monkeypatch):
+    path = write(tmp_path / "shortcuts", TEXT)
+    monkeypatch.setitem(cli.MENUS, 'rofi', ['sed', '-n', '2p'])
+    assert select_command('rofi', path) == ("pactl set-sink-mute 0 toggle", True)
+    path = write(tmp_path / "i3", "bindsym $mod+1 workspace 1\nbindsym $mod+k exec kill -USR1 1\n")
+    assert select_command('rofi', path) == ("kill -USR1 1", True)
+    monkeypatch.setitem(cli.MENUS, 'rofi', ['head', '-n', '1'])
+    assert select_command('rofi', path) == ("workspace 1", False)
+    monkeypatch.setitem(cli.MENUS, 'rofi', ['false'])
+    assert select_command('rofi', path) is None
+
+
+def test_main(tmp_path, capsys):
+    path = write(tmp_path / "shortcuts", TEXT)
+    assert main(['list', '--format', 'tsv', '--file', str(path)]) == 0
+    assert capsys.readouterr().out.splitlines()[0] == "Apps\t$mod+Return\talacritty"
+    assert main(['list', '--file', str(tmp_path / "missing")]) == 1
+    assert "not found" in capsys.readouterr().err
+
+
+def test_write_clashes(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, 'load_variables', lambda: {'$mod': 'Mod4'})
+    path = write(tmp_path / "shortcuts", TEXT + "bindsym Mod4+Return exec xterm\nbindsym $nope+x exec x\n")
+    out = io.StringIO()
+    assert write_clashes(out, path) == 1
+    assert out.getvalue().splitlines() == [
+        "conflict: Mod4+return",
+        f"  {path}:2: $mod+Return alacritty",
+        f"  {path}:5: Mod4+Return xterm",
+        "unresolved: $nope+x",
+    ]
+
+
+def test_write_clashes_names_the_mode(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, 'load_variables', lambda: {'$mod': 'Mod4'})
+    path = write(tmp_path / "shortcuts", "bindsym h focus left\nmode \"resize\" {\n"
+                 "bindsym h resize shrink width\nbindsym h resize grow width\n}\n")
+    out = io.StringIO()
+    assert write_clashes(out, path) == 1
+    assert out.getvalue().splitlines()[0] == 'conflict: h in mode "resize"'
@@ -0,0 +1,18 @@
+from config_loader import load_config
+from tests.conftest import write
+
+
+def test_defaults_without_a_config(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    config = load_config(tmp_path)
+    assert (config.font_size, config.wrap_command, config.virtualize) == (10, True, None)
+
+
+def test_display_settings(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    write(tmp_path / "config.toml", "[font]\nsize = 13\n[display]\nwrap_command = false\nvirtualize = true\n")
+    config = load_config(tmp_path)
+    assert (config.font_size, config.wrap_command, config.virtualize) == (13, False, True)
+
+    write(tmp_path / "config.toml", '[display]\nvirtualize = "auto"\n')
+    assert load_config(tmp_path).virtualize is None
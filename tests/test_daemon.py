@@ -0,0 +1,75 @@
+import socket
+import threading
+
+import pytest
+
+from daemon import CLIENT_TIMEOUT_MS, DaemonServer, send_command
+
+
+@pytest.fixture
+def daemon(tmp_path, loop):
+    commands = []
+    server = DaemonServer(loop, commands.append, tmp_path / "daemon.sock")
+    assert server.start()
+    server.commands = commands
+    yield server
+    server.stop()
+
+
+def send_in_background(loop, command, path):
+    """send_command from another thread, as a second viewer would, while loop serves it."""
+    replies = []
+    thread = threading.Thread(target=lambda: replies.append(send_command(command, path)))
+    thread.start()
+    loop.run(2, until=lambda: replies)
+    thread.join()
+    return replies[0]
+
+
+def test_commands_are_dispatched(daemon, loop):
+    assert send_in_background(loop, 'toggle', daemon.path)
+    assert send_in_background(loop, 'ping', daemon.path)
+    assert not send_in_background(loop, 'bogus', daemon.path)
+    assert daemon.commands == ['toggle']
+    assert not daemon.clients
+
+
+def test_no_daemon_listening(tmp_path):
+    assert not send_command('show', tmp_path / "missing.sock")
+
+
+def test_second_daemon_refuses_to_start(daemon, loop):
+    other = DaemonServer(loop, lambda command: None, daemon.path)
+    result = []
+    thread = threading.Thread(target=lambda: result.append(other.start()))
+    thread.start()
+    loop.run(2, until=lambda: result)
+    thread.join()
+    assert result == [False]
+
+
+def test_stale_socket_is_replaced(tmp_path, loop):
+    path = tmp_path / "daemon.sock"
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(str(path))
+    stale.close()
+    server = DaemonServer(loop, lambda command: None, path)
+    assert server.start()
+    server.stop()
+    assert not path.exists()
+
+
+def test_stalled_client_does_not_block_others(daemon, loop):
+    stalled = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stalled.connect(str(daemon.path))
+    stalled.sendall(b"tog")
+    loop.run(0.05)
+    assert len(daemon.clients) == 1
+
+    assert send_in_background(loop, 'show', daemon.path)
+    assert daemon.commands == ['show']
+
+    loop.run(CLIENT_TIMEOUT_MS / 1000 + 1, until=lambda: not daemon.clients)
+    assert not daemon.clients
+    assert stalled.recv(16) == b""
+    stalled.close()
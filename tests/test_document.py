@@ -0,0 +1,196 @@
+from document import (SEPARATOR, WRAP_INDICATOR, DocumentBuilder, RowIndex, apply_document, build_document,
+                      diff_documents, diff_layout, elided_lines, header_line, keybinding_width, map_line,
+                      wrap_command_text)
+from parser import parse_shortcuts_lines
+
+TEXT = """# Apps
+bindsym $mod+Return exec alacritty
+bindsym $mod+d exec rofi -show drun
+# Media
+bindsym XF86AudioMute exec pactl set-sink-mute @DEFAULT_SINK@ toggle
+"""
+
+
+def layout(text: str = TEXT, width: int = 60):
+    return build_document(parse_shortcuts_lines(text.splitlines()), wrap=True, max_width=width)
+
+
+def apply_ops(old_lines, new_lines, ops):
+    """old_lines with each diff range replaced by the new lines it stands for."""
+    lines = list(old_lines)
+    for old_start, old_end, new_start, new_end in reversed(ops):
+        lines[old_start - 1:old_end - 1] = new_lines[new_start - 1:new_end - 1]
+    return lines
+
+
+class RecordingText:
+    def __init__(self):
+        self.calls = []
+
+    def insert(self, index, text, tags):
+        self.calls.append(('insert', index, text, tags))
+
+    def tag_add(self, tag, *indices):
+        self.calls.append(('tag_add', tag) + indices)
+
+
+def test_wrap_command_text():
+    assert wrap_command_text("short", 10) == ["short"]
+    assert wrap_command_text("one two three four", 9) == ["one two", "three", "four"]
+    assert wrap_command_text("one two three four", 9, wrap=False) == ["one two three four"]
+    assert wrap_command_text("unbreakablelongword", 5) == ["unbreakablelongword"]
+
+
+def test_wrap_by_measured_width():
+    # Every character two units wide, spaces one
+    def measure(text):
+        return 2 * len(text) - text.count(" ")
+
+    assert wrap_command_text("aa bb cc", 11, measure=measure) == ["aa bb", "cc"]
+    assert wrap_command_text("aa bb cc", 14, measure=measure) == ["aa bb cc"]
+    groups = parse_shortcuts_lines(TEXT.splitlines())
+    assert keybinding_width(groups, measure) == 2 * len("XF86AudioMute")
+    assert build_document(groups, measure=measure).keybinding_width == 2 * len("XF86AudioMute")
+
+
+def test_build_document_lines_rows_and_tags():
+    document = layout()
+    assert document.lines[:5] == ["Apps", SEPARATOR, "$mod+Return\talacritty", "$mod+d\trofi -show drun", ""]
+    assert document.lines[6] == "Media"
+    assert document.rows[1] == (4, 4, "rofi -show drun")
+    assert document.rows.splits[1] == len("$mod+d")
+    assert document.rows.search_keys[1] == "$mod+d\trofi -show drun"
+    assert list(document.tags['header']) == [(1, 0, 2, 0), (7, 0, 8, 0)]
+    assert list(document.tags['keybinding'])[0] == (3, 0, 3, len("$mod+Return"))
+    assert 'wrap_indicator' not in document.tags
+    assert document.blocks == [(1, 5, 0, 2), (6, 10, 2, 3)]
+
+
+def test_wrapped_rows_span_lines():
+    document = layout(width=20)
+    start, end, command = document.rows[-1]
+    assert command == "pactl set-sink-mute @DEFAULT_SINK@ toggle"
+    assert end > start
+    assert document.lines[start].startswith("\t" + WRAP_INDICATOR)
+    assert len(document.tags['wrap_indicator']) == end - start
+
+
+def test_empty_document():
+    assert build_document([]).lines == ["No shortcuts found."]
+
+
+def test_builder_grows_the_same_document():
+    groups = parse_shortcuts_lines(TEXT.splitlines())
+    builder = DocumentBuilder(max_width=20)
+    builder.add_group(groups[0])
+    partial = builder.document
+    assert partial.tag_indices()['header'] == ["1.0", "2.0"]
+    builder.add_group(groups[1])
+    document = builder.finish()
+    expected = build_document(groups, max_width=20)
+    assert (document.lines, document.tags, list(document.rows), document.blocks) == \
+        (expected.lines, expected.tags, list(expected.rows), expected.blocks)
+    assert document.tag_indices()['header'] == ["1.0", "2.0", "7.0", "8.0"]
+
+
+def test_tag_indices_are_relative_to_the_slice():
+    document = layout()
+    indices = document.tag_indices(7, 9)
+    assert indices['header'] == ["1.0", "2.0"]
+    assert document.tag_indices(7, 9, target=5)['header'] == ["5.0", "6.0"]
+    assert indices['keybinding'] == ["3.0", f"3.{len('XF86AudioMute')}"]
+    assert 'wrap_indicator' not in indices
+
+
+def test_apply_document_inserts_once_and_tags_in_bulk():
+    document = layout()
+    widget = RecordingText()
+    calls = apply_document(widget, document)
+    assert calls == len(widget.calls) == 1 + len(document.tags)
+    assert widget.calls[0] == ('insert', '1.0', document.text, ())
+
+
+def test_row_index_maps_lines_to_rows():
+    document = layout(width=20)
+    index = RowIndex(document.rows)
+    start, end, _ = document.rows[-1]
+    assert index.find(start) == index.find(end) == len(document.rows) - 1
+    assert index.find(start - 1) is None  # the group's separator
+    assert index.find(document.rows[0][0]) == 0
+    assert index.find(1) is None
+    assert index.find(len(document.lines)) is None
+    assert RowIndex().find(1) is None
+
+
+def check_diff(old_text: str, new_text: str):
+    old_groups = parse_shortcuts_lines(old_text.splitlines())
+    new_groups = parse_shortcuts_lines(new_text.splitlines())
+    old, new = build_document(old_groups), build_document(new_groups)
+    ops = diff_documents(old, old_groups, new, new_groups)
+    assert apply_ops(old.lines, new.lines, ops) == new.lines
+    return ops
+
+
+def test_diff_documents_unchanged():
+    assert check_diff(TEXT, TEXT) == []
+
+
+def test_diff_documents_changed_row_touches_only_that_row():
+    assert check_diff(TEXT, TEXT.replace("rofi -show drun", "rofi -show run")) == [(4, 5, 4, 5)]
+
+
+def test_diff_documents_added_removed_and_renamed_groups():
+    check_diff(TEXT, TEXT + "# New\nbindsym $mod+n exec new\n")
+    check_diff(TEXT, TEXT.replace("# Media\n", "# Sound\n"))
+    check_diff(TEXT, "# Media\nbindsym XF86AudioMute exec mute\n" + TEXT)
+    check_diff(TEXT, TEXT.split("# Media")[0])
+    check_diff(TEXT, TEXT.replace("bindsym $mod+d exec rofi -show drun\n", ""))
+    check_diff(TEXT, "")
+    check_diff("", TEXT)
+
+
+def test_map_line_follows_inserted_lines():
+    old_groups = parse_shortcuts_lines(TEXT.splitlines())
+    new_text = TEXT.replace("# Media\n", "# Media\nbindsym $mod+m exec m\n")
+    new_groups = parse_shortcuts_lines(new_text.splitlines())
+    old, new = build_document(old_groups), build_document(new_groups)
+    ops = diff_documents(old, old_groups, new, new_groups)
+    assert map_line(ops, 1) == 1
+    assert new.lines[map_line(ops, len(old.lines)) - 1] == old.lines[-1]
+    assert map_line(ops, 4) == 4
+
+
+def test_diff_layout_only_rewrapped_rows():
+    groups = parse_shortcuts_lines(TEXT.splitlines())
+    narrow = build_document(groups, max_width=20)
+    wide = build_document(groups, max_width=200)
+    ops = diff_layout(wide, narrow)
+    assert len(ops) == 1
+    assert apply_ops(wide.lines, narrow.lines, ops) == narrow.lines
+    assert apply_ops(narrow.lines, wide.lines, diff_layout(narrow, wide)) == wide.lines
+    assert diff_layout(wide, build_document(groups, max_width=200)) == []
+
+
+def test_elided_lines_filter_keeps_matching_rows():
+    document = layout()
+    hidden, headers = elided_lines(document, [document.rows.starts[1]])
+    shown = [line for line in range(1, len(document.lines) + 1)
+             if not any(first <= line <= last for first, last in hidden)]
+    assert [document.lines[line - 1] for line in shown] == ["Apps", SEPARATOR, "$mod+d\trofi -show drun", ""]
+    assert headers == []
+
+
+def test_elided_lines_header_match_keeps_group():
+    document = layout()
+    hidden, _ = elided_lines(document, [header_line(document, 1)])
+    media = range(document.rows.starts[2], document.rows.ends[2] + 1)
+    assert not any(first <= line <= last for first, last in hidden for line in media)
+    assert any(first <= document.rows.starts[0] <= last for first, last in hidden)
+
+
+def test_elided_lines_folded_groups_keep_header():
+    document = layout()
+    hidden, headers = elided_lines(document, folded={0, 1})
+    assert headers == [header_line(document, 0), header_line(document, 1)]
+    assert hidden[0] == (2, document.rows.ends[1])
+    assert elided_lines(document) == ([], [])
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from frecency import FrecencyStore, add_run, decayed, read_snapshot, replay_log
+
+DAY = 24 * 3600
+
+
+def test_decay_halves_each_half_life():
+    assert decayed(4.0, 0, 2 * DAY, half_life=DAY) == pytest.approx(1.0)
+    assert decayed(4.0, 10, 5) == 4.0
+
+
+def test_add_run_accumulates():
+    entries = {}
+    add_run(entries, ('k', 'c'), 0, DAY)
+    add_run(entries, ('k', 'c'), DAY, DAY)
+    assert entries[('k', 'c')] == [2, DAY, pytest.approx(1.5)]
+
+
+def test_replay_log_skips_torn_lines():
+    entries = {}
+    lines = [json.dumps([0, 'a', 'x']), json.dumps([1, 'b', 'y']), '[2, "a"', 'garbage']
+    assert replay_log(entries, lines) == 4
+    assert set(entries) == {('a', 'x'), ('b', 'y')}
+
+
+def test_unreadable_snapshot_is_empty(tmp_path):
+    path = tmp_path / "usage.snapshot"
+    assert read_snapshot(path) == {}
+    path.write_text("{not json")
+    assert read_snapshot(path) == {}
+    path.write_text(json.dumps({'version': 999, 'entries': [['k', 'c', 1, 0, 1]]}))
+    assert read_snapshot(path) == {}
+
+
+def test_round_trip_through_log(tmp_path):
+    store = FrecencyStore(tmp_path)
+    store.record('$mod+d', 'rofi', when=100)
+    store.record('$mod+d', 'rofi', when=200)
+    store.record('$mod+Return', 'alacritty', when=150)
+    store.flush()
+
+    reloaded = FrecencyStore(tmp_path)
+    reloaded.load()
+    assert reloaded.loaded
+    assert reloaded.entries == store.entries
+    assert reloaded.recent(now=200) == [('$mod+d', 'rofi'), ('$mod+Return', 'alacritty')]
+    assert reloaded.recent(1, now=200) == [('$mod+d', 'rofi')]
+
+
+def test_round_trip_through_compaction(tmp_path):
+    store = FrecencyStore(tmp_path, compact_lines=3)
+    for when in range(5):
+        store.record('k', f'c{when % 2}', when=when)
+    store.flush()
+    assert store.snapshot_path.exists()
+    assert store.logged < 3
+
+    reloaded = FrecencyStore(tmp_path)
+    reloaded.load()
+    assert {key: entry[0] for key, entry in reloaded.entries.items()} == {('k', 'c0'): 3, ('k', 'c1'): 2}
+    assert reloaded.scores(now=4) == pytest.approx(store.scores(now=4))
+    assert not list(tmp_path.glob("*.tmp*"))
+
+
+def test_runs_recorded_before_load_are_merged_once(tmp_path):
+    first = FrecencyStore(tmp_path)
+    first.record('k', 'c', when=0)
+    first.flush()
+
+    store = FrecencyStore(tmp_path)
+    store.unloaded_runs.append((('k', 'c'), 1))
+    store.entries = {('k', 'c'): [1, 1, 1.0]}
+    store.load()
+    assert store.entries[('k', 'c')][0] == 2
+    assert store.unloaded_runs == []
+
+
+def test_writer_thread_loads_history(tmp_path):
+    store = FrecencyStore(tmp_path)
+    store.record('k', 'c', when=0)
+    store.flush()
+
+    other = FrecencyStore(tmp_path)
+    other.record('k', 'c', when=1)
+    other.flush()
+    assert other.loaded
+    assert other.entries[('k', 'c')][0] == 2
+    assert len(other) == 1
+
+    reloaded = FrecencyStore(tmp_path)
+    reloaded.load()
+    assert reloaded.entries[('k', 'c')][0] == 2
@@ -0,0 +1,137 @@
+import socket
+from pathlib import Path
+
+import pytest
+
+from i3_ipc import (GET_CONFIG, HEADER, MAGIC, I3ConfigSource, I3Connection, I3IpcError, connect,
+                    loaded_texts, pack_message, recv_message, texts_content)
+from mock_i3_ipc import MockI3Server
+from startup import Task
+from tests.conftest import write
+
+
+@pytest.fixture
+def server(tmp_path):
+    config = write(tmp_path / "i3" / "config", "bindsym $mod+Return exec alacritty\n")
+    shortcuts = write(tmp_path / "i3" / "shortcuts", "# Apps\nbindsym $mod+d exec rofi\n")
+    server = MockI3Server(tmp_path / "i3.sock", [config, shortcuts]).start()
+    yield server
+    server.stop()
+
+
+def test_message_framing():
+    a, b = socket.socketpair()
+    with a, b:
+        a.sendall(pack_message(GET_CONFIG, b'{"config": "x"}'))
+        assert recv_message(b) == (GET_CONFIG, {'config': "x"})
+
+        a.sendall(HEADER.pack(b"nope!!", 2, GET_CONFIG) + b"{}")
+        with pytest.raises(I3IpcError):
+            recv_message(b)
+
+        a.sendall(pack_message(GET_CONFIG, b"{broken"))
+        with pytest.raises(I3IpcError):
+            recv_message(b)
+
+        a.sendall(pack_message(GET_CONFIG, b"{}")[:HEADER.size + 1])
+        a.close()
+        with pytest.raises(I3IpcError):
+            recv_message(b)
+    assert pack_message(GET_CONFIG)[:len(MAGIC)] == MAGIC
+
+
+def test_loaded_texts():
+    config = {'config': "main", 'included_configs': [
+        {'path': "/x/../a", 'raw_contents': "A"},
+        {'path': None, 'raw_contents': "B"},
+        {'path': "/c"},
+    ]}
+    assert loaded_texts(config) == {Path("/a"): "A"}
+    assert loaded_texts({'config': "main"}) == {}
+    with pytest.raises(I3IpcError):
+        loaded_texts([])
+    assert texts_content({Path("/b"): "2", Path("/a"): "1"}) == b"/a\x001\x00/b\x002"
+
+
+def test_connection_against_mock_server(server, tmp_path):
+    connection = I3Connection(server.path)
+    try:
+        texts = loaded_texts(connection.get_config())
+        assert texts[tmp_path / "i3" / "shortcuts"] == "# Apps\nbindsym $mod+d exec rofi\n"
+        assert connection.subscribe(['config'])
+    finally:
+        connection.close()
+
+
+def test_connection_without_server(tmp_path):
+    with pytest.raises(OSError):
+        I3Connection(tmp_path / "missing.sock")
+
+
+def test_config_source_follows_reloads(server, tmp_path, loop):
+    reloads = []
+    source = I3ConfigSource(loop, lambda: reloads.append(1), server.path)
+    shortcuts = tmp_path / "i3" / "shortcuts"
+    source.start()
+    # The connect runs on a worker; start() returns before it's done
+    assert source.texts_for(shortcuts) is None
+    try:
+        loop.run(2, until=lambda: reloads)
+        assert source.connected and reloads == [1]
+        assert source.texts_for(shortcuts)[shortcuts].startswith("# Apps")
+        assert source.texts_for(tmp_path / "other") is None
+
+        # A reload with nothing changed isn't passed on
+        server.reload()
+        loop.run(0.3)
+        assert reloads == [1]
+
+        write(shortcuts, "# Apps\nbindsym $mod+d exec dmenu_run\n")
+        server.reload()
+        loop.run(2, until=lambda: len(reloads) == 2)
+        assert reloads == [1, 1]
+        assert source.texts_for(shortcuts)[shortcuts].endswith("dmenu_run\n")
+
+        # i3 going away drops the texts, so callers fall back to the files
+        server.stop()
+        loop.run(2, until=lambda: len(reloads) == 3)
+        assert not source.connected
+        assert source.texts_for(shortcuts) is None
+        assert source.reconnect_id is not None
+    finally:
+        source.stop()
+    assert source.reconnect_id is None
+
+
+def test_config_source_reconnects_off_the_tk_thread(server, loop):
+    reloads = []
+    source = I3ConfigSource(loop, lambda: reloads.append(1), server.path)
+    source.reconnect_attempts = 1
+    try:
+        source.reconnect()
+        assert not source.connected and source.pending is not None
+        loop.run(2, until=lambda: reloads)
+        assert source.connected and source.reconnect_attempts == 0
+    finally:
+        source.stop()
+
+
+def test_config_source_takes_a_started_connect(server, loop):
+    reloads = []
+    source = I3ConfigSource(loop, lambda: reloads.append(1), Path("/nonexistent"))
+    source.start(Task('connect', connect, server.path))
+    try:
+        loop.run(2, until=lambda: reloads)
+        assert source.connected
+    finally:
+        source.stop()
+
+
+def test_config_source_without_i3(tmp_path, loop):
+    source = I3ConfigSource(loop, lambda: None, tmp_path / "missing.sock")
+    source.start()
+    loop.run(2, until=lambda: source.pending is None)
+    assert not source.connected
+    # Never having connected, it doesn't keep trying
+    assert source.reconnect_id is None
+    assert source.texts_for(tmp_path / "shortcuts") is None
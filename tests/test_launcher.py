@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from launcher import Launcher, command_argv, needs_shell, shell_free_argv, spawn
+
+
+def test_shell_free_argv():
+    assert shell_free_argv("rofi -show drun") == ["rofi", "-show", "drun"]
+    assert shell_free_argv("notify-send 'two words'") == ["notify-send", "two words"]
+    assert shell_free_argv("a | b") is None
+    assert shell_free_argv("cd /tmp") is None
+    assert shell_free_argv("FOO=1 cmd") is None
+    assert shell_free_argv("echo 'unterminated") is None
+    assert shell_free_argv("") is None
+
+
+def test_commands_without_exec_go_through_i3_msg():
+    assert command_argv("move container to workspace 2", is_exec=False) == \
+        ["i3-msg", "-q", "move container to workspace 2"]
+    assert command_argv('[class="Firefox"] focus', is_exec=False) == \
+        ["i3-msg", "-q", '[class="Firefox"] focus']
+    assert not needs_shell("kill; exit", is_exec=False)
+    # Programs that share a name with an i3 command still run as programs
+    assert command_argv("kill -USR1 1234") == ["kill", "-USR1", "1234"]
+    assert command_argv("open ~/doc.pdf") == ["/bin/sh", "-c", "open ~/doc.pdf"]
+
+
+def test_command_argv_falls_back_to_sh():
+    assert command_argv("alacritty -e htop") == ["alacritty", "-e", "htop"]
+    assert command_argv("pactl set-sink-volume @DEFAULT_SINK@ +5% && notify") == \
+        ["/bin/sh", "-c", "pactl set-sink-volume @DEFAULT_SINK@ +5% && notify"]
+    assert needs_shell("ls ~")
+
+
+def test_spawn_missing_program_raises():
+    with pytest.raises(OSError):
+        spawn("no-such-program-for-the-tests")
+
+
+def test_spawn_runs_command(tmp_path):
+    marker = tmp_path / "ran"
+    pid = spawn(f"touch {marker}")
+    os.waitpid(pid, 0)
+    assert marker.exists()
+
+
+def test_launch_is_debounced():
+    launcher = Launcher(debounce=60)
+    launcher.on_failure = lambda command, message: None
+    assert launcher.launch("true")
+    assert not launcher.launch("true")
+    for pid in list(launcher.children):
+        os.waitpid(pid, 0)
+
+
+def test_helper_reports_failures(loop):
+    failures = []
+    launcher = Launcher(debounce=0)
+    launcher.on_failure = lambda command, message: failures.append((command, message))
+    assert launcher.start()
+    launcher.attach(loop)
+    try:
+        assert launcher.launch("true")
+        assert launcher.launch("no-such-program-for-the-tests --flag")
+        assert launcher.launch("no-such-program-for-the-tests | cat; exit 127")
+        loop.run(5, until=lambda: len(failures) == 2 and not launcher.pending)
+    finally:
+        launcher.stop()
+    assert [command for command, _ in failures] == [
+        "no-such-program-for-the-tests --flag", "no-such-program-for-the-tests | cat; exit 127"]
+    assert failures[1][1] == "command not found"
+    assert launcher.helper_pid is None
+
+
+def test_in_process_spawn_is_reaped(loop):
+    failures = []
+    launcher = Launcher(debounce=0)
+    launcher.on_failure = lambda command, message: failures.append(message)
+    launcher.attach(loop)
+    launcher.launch("true; exit 127")
+    launcher.launch("true")
+    loop.run(5, until=lambda: not launcher.children)
+    launcher.stop()
+    assert failures == ["command not found"]
@@ -0,0 +1,137 @@
+import os
+import time
+
+from document import Document, build_document
+from layout_cache import STALE_TMP_SECONDS, LayoutCache
+from parser import parse_include_graph, parse_shortcuts_lines
+from tests.conftest import write
+
+TEXT = """# Apps
+bindsym $mod+Return exec alacritty
+bindsym $mod+d exec rofi -show drun
+bindsym $mod+1 workspace number 1
+mode "resize" {
+    bindsym Escape mode "default"
+}
+"""
+
+
+def entry(cache, text=TEXT, settings=None):
+    groups = parse_shortcuts_lines(text.splitlines())
+    document = build_document(groups, max_width=20)
+    key, content_hash = cache.make_key(text.encode(), settings or {'max_width': 20})
+    return key, content_hash, groups, document
+
+
+def test_make_key_depends_on_content_and_settings():
+    key, content_hash = LayoutCache.make_key(b"a", {'max_width': 1})
+    assert len(key) == 32
+    assert LayoutCache.make_key(b"a", {'max_width': 1}) == (key, content_hash)
+    assert LayoutCache.make_key(b"b", {'max_width': 1})[0] != key
+    assert LayoutCache.make_key(b"a", {'max_width': 2})[0] != key
+    assert LayoutCache.hash_key(content_hash, {'max_width': 1}) == key
+    other_key, _ = LayoutCache.make_key(b"a", {'max_width': 2})
+    assert LayoutCache.hash_key(content_hash, {'max_width': 2}) == other_key
+
+
+def test_document_dict_round_trip_shares_group_strings():
+    _, _, groups, document = entry(LayoutCache())
+    copy = Document.from_dict(document.to_dict(), groups)
+    assert copy.lines == document.lines
+    assert copy.tags == document.tags
+    assert list(copy.rows) == list(document.rows)
+    assert copy.rows.commands[0] is groups[0].commands[0]
+
+
+def test_store_load_round_trip(tmp_path):
+    cache = LayoutCache(tmp_path)
+    key, content_hash, groups, document = entry(cache)
+    cache.store(key, content_hash, groups, document)
+
+    loaded_groups, loaded_document, dependencies = cache.load(key, content_hash)
+    assert dependencies == []
+    assert [group.name for group in loaded_groups] == ["Apps"]
+    assert list(loaded_groups[0].commands) == list(groups[0].commands)
+    assert list(loaded_groups[0].execs) == [1, 1, 0, 0]
+    assert loaded_groups[0].modes == ['default', 'default', 'default', 'resize']
+    assert loaded_document.lines == document.lines
+    assert loaded_document.tags == document.tags
+    assert list(loaded_document.rows) == list(document.rows)
+
+
+def test_miss_on_other_content(tmp_path):
+    cache = LayoutCache(tmp_path)
+    key, content_hash, groups, document = entry(cache)
+    assert cache.load(key, content_hash) is None
+    cache.store(key, content_hash, groups, document)
+    assert cache.load(key, "other hash") is None
+    assert not cache._entry_path(key).exists()
+
+
+def test_changed_dependency_invalidates(tmp_path):
+    cache = LayoutCache(tmp_path / "cache")
+    include = write(tmp_path / "extra.conf", "bindsym $mod+x exec x\n")
+    key, content_hash, groups, document = entry(cache)
+    cache.store(key, content_hash, groups, document, [include])
+    assert cache.load(key, content_hash)[2] == [include]
+
+    write(include, "bindsym $mod+x exec something longer\n")
+    assert cache.load(key, content_hash) is None
+
+
+def test_new_file_matching_a_glob_include_invalidates(tmp_path):
+    cache = LayoutCache(tmp_path / "cache")
+    text = "include conf.d/*.conf\n"
+    root = write(tmp_path / "shortcuts", text)
+    write(tmp_path / "conf.d" / "a.conf", "bindsym $mod+a exec a\n")
+    groups, graph = parse_include_graph(root)
+    key, content_hash = cache.make_key(text.encode(), {'width': 20})
+    cache.store(key, content_hash, groups, build_document(groups), graph.dependencies())
+    assert cache.load(key, content_hash) is not None
+
+    write(tmp_path / "conf.d" / "b.conf", "bindsym $mod+b exec b\n")
+    assert cache.load(key, content_hash) is None
+
+
+def test_corrupt_entry_is_discarded(tmp_path):
+    cache = LayoutCache(tmp_path)
+    key, content_hash, groups, document = entry(cache)
+    cache.store(key, content_hash, groups, document)
+    path = cache._entry_path(key)
+    path.write_text(path.read_text()[:50])
+    assert cache.load(key, content_hash) is None
+    assert not path.exists()
+
+
+def test_evict_keeps_newest_entries_and_other_files(tmp_path):
+    cache = LayoutCache(tmp_path, max_entries=2)
+    (tmp_path / "theme.json").write_text("{}")
+    keys = []
+    for width in range(4):
+        key, content_hash, groups, document = entry(cache, settings={'max_width': width})
+        cache.store(key, content_hash, groups, document)
+        os.utime(cache._entry_path(key), (width, width))
+        keys.append(key)
+    cache.evict()
+    assert sorted(p.stem for p in tmp_path.glob("*.json")) == sorted(keys[2:] + ["theme"])
+
+
+def test_evict_sweeps_stale_tmp_files(tmp_path):
+    cache = LayoutCache(tmp_path)
+    old = tmp_path / "0123.tmp999"
+    fresh = tmp_path / "4567.tmp998"
+    old.write_text("partial")
+    fresh.write_text("partial")
+    stale = time.time() - STALE_TMP_SECONDS - 1
+    os.utime(old, (stale, stale))
+    cache.evict()
+    assert not old.exists()
+    assert fresh.exists()
+
+
+def test_failed_store_leaves_no_tmp_file(tmp_path):
+    cache = LayoutCache(tmp_path)
+    key, content_hash, groups, document = entry(cache)
+    cache._entry_path(key).mkdir()  # os.replace onto a directory fails
+    cache.store(key, content_hash, groups, document)
+    assert list(tmp_path.iterdir()) == [cache._entry_path(key)]
@@ -0,0 +1,194 @@
+import os
+import sys
+
+import pytest
+
+import parser
+from parser import (IncludeGraph, ShortcutGroup, include_directories, iter_shortcut_groups, parse_binding,
+                    parse_bindsym_line, parse_include_graph, parse_shortcuts_file, parse_shortcuts_lines,
+                    split_keybinding)
+from tests.conftest import write
+
+
+def shortcuts(groups):
+    return [(group.name, group.shortcuts) for group in groups]
+
+
+def test_parse_bindsym_line_strips_exec_and_quotes():
+    assert parse_bindsym_line("bindsym $mod+Return exec alacritty") == ("$mod+Return", "alacritty")
+    assert parse_bindsym_line("bindsym $mod+d exec --no-startup-id rofi -show drun &") == \
+        ("$mod+d", "rofi -show drun")
+    assert parse_bindsym_line('bindsym $mod+x exec "maim -s"') == ("$mod+x", "maim -s")
+    assert parse_bindsym_line("bindsym $mod+1 workspace number 1") == ("$mod+1", "workspace number 1")
+    assert parse_bindsym_line("bindsym $mod+q") == (None, None)
+    assert parse_bindsym_line("set $mod Mod4") == (None, None)
+
+
+def test_parse_binding_records_exec():
+    assert parse_binding("bindsym $mod+1 workspace number 1") == ("$mod+1", "workspace number 1", False)
+    assert parse_binding('bindsym $mod+f [class="Firefox"] focus') == \
+        ("$mod+f", '[class="Firefox"] focus', False)
+    assert parse_binding("bindsym $mod+k exec kill -USR1 1234") == ("$mod+k", "kill -USR1 1234", True)
+    assert parse_binding("bindsym $mod+o exec --no-startup-id open ~/doc.pdf") == \
+        ("$mod+o", "open ~/doc.pdf", True)
+    assert parse_binding('bindsym $mod+t exec "[ -f ~/x ] && foo"') == ("$mod+t", "[ -f ~/x ] && foo", True)
+    assert parse_binding("bindsym $mod+e execute") == ("$mod+e", "execute", False)
+    assert parse_binding("bindsym $mod+q") == (None, None, False)
+
+    groups = parse_shortcuts_lines(["bindsym 1 workspace 1", "bindsym 2 exec kill 1"])
+    assert list(groups[0].execs) == [0, 1]
+
+
+def test_bindings_record_their_mode():
+    lines = [
+        "bindsym $mod+r mode \"resize\"",
+        "mode \"resize\" {",
+        "    bindsym h resize shrink width 10 px",
+        "}",
+        "mode --pango_markup \"<b>launch</b> (f)irefox\" {",
+        "    bindsym f exec firefox",
+        "}",
+        "bindsym $mod+f fullscreen toggle",
+    ]
+    group, = parse_shortcuts_lines(lines)
+    assert group.modes == ['default', 'resize', '<b>launch</b> (f)irefox', 'default']
+    assert group.modes[1] is sys.intern('resize')
+
+
+def test_split_keybinding_keeps_plus_key():
+    assert split_keybinding("$mod+Shift+Return") == ("$mod+Shift+", "Return")
+    assert split_keybinding("$mod++") == ("$mod+", "+")
+    assert split_keybinding("Escape") == ("", "Escape")
+
+
+def test_comments_start_groups():
+    groups = parse_shortcuts_lines([
+        "bindsym $mod+Return exec alacritty",
+        "",
+        "# Workspaces",
+        "bindsym $mod+1 workspace number 1",
+        "#",
+        "# Empty",
+        "# Media",
+        "bindsym XF86AudioMute exec pactl set-sink-mute 0 toggle",
+    ], filename="shortcuts")
+    assert shortcuts(groups) == [
+        ("General", [("$mod+Return", "alacritty")]),
+        ("Workspaces", [("$mod+1", "workspace number 1")]),
+        ("Media", [("XF86AudioMute", "pactl set-sink-mute 0 toggle")]),
+    ]
+    assert groups[1].sources == [("shortcuts", 4)]
+
+
+def test_parse_file(tmp_path):
+    path = write(tmp_path / "shortcuts", "# Apps\nbindsym $mod+d exec rofi\n")
+    assert shortcuts(parse_shortcuts_file(path)) == [("Apps", [("$mod+d", "rofi")])]
+
+
+def test_group_columns_share_search_keys():
+    group = ShortcutGroup("Apps")
+    group.add_shortcut("$mod+Shift+Return", "Firefox", ("file", 3))
+    group.add_shortcut("Print", "maim")
+    assert group.modifiers == ["$mod+Shift+", ""]
+    assert group.keys == ["Return", "Print"]
+    assert group.search_keys == ["$mod+shift+return\tfirefox", "print\tmaim"]
+    assert group.sources == [("file", 3), None]
+    assert group.keybinding(0) == "$mod+Shift+Return"
+    assert list(group.execs) == [1, 1]
+
+
+def test_missing_file_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        parse_shortcuts_file(tmp_path / "missing")
+
+
+def test_includes_are_merged_in_place(tmp_path):
+    root = write(tmp_path / "shortcuts", "# Main\nbindsym $mod+a exec a\ninclude apps.d/*.conf\n"
+                                         "bindsym $mod+z exec z\n")
+    first = write(tmp_path / "apps.d" / "1.conf", "bindsym $mod+b exec b\n")
+    second = write(tmp_path / "apps.d" / "2.conf", "# Media\nbindsym $mod+m exec m\n")
+
+    groups, graph = parse_include_graph(root)
+    assert shortcuts(groups) == [
+        ("Main", [("$mod+a", "a"), ("$mod+b", "b")]),
+        ("Media", [("$mod+m", "m"), ("$mod+z", "z")]),
+    ]
+    assert graph.files == [root, first, second]
+    assert graph.includes[(root, 3)] == [first, second]
+    assert groups[0].sources == [(str(root), 2), (str(first), 1)]
+    assert graph.directories == [tmp_path / "apps.d"]
+    assert graph.dependencies() == [first, second, tmp_path / "apps.d"]
+
+
+def test_include_directories_cover_every_glob_level(tmp_path):
+    write(tmp_path / "a" / "x" / "1.conf", "")
+    write(tmp_path / "b" / "x" / "2.conf", "")
+    (tmp_path / "c").mkdir()
+    assert include_directories(str(tmp_path / "*" / "x" / "*.conf")) == [
+        tmp_path, tmp_path / "a", tmp_path / "b", tmp_path / "c",
+        tmp_path / "a" / "x", tmp_path / "b" / "x"]
+    assert include_directories(str(tmp_path / "missing" / "extra.conf")) == [tmp_path / "missing"]
+
+
+def test_each_file_is_included_once_and_cycles_are_recorded(tmp_path):
+    a = write(tmp_path / "a", "bindsym 1 exec a\ninclude b\ninclude b\n")
+    b = write(tmp_path / "b", "bindsym 2 exec b\ninclude a\n")
+
+    groups, graph = parse_include_graph(a)
+    assert shortcuts(groups) == [("General", [("1", "a"), ("2", "b")])]
+    assert (b, a) in graph.cycles
+
+
+def test_include_expands_home_and_variables(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setenv('SHORTCUTS_DIR', str(tmp_path / "extra"))
+    extra = write(tmp_path / "extra" / "keys", "bindsym 3 exec c\n")
+    home = write(tmp_path / "home.conf", "bindsym 4 exec d\n")
+    root = write(tmp_path / "conf" / "shortcuts", "include $SHORTCUTS_DIR/keys\ninclude ~/home.conf\n")
+
+    groups, graph = parse_include_graph(root)
+    assert shortcuts(groups) == [("General", [("3", "c"), ("4", "d")])]
+    assert graph.files == [root, extra, home]
+
+
+def test_changed_file_is_reparsed(tmp_path):
+    root = write(tmp_path / "shortcuts", "bindsym 1 exec one\n")
+    assert shortcuts(parse_shortcuts_file(root)) == [("General", [("1", "one")])]
+
+    root.write_text("bindsym 1 exec uno\nbindsym 2 exec dos\n")
+    stat = root.stat()
+    os.utime(root, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert shortcuts(parse_shortcuts_file(root)) == [("General", [("1", "uno"), ("2", "dos")])]
+
+
+def test_texts_replace_the_files_on_disk(tmp_path):
+    root = write(tmp_path / "shortcuts", "bindsym 1 exec on-disk\ninclude other\n")
+    other = write(tmp_path / "other", "bindsym 2 exec other\n")
+
+    # i3 loaded the root only; the include is limited to what i3 loaded
+    groups = parse_shortcuts_file(root, texts={root: "bindsym 1 exec loaded\ninclude other\n"})
+    assert shortcuts(groups) == [("General", [("1", "loaded")])]
+
+    groups = parse_shortcuts_file(root, texts={root: "include other\n", other: "bindsym 2 exec i3\n"})
+    assert shortcuts(groups) == [("General", [("2", "i3")])]
+
+
+def test_streaming_matches_full_parse(tmp_path):
+    root = write(tmp_path / "shortcuts", "# One\nbindsym 1 exec one\n# Two\nbindsym 2 exec two\n"
+                                         "include more\n# Four\nbindsym 4 exec four\n")
+    write(tmp_path / "more", "# Three\nbindsym 3 exec three\n")
+
+    graph = IncludeGraph()
+    streamed = iter_shortcut_groups(root, graph)
+    assert next(streamed).name == "One"
+    # The include hasn't been reached yet
+    assert len(graph.files) == 1
+    assert shortcuts(list(streamed)) == shortcuts(parse_shortcuts_file(root)[1:])
+    assert len(graph.files) == 2
+    assert graph.directories == [tmp_path]
+
+
+def test_large_files_are_read_through_mmap(tmp_path, monkeypatch):
+    monkeypatch.setattr(parser, 'MMAP_THRESHOLD', 0)
+    root = write(tmp_path / "shortcuts", "# Ünïcode\nbindsym 1 exec one\nbindsym 2 exec two")
+    assert shortcuts(parse_shortcuts_file(root)) == [("Ünïcode", [("1", "one"), ("2", "two")])]
@@ -0,0 +1,102 @@
+import re
+
+import pytest
+
+from document import build_document
+from parser import parse_shortcuts_lines
+from search_index import SearchIndex, fuzzy_span, substring_spans
+
+TEXT = """# Apps
+bindsym $mod+Return exec alacritty
+bindsym $mod+d exec rofi -show drun
+# Workspaces
+bindsym $mod+1 workspace number 1
+bindsym $mod+Shift+1 move container to workspace number 1
+# Media
+bindsym XF86AudioMute exec pactl set-sink-mute @DEFAULT_SINK@ toggle
+"""
+
+
+@pytest.fixture
+def document():
+    return build_document(parse_shortcuts_lines(TEXT.splitlines()), max_width=30)
+
+
+def matched_text(document, match):
+    line, col, length = match
+    return document.lines[line - 1][col:col + length]
+
+
+def brute_force(document, needle):
+    """Every occurrence of needle within a line, outside the tab between fields."""
+    found = []
+    for line, text in enumerate(document.lines, 1):
+        if text.startswith("─"):
+            continue
+        for field_start, field in zip((0, text.find('\t') + 1), text.split('\t', 1)):
+            for position, length in substring_spans(needle, field.lower()):
+                found.append((line, field_start + position, length))
+    return found
+
+
+def test_substring_matches_are_the_needle(document):
+    index = SearchIndex(document)
+    for query in ("mod", "Workspace", "ro", "x", "number 1", "sink"):
+        matches = index.search(query).matches
+        assert matches
+        for match in matches:
+            assert matched_text(document, match).lower() == query.lower()
+
+
+def test_substring_matches_agree_with_brute_force(document):
+    index = SearchIndex(document)
+    for query in ("mod", "space", "n", "alacritty", "1"):
+        assert sorted(index.search(query).matches) == sorted(brute_force(document, query))
+
+
+def test_no_match_and_empty_query(document):
+    index = SearchIndex(document)
+    assert index.search("nothing like this").matches == []
+    empty = index.search("")
+    assert empty.matches == [] and empty.segments == []
+
+
+def test_narrowing_matches_fresh_search(document):
+    index = SearchIndex(document)
+    previous = None
+    query = ""
+    for ch in "workspace":
+        query += ch
+        narrowed = index.search(query, previous=previous)
+        assert narrowed.matches == index.search(query).matches
+        previous = narrowed
+    assert len(previous.matches) == 3
+
+
+def test_extend_indexes_new_groups_and_stops_narrowing():
+    groups = parse_shortcuts_lines(TEXT.splitlines())
+    index = SearchIndex(build_document(groups[:1]))
+    previous = index.search("mod")
+    index.extend(build_document(groups))
+    assert len(index) > previous.indexed
+    assert len(index.search("mod+", previous=previous).matches) == 4
+
+
+def test_regex_mode(document):
+    index = SearchIndex(document)
+    result = index.search(r"^\$mod\+\d", mode='regex')
+    assert [matched_text(document, m) for m in result.matches] == ["$mod+1"]
+    with pytest.raises(re.error):
+        index.search("(", mode='regex')
+
+
+def test_fuzzy_mode(document):
+    index = SearchIndex(document)
+    result = index.search("rfdr", mode='fuzzy')
+    assert [matched_text(document, m) for m in result.matches] == ["rofi -show dr"]
+    assert fuzzy_span("ace", "alacritty") is None
+    assert fuzzy_span("ary", "alacritty") == (0, 9)
+
+
+def test_cancelled_search_returns_none(document):
+    assert SearchIndex(document).search("mod", cancelled=lambda: True) is None
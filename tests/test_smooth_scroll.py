@@ -0,0 +1,54 @@
+from smooth_scroll import SmoothScroller
+
+
+def scroller_for(loop, moved=None, can_move=lambda: True):
+    moved = [] if moved is None else moved
+
+    def scroll(pixels):
+        if not can_move():
+            return False
+        moved.append(pixels)
+        return True
+
+    return SmoothScroller(loop, scroll), moved
+
+
+def test_impulse_glides_the_requested_distance(loop):
+    scroller, moved = scroller_for(loop)
+    scroller.impulse(300)
+    assert scroller.running
+    loop.run(3, until=lambda: not scroller.running)
+    assert not scroller.running
+    # Motion settles once it is slower than settle_speed, a couple of pixels short
+    assert 300 - scroller.settle_speed * scroller.time_constant - 1 <= sum(moved) <= 300
+    assert all(pixels > 0 for pixels in moved)
+    assert scroller.frame_stats()['frames'] == len(scroller.intervals) > 1
+
+
+def test_reversing_cancels_the_glide(loop):
+    scroller, moved = scroller_for(loop)
+    scroller.impulse(1000)
+    scroller.impulse(-100)
+    assert scroller.velocity == -100 / scroller.time_constant
+    loop.run(3, until=lambda: not scroller.running)
+    assert -100 <= sum(moved) < -90
+
+
+def test_limit_caps_the_pending_distance(loop):
+    scroller, _ = scroller_for(loop)
+    for _ in range(5):
+        scroller.impulse(100, limit=150)
+    assert scroller.velocity == 150 / scroller.time_constant
+    scroller.stop()
+    assert not scroller.running and scroller.velocity == 0
+
+
+def test_stops_at_the_end_of_the_view(loop):
+    calls = []
+    scroller, moved = scroller_for(loop, can_move=lambda: calls.append(1) or len(calls) < 3)
+    scroller.impulse(10000)
+    loop.run(3, until=lambda: not scroller.running)
+    assert not scroller.running
+    assert len(moved) == 2
+    assert scroller.frame_stats()['frames'] >= 3
+    assert SmoothScroller(loop, lambda pixels: True).frame_stats() == {'frames': 0}
@@ -0,0 +1,20 @@
+import pytest
+
+from startup import Task, read_shortcuts_file
+from tests.conftest import write
+
+
+def test_task_returns_value_and_reraises():
+    task = Task("add", lambda a, b: a + b, 1, 2)
+    assert task.result() == 3
+    assert task.done.is_set()
+
+    failing = Task("fail", lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        failing.result()
+
+
+def test_read_shortcuts_file(tmp_path):
+    assert read_shortcuts_file(write(tmp_path / "shortcuts", "# Apps\n")) == b"# Apps\n"
+    with pytest.raises(FileNotFoundError):
+        read_shortcuts_file(tmp_path / "missing")
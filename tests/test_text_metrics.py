@@ -0,0 +1,23 @@
+from text_metrics import TextMetrics
+
+
+class CountingFont:
+    """Three pixels per character, counting calls into "Tk"."""
+
+    def __init__(self):
+        self.calls = []
+
+    def measure(self, text):
+        self.calls.append(text)
+        return 3 * len(text)
+
+
+def test_measures_words_once():
+    font = CountingFont()
+    metrics = TextMetrics(font)
+    assert metrics.measure("rofi -show drun") == font.measure("rofi -show drun")
+    font.calls.clear()
+    assert metrics.measure("rofi -show run") == 3 * len("rofi -show run")
+    assert font.calls == ["run"]
+    assert metrics.measure("") == 0
+    assert metrics.measure("a  b") == 3 * len("a  b")
@@ -0,0 +1,104 @@
+import pytest
+
+import theme_cache
+from alacritty_config import lighten_color, merge_tables, parse_alacritty_config
+from layout_cache import LayoutCache
+from theme_cache import load_theme, theme_cache_path
+from tests.conftest import write
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / "cache"))
+    return tmp_path
+
+
+def test_merge_tables():
+    base = {'colors': {'primary': {'background': "#000000", 'foreground': "#ffffff"}}, 'list': [1]}
+    merge_tables(base, {'colors': {'primary': {'background': "#111111"}}, 'list': [2]})
+    assert base == {'colors': {'primary': {'background': "#111111", 'foreground': "#ffffff"}}, 'list': [2]}
+
+
+def test_lighten_color():
+    assert lighten_color("#000000", 0.5) == "#7f7f7f"
+    assert lighten_color("#ffffff", 0.5) == "#ffffff"
+
+
+def test_import_chain_order_and_sources(tmp_path):
+    colors = write(tmp_path / "themes" / "colors.toml",
+                   '[colors.primary]\nbackground = "#111111"\nforeground = "#eeeeee"\n')
+    font = write(tmp_path / "font.toml", '[font]\nsize = 14\n[colors.primary]\nbackground = "#222222"\n')
+    write(tmp_path / "broken.toml", "not = [valid\n")
+    config = write(tmp_path / "alacritty.toml", f"""[general]
+import = ["themes/colors.toml", "{font}", "missing.toml", "broken.toml", "alacritty.toml"]
+
+[colors.primary]
+foreground = "#dddddd"
+""")
+
+    theme = parse_alacritty_config(config)
+    assert theme.background == "#222222"
+    assert theme.foreground == "#dddddd"
+    assert theme.font_size == 14
+    # Broken imports are skipped; missing ones are kept so that creating them is noticed
+    assert theme.sources == [config, colors, font, tmp_path / "missing.toml"]
+
+
+def test_legacy_top_level_import(tmp_path):
+    write(tmp_path / "colors.toml", '[colors.normal]\nred = "#ff0000"\n')
+    config = write(tmp_path / "alacritty.toml", 'import = ["colors.toml"]\n')
+    assert parse_alacritty_config(config).normal_red == "#ff0000"
+
+
+def test_missing_config_uses_defaults(tmp_path):
+    theme = parse_alacritty_config(tmp_path / "missing.toml")
+    assert theme.background == "#2e3440"
+    assert theme.sources == [tmp_path / "missing.toml"]
+
+
+def test_compiled_theme_round_trip(home, monkeypatch):
+    parses = []
+    monkeypatch.setattr(theme_cache, 'parse_alacritty_config',
+                        lambda: parses.append(1) or parse_alacritty_config())
+    alacritty = write(home / ".config" / "alacritty" / "alacritty.toml",
+                      '[general]\nimport = ["colors.toml"]\n[font]\nsize = 12\n')
+    colors = write(alacritty.parent / "colors.toml", '[colors.primary]\nbackground = "#101010"\n')
+    write(home / ".config" / "i3-shortcut-viewer" / "config.toml", "[display]\nvirtualize = true\n")
+    cache_path = theme_cache_path()
+    assert cache_path.parent == home / "cache" / "i3-shortcut-viewer"
+
+    theme, config = load_theme(cache_path=cache_path)
+    # Sharing the layout cache's directory, but never evicted with its entries
+    LayoutCache(max_entries=0).evict()
+    assert cache_path.exists()
+    assert (theme.background, theme.font_size, config.virtualize) == ("#101010", 12, True)
+
+    cached, cached_config = load_theme(cache_path=cache_path)
+    assert parses == [1]
+    assert vars(cached) == vars(theme)
+    assert vars(cached_config) == vars(config)
+
+    # Editing an imported file invalidates the compiled copy
+    write(colors, '[colors.primary]\nbackground = "#202020"\nforeground = "#eeeeee"\n')
+    assert load_theme(cache_path=cache_path)[0].background == "#202020"
+    assert parses == [1, 1]
+
+
+def test_creating_a_missing_import_invalidates_the_compiled_theme(home):
+    alacritty = write(home / ".config" / "alacritty" / "alacritty.toml",
+                      '[general]\nimport = ["colors.toml"]\n')
+    cache_path = theme_cache_path()
+    assert load_theme(cache_path=cache_path)[0].background == "#2e3440"
+    assert load_theme(cache_path=cache_path)[0].background == "#2e3440"
+
+    write(alacritty.parent / "colors.toml", '[colors.primary]\nbackground = "#101010"\n')
+    assert load_theme(cache_path=cache_path)[0].background == "#101010"
+
+
+def test_failed_write_leaves_no_tmp_file(home):
+    write(home / ".config" / "alacritty" / "alacritty.toml", "[font]\nsize = 12\n")
+    cache_path = theme_cache_path()
+    cache_path.mkdir(parents=True)  # os.replace onto a directory fails
+    assert load_theme(cache_path=cache_path)[0].font_size == 12
+    assert list(cache_path.parent.iterdir()) == [cache_path]
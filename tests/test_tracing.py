@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+import tracing
+from tracing import Histogram, Tracer
+
+
+@pytest.fixture
+def tracer(monkeypatch):
+    # Traces are written explicitly here, not at interpreter exit
+    monkeypatch.setattr(tracing.atexit, 'register', lambda func: None)
+    return Tracer()
+
+
+def test_histogram_buckets_and_percentiles():
+    histogram = Histogram()
+    for duration in (0.001, 0.001, 0.002, 0.1):
+        histogram.add(duration, 0.0)
+    data = histogram.to_dict()
+    assert data['count'] == 4
+    assert data['min_ms'] == 1.0 and data['max_ms'] == 100.0
+    assert data['mean_ms'] == pytest.approx(26.0)
+    assert 1.0 <= data['p50_ms'] <= 2.048
+    assert data['p95_ms'] == 100.0
+    assert sum(data['buckets'].values()) == 4
+
+
+def test_startup_phases_are_dropped_when_tracing_is_off(tracer):
+    with tracer.phase('parse'):
+        pass
+    tracer.mark('mapped')
+    assert [name for name, *_ in tracer.phases] == ['parse']
+    tracer.startup_finished()
+    assert tracer.phases == [] and tracer.marks == []
+    with tracer.phase('later'):
+        pass
+    assert tracer.phases == []
+
+
+def test_json_trace(tracer, tmp_path):
+    path = tmp_path / "trace.json"
+    with tracer.phase('parse'):
+        pass
+    tracer.start(str(path))
+    tracer.startup_finished()
+    tracer.count('hover', 2)
+    tracer.observe('search', 0.004)
+    tracer.write()
+
+    data = json.loads(path.read_text())
+    assert [phase['name'] for phase in data['phases']] == ['parse']
+    assert data['counters'] == {'hover': 2}
+    assert data['histograms']['search']['count'] == 1
+
+
+def test_chrome_trace(tracer, tmp_path):
+    path = tmp_path / "trace.json"
+    tracer.start(str(path), 'chrome')
+    tracer.span('load', tracer.origin, tracer.origin + 0.5)
+    tracer.observe('scroll', 0.016)
+    tracer.write()
+
+    events = json.loads(path.read_text())['traceEvents']
+    load = next(event for event in events if event['name'] == 'load')
+    assert (load['ph'], load['ts'], load['dur']) == ('X', 0, 500000)
+    assert any(event['name'] == 'scroll' and event['cat'] == 'runtime' for event in events)
@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from watcher import FileWatcher, file_signature
+from tests.conftest import write
+
+
+def test_file_signature(tmp_path):
+    path = write(tmp_path / "file", "abc")
+    signature = file_signature([path, tmp_path / "missing"])
+    assert signature[0][1] == 3 and signature[1] is None
+    assert file_signature([path]) == signature[:1]
+
+
+@pytest.fixture(params=['inotify', 'poll'])
+def watcher(request, loop):
+    changes = []
+    watcher = FileWatcher(loop, changes.append, poll_ms=20, debounce_ms=20)
+    if request.param == 'poll' and watcher.inotify is not None:
+        loop.deletefilehandler(watcher.inotify.fileno())
+        watcher.inotify.close()
+        watcher.inotify = None
+    watcher.changes = changes
+    yield watcher
+    watcher.stop()
+
+
+def test_reports_changed_files_once(watcher, loop, tmp_path):
+    watched = write(tmp_path / "shortcuts", "one\n")
+    other = write(tmp_path / "other", "x\n")
+    watcher.watch([watched])
+
+    write(other, "changed\n")
+    loop.run(0.2)
+    assert watcher.changes == []
+
+    write(watched, "one two\n")
+    loop.run(2, until=lambda: watcher.changes)
+    loop.run(0.1)
+    assert watcher.changes == [[watched]]
+
+
+def test_replaced_and_deleted_files(watcher, loop, tmp_path):
+    watched = write(tmp_path / "shortcuts", "one\n")
+    watcher.watch([watched])
+
+    # Saved by rename, as many editors do
+    write(tmp_path / "shortcuts.new", "renamed in\n")
+    os.replace(tmp_path / "shortcuts.new", watched)
+    loop.run(2, until=lambda: watcher.changes)
+    assert watcher.changes == [[watched]]
+
+    watched.unlink()
+    loop.run(2, until=lambda: len(watcher.changes) == 2)
+    assert watcher.changes[1] == [watched]
+
+
+def test_new_file_in_a_watched_directory(watcher, loop, tmp_path):
+    included = write(tmp_path / "conf.d" / "a.conf", "a\n")
+    watcher.watch([included, included.parent])
+
+    write(tmp_path / "conf.d" / "b.conf", "b\n")
+    loop.run(2, until=lambda: watcher.changes)
+    loop.run(0.1)
+    assert watcher.changes == [[included.parent]]
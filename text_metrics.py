@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+
+
+class TextMetrics:
+    """Memoized pixel widths of text in one tkinter.font.Font.
+
+    Text containing spaces is measured as the sum of its words plus the
+    spaces between them, so every distinct word costs one call into Tk no
+    matter how many commands it appears in. Tk doesn't kern, so the sum is
+    the width Tk itself would draw.
+    """
+
+    def __init__(self, font):
+        self.font = font
+        self.widths = {}
+        self.space = font.measure(" ")
+
+    def measure(self, text: str) -> int:
+        width = self.widths.get(text)
+        if width is None:
+            if " " in text:
+                width = sum(self.measure(word) for word in text.split(" ")) + self.space * text.count(" ")
+            else:
+                width = self.font.measure(text) if text else 0
+            self.widths[text] = width
+        return width
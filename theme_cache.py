@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+import json
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from alacritty_config import AlacrittyTheme, default_alacritty_path, parse_alacritty_config
+from config_loader import Config, config_locations, load_config
+from layout_cache import default_cache_dir
+from tracing import tracer
+from watcher import file_signature
+
+THEME_CACHE_VERSION = 2
+
+# (color attribute, factor) shades the viewer derives with lighten_color
+SHADES = (('background', 0.1), ('background', 0.15), ('background', 0.2))
+
+
+def theme_cache_path() -> Path:
+    # Not *.json, which the layout cache treats as its own entries to evict
+    return default_cache_dir() / "theme.cache"
+
+
+def load_theme(script_dir: Optional[Path] = None,
+               cache_path: Optional[Path] = None) -> Tuple[AlacrittyTheme, Config]:
+    """The theme and config, compiled into one small cached file.
+
+    The cached copy is used while every file it was built from, i.e. the
+    whole Alacritty import chain and every config.toml location, still has
+    the same mtime and size; otherwise the TOML files are parsed again.
+    """
+    cache_path = cache_path or theme_cache_path()
+    roots = [str(default_alacritty_path())] + [str(p) for p in config_locations(script_dir)]
+
+    cached = read_compiled(cache_path, roots)
+    if cached is not None:
+        return cached
+
+    with tracer.phase('parse_alacritty_config'):
+        theme = parse_alacritty_config()
+    with tracer.phase('load_config'):
+        config = load_config(script_dir)
+    for attribute, factor in SHADES:
+        theme.shade(getattr(theme, attribute), factor)
+
+    write_compiled(cache_path, roots, theme, config, theme.sources + config_locations(script_dir))
+    return theme, config
+
+
+def read_compiled(cache_path: Path, roots: List[str]) -> Optional[Tuple[AlacrittyTheme, Config]]:
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data['version'] != THEME_CACHE_VERSION or data['roots'] != roots:
+            return None
+
+        paths = [Path(p) for p, _, _ in data['dependencies']]
+        recorded = tuple(None if mtime is None else (mtime, size)
+                         for _, mtime, size in data['dependencies'])
+        if file_signature(paths) != recorded:
+            return None
+
+        theme = AlacrittyTheme()
+        for name, value in data['theme'].items():
+            if hasattr(theme, name):
+                setattr(theme, name, value)
+        theme.sources = [Path(p) for p in data['sources']]
+
+        config = Config()
+        for name, value in data['config'].items():
+            if hasattr(config, name):
+                setattr(config, name, value)
+        return theme, config
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def write_compiled(cache_path: Path, roots: List[str], theme: AlacrittyTheme, config: Config,
+                   dependencies: List[Path]):
+    signature = file_signature(dependencies)
+    theme_values = {name: value for name, value in vars(theme).items() if name != 'sources'}
+    data = {
+        'version': THEME_CACHE_VERSION,
+        'roots': roots,
+        'dependencies': [[str(p), s[0] if s else None, s[1] if s else None]
+                         for p, s in zip(dependencies, signature)],
+        'sources': [str(p) for p in theme.sources],
+        'theme': theme_values,
+        'config': vars(config),
+    }
+
+    tmp_path = cache_path.with_suffix(f".tmp{os.getpid()}")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+TRACE_ENV = 'I3_SHORTCUTS_VIEWER_TRACE'
+TRACE_FORMAT_ENV = 'I3_SHORTCUTS_VIEWER_TRACE_FORMAT'
+FORMATS = ('json', 'chrome')
+DEFAULT_TRACE_PATH = 'i3-shortcuts-viewer-trace.json'
+
+# Individual samples kept per histogram for the Chrome trace
+MAX_SAMPLES = 10000
+
+
+class Histogram:
+    """Count, sum, extremes and power-of-two microsecond buckets of durations."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = {}
+        # (start, duration) pairs, newest last
+        self.samples = deque(maxlen=MAX_SAMPLES)
+
+    def add(self, duration: float, start: Optional[float] = None):
+        self.count += 1
+        self.total += duration
+        if self.min is None or duration < self.min:
+            self.min = duration
+        if self.max is None or duration > self.max:
+            self.max = duration
+        bucket = int(duration * 1e6).bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.samples.append((start if start is not None else time.monotonic() - duration, duration))
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given fraction of samples, in seconds."""
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= fraction * self.count:
+                return min((1 << bucket) / 1e6, self.max)
+        return self.max or 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'min_ms': (self.min or 0.0) * 1000,
+            'max_ms': (self.max or 0.0) * 1000,
+            'p50_ms': self.percentile(0.5) * 1000,
+            'p95_ms': self.percentile(0.95) * 1000,
+            'buckets': {f"<{(1 << bucket) / 1000:g}ms": n for bucket, n in sorted(self.buckets.items())},
+        }
+
+
+class _Phase:
+    def __init__(self, tracer, name: str):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.span(self.name, self.start, time.monotonic())
+
+
+class _NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class Tracer:
+    """Startup phases, counters and histograms, written out at exit.
+
+    Startup phases are buffered from import until the window is first mapped,
+    so phases that run before the command line is parsed are not lost; they
+    are dropped if tracing is never enabled. Hot paths check `enabled` before
+    doing any work, so tracing costs one attribute test when it is off.
+    """
+
+    def __init__(self):
+        self.origin = time.monotonic()
+        self.enabled = False
+        self.recording = True
+        self.path = None
+        self.format = FORMATS[0]
+        self.phases = []  # (name, start, end, thread id)
+        self.marks = []  # (name, time)
+        self.counters = {}
+        self.histograms = {}
+
+    def start(self, path: str = None, trace_format: str = None):
+        if self.enabled:
+            return
+        self.enabled = True
+        self.path = path or DEFAULT_TRACE_PATH
+        if trace_format in FORMATS:
+            self.format = trace_format
+        atexit.register(self.write)
+
+    def start_from_env(self):
+        path = os.environ.get(TRACE_ENV)
+        if path:
+            self.start(path, os.environ.get(TRACE_FORMAT_ENV))
+
+    def startup_finished(self):
+        """Stop buffering startup phases; discard them if tracing is off."""
+        self.recording = False
+        if not self.enabled:
+            self.phases = []
+            self.marks = []
+
+    def phase(self, name: str):
+        """Context manager timing one phase."""
+        if self.enabled or self.recording:
+            return _Phase(self, name)
+        return _NULL_PHASE
+
+    def span(self, name: str, start: float, end: float):
+        if self.enabled or self.recording:
+            self.phases.append((name, start, end, threading.get_ident()))
+
+    def mark(self, name: str):
+        if self.enabled or self.recording:
+            self.marks.append((name, time.monotonic()))
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name: str, duration: float, start: Optional[float] = None):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.add(duration, start)
+
+    def to_dict(self) -> dict:
+        def ms(t):
+            return (t - self.origin) * 1000
+
+        return {
+            'phases': [{'name': name, 'start_ms': ms(start), 'duration_ms': (end - start) * 1000}
+                       for name, start, end, _ in self.phases],
+            'marks': {name: ms(t) for name, t in self.marks},
+            'counters': dict(self.counters),
+            'histograms': {name: h.to_dict() for name, h in self.histograms.items()},
+        }
+
+    def chrome_events(self) -> list:
+        """Events in the Chrome trace-event format (chrome://tracing, Perfetto)."""
+        pid = os.getpid()
+        main_thread = threading.main_thread().ident
+
+        def us(t):
+            return (t - self.origin) * 1e6
+
+        events = []
+        for name, start, end, tid in self.phases:
+            events.append({'name': name, 'cat': 'startup', 'ph': 'X', 'pid': pid, 'tid': tid,
+                           'ts': us(start), 'dur': (end - start) * 1e6})
+        for name, t in self.marks:
+            events.append({'name': name, 'cat': 'startup', 'ph': 'i', 's': 'p', 'pid': pid,
+                           'tid': main_thread, 'ts': us(t)})
+        for name, histogram in self.histograms.items():
+            for start, duration in histogram.samples:
+                events.append({'name': name, 'cat': 'runtime', 'ph': 'X', 'pid': pid,
+                               'tid': main_thread, 'ts': us(start), 'dur': duration * 1e6})
+        end = us(time.monotonic())
+        for name, value in self.counters.items():
+            events.append({'name': name, 'ph': 'C', 'pid': pid, 'tid': main_thread,
+                           'ts': end, 'args': {'value': value}})
+        return events
+
+    def write(self):
+        if not self.enabled:
+            return
+        if self.format == 'chrome':
+            data = {'traceEvents': self.chrome_events(), 'displayTimeUnit': 'ms'}
+        else:
+            data = self.to_dict()
+        try:
+            with open(self.path, 'w') as f:
+                json.dump(data, f, indent=1)
+        except OSError:
+            pass
+
+
+tracer = Tracer()
@@ -1,40 +1,189 @@
 #!/usr/bin/env python3
 
 import re
-import subprocess
-import tkinter as tk
-from tkinter import scrolledtext, messagebox
+from bisect import bisect_left, bisect_right
+import sys
+import time
 from pathlib import Path
-from parser import parse_shortcuts_file
-from alacritty_config import parse_alacritty_config
-from config_loader import load_config
+from types import SimpleNamespace
+from tracing import DEFAULT_TRACE_PATH, FORMATS, TRACE_ENV, tracer
+
+with tracer.phase('import tkinter'):
+    import tkinter as tk
+    import tkinter.font as tkfont
+    from tkinter import scrolledtext
+
+from parser import IncludeGraph, default_shortcuts_path, iter_shortcut_groups, parse_include_graph
+from config_loader import VIRTUALIZE_THRESHOLD, config_locations
+from theme_cache import load_theme
+from daemon import DaemonServer
+from launcher import Launcher
+from frecency import FrecencyStore
+from startup import StartupPipeline
+from i3_ipc import I3ConfigSource, texts_content
+from chords import MODIFIER_KEYSYMS, ChordIndex, format_chord, load_variables
+from watcher import FileWatcher, file_signature
+from document import (WRAP_INDICATOR, DocumentBuilder, RowIndex, Rows, apply_document, build_document,
+                      diff_documents, diff_layout, elided_lines, header_line, keybinding_width, map_line,
+                      wrap_command_text)
+from layout_cache import LayoutCache, settings_key
+from search_index import MODES, SearchIndex
+from background_search import BackgroundSearch
+from virtual_view import VirtualTextView
+from smooth_scroll import SmoothScroller
+from text_metrics import TextMetrics
+
+
+# Lines rendered synchronously before the window first paints
+FIRST_SCREEN_LINES = 100
+# Seconds of parsing and layout per idle chunk while streaming the rest
+FRAME_BUDGET = 0.006
+
+INITIAL_WIDTH = 900
+INITIAL_HEIGHT = 600
+# Tab stop used while streaming, before the widest keybinding is known
+PROVISIONAL_TAB = 350
+# Space between the widest keybinding and the command column
+KEYBINDING_GAP = "    "
+# The keybinding column never takes more than this share of the width
+MAX_KEYBINDING_COLUMN = 0.45
+# Resizes are reflowed once they have stopped for this long
+REFLOW_DEBOUNCE_MS = 150
+# Search matches are tagged this many screens above and below the view
+HIGHLIGHT_MARGIN_SCREENS = 1
+# How long a launch failure stays in the status line
+STATUS_MS = 5000
+# How often the recent panel checks whether the usage history is loaded
+RECENT_POLL_MS = 20
+# Chord mode gives the keyboard back after this long without a key press
+CHORD_GRAB_MS = 10000
+
+
+def show_error(message: str):
+    # messagebox is only imported once there is something to report
+    from tkinter import messagebox
+    messagebox.showerror("Error", message)
+
+
+def range_gaps(ranges: list, lo: int, hi: int) -> list:
+    """The parts of [lo, hi) not covered by sorted, disjoint [a, b) ranges."""
+    gaps = []
+    for a, b in ranges:
+        if b <= lo:
+            continue
+        if a >= hi:
+            break
+        if a > lo:
+            gaps.append((lo, a))
+        lo = max(lo, b)
+    if lo < hi:
+        gaps.append((lo, hi))
+    return gaps
+
+
+def merge_range(ranges: list, lo: int, hi: int) -> list:
+    """Sorted, disjoint ranges with [lo, hi) added."""
+    merged = []
+    for a, b in sorted(ranges + [(lo, hi)]):
+        if merged and a <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], b))
+        else:
+            merged.append((a, b))
+    return merged
 
 
 class ShortcutsViewer:
-    def __init__(self, root, script_dir=None):
+    def __init__(self, root, script_dir=None, daemon=False, on_loaded=None, launcher=None,
+                 i3_source=None, frecency=None, pipeline=None):
         self.root = root
+        self.script_dir = script_dir
+        self.daemon = daemon
+        self.on_loaded = on_loaded
+        self.i3_source = i3_source
+        self.launcher = launcher or Launcher()
+        if self.launcher.root is None:
+            self.launcher.attach(root)
+        self.launcher.on_failure = self.on_launch_failure
+        self.frecency = frecency or FrecencyStore()
+        # The usage history is read on the store's own thread
+        self.frecency.start()
         self.root.title("i3 Shortcuts")
-        self.root.geometry("900x600")
-
-        self.theme = parse_alacritty_config()
-        config = load_config(script_dir)
+        self.root.geometry(f"{INITIAL_WIDTH}x{INITIAL_HEIGHT}")
+
+        with tracer.phase('load_theme'):
+            # With a pipeline this only waits for the worker started before Tk
+            self.theme, config = pipeline.theme() if pipeline else load_theme(script_dir)
+        self.config = config
+        if i3_source is not None and config.i3_ipc:
+            # Connects on a worker; the shortcuts are reloaded once i3's texts are in
+            i3_source.start(pipeline.i3_task if pipeline else None)
         self.font_size = config.font_size
         # Make header font larger than regular font (use config value if larger, otherwise add 4)
         self.header_font_size = max(config.header_font_size, config.font_size + 4)
         self.wrap_mode = tk.WORD if config.wrap_command else tk.NONE
 
-        self.search_matches = []
+        self.search_matches = []  # List of (line, col, length) in document coordinates
+        self.search_index = None
+        self.search_mode = MODES[0]
+        self.search_key = None  # (query, mode) of the last submitted search
+        self.search_refresh = False  # The pending search only refreshes the current one
+        self.background_search = BackgroundSearch(root, self.apply_search_result)
         self.current_match_index = -1
-
-        # Smooth scrolling state
-        self.scroll_animation_id = None
-        self.scroll_velocity = 0
-        self.scroll_target = 0
+        # n and N visit matches in this order, most frecent rows first
+        self.match_order = []
+        self.match_position = -1
+        # Only matches near the view are tagged; these [lo, hi) index ranges of search_matches are
+        self.highlighted = []
+        self.highlight_id = None
+        self.current_tag = None  # Widget (start, end) of the search_current tag
+
+        # Filtering hides rows without a match; folded groups show only their header.
+        # Both are elided in place, never re-rendered.
+        self.filter_mode = False
+        self.folded = set()  # Names of folded groups
+        self.hidden_lines = []  # (first, last) document lines currently elided
+        self.folded_headers = []
+
+        # Smooth scrolling, in pixels
+        self.scroller = SmoothScroller(root, self.scroll_pixels)
+        font = tkfont.Font(root, family=self.theme.font_family, size=self.font_size)
+        self.line_height = font.metrics('linespace')
+
+        # Layout is measured in pixels of the text font
+        self.metrics = TextMetrics(font)
+        self.layout = None  # (tab stop, command wrap width) of the current document
+        self.reflow_id = None
+
+        self.search_submitted = None  # When the pending search was typed, while tracing
 
         # Shortcut row tracking for hover and click
-        self.shortcut_rows = []  # List of (start_line, end_line, command)
+        self.groups = []
+        # Included files and the directories includes were matched in
+        self.include_paths = []
+        self.document = None
+        self.virtual = None
+        self.stream = None
+        self.stream_id = None
+        self.render_calls = 0  # Widget calls made by the last full render
+        self.shortcut_rows = Rows()  # The document's rows, shared rather than copied
+        self.row_index = RowIndex(self.shortcut_rows)
         self.current_hover_row = None
 
+        # Press-a-chord-to-jump mode; the index is rebuilt after every load
+        self.chord_index = None
+        self.chord_index_id = None
+        self.chord_variables = None  # $mod and friends from the i3 config
+        self.clash_rows = []  # Rows whose chord is bound more than once, in order
+        self.chord_frame = None
+        self.chord_grab_id = None
+        self.chord_matches = []
+        self.chord_match_index = -1
+
+        # Hover updates are coalesced to one per frame
+        self.hover_position = None
+        self.hover_update_id = None
+        self.hover_stats = {'events': 0, 'updates': 0, 'changes': 0, 'widget_calls': 0}
+
         main_frame = tk.Frame(root, bg=self.theme.background)
         main_frame.pack(fill=tk.BOTH, expand=True)
 
@@ -43,7 +192,7 @@ class ShortcutsViewer:
         self.search_frame.pack(fill=tk.X, side=tk.TOP)
         self.search_frame.pack_forget()
 
-        search_label = tk.Label(
+        self.search_label = search_label = tk.Label(
             self.search_frame,
             text="Search:",
             bg=search_bg,
@@ -66,6 +215,8 @@ class ShortcutsViewer:
         self.search_entry.bind('<KeyRelease>', self.on_search_change)
         self.search_entry.bind('<Escape>', self.close_search)
         self.search_entry.bind('<Return>', lambda e: self.next_match())
+        self.search_entry.bind('<Control-r>', self.cycle_search_mode)
+        self.search_entry.bind('<Control-f>', self.toggle_filter)
 
         self.search_info = tk.Label(
             self.search_frame,
@@ -77,6 +228,25 @@ class ShortcutsViewer:
         )
         self.search_info.pack(side=tk.RIGHT, pady=8)
 
+        # The most frecent shortcuts, pinned above the list when enabled
+        self.recent_frame = None
+        self.recent_keys = (None, {})  # (groups, their (keybinding, command) -> is_exec)
+        self.recent_id = None
+        if config.recent_shortcuts:
+            self.recent_frame = tk.Frame(main_frame, bg=self.lighten_color(self.theme.background, 0.1))
+
+        # Launch failures, shown under the list for a few seconds
+        self.status_label = tk.Label(
+            main_frame,
+            text="",
+            anchor=tk.W,
+            bg=search_bg,
+            fg=self.theme.bright_red,
+            font=(self.theme.font_family, 9),
+            padx=10
+        )
+        self.status_id = None
+
         self.text_widget = scrolledtext.ScrolledText(
             main_frame,
             wrap=self.wrap_mode,
@@ -92,8 +262,13 @@ class ShortcutsViewer:
             highlightthickness=0
         )
         self.text_widget.pack(fill=tk.BOTH, expand=True)
+        self.text_widget.configure(yscrollcommand=self.on_text_scroll)
+        if pipeline is not None:
+            # The width is known now; decode the cache entry while the rest of the window is built
+            pipeline.lookup_layout(self.shortcut_texts(),
+                                   settings_key(self.config, self.theme, self.content_width()))
 
-        tab_position = 350
+        tab_position = PROVISIONAL_TAB
         self.text_widget.configure(tabs=(tab_position,))
 
         self.text_widget.tag_config('header', foreground=self.theme.bright_blue, font=(self.theme.font_family, self.header_font_size, 'bold'))
@@ -104,14 +279,19 @@ class ShortcutsViewer:
         self.text_widget.tag_config('search_highlight', background=self.theme.normal_yellow, foreground=self.theme.background)
         self.text_widget.tag_config('search_current', background=self.theme.bright_green, foreground=self.theme.background)
         self.text_widget.tag_config('hover_highlight', background=self.lighten_color(self.theme.background, 0.1))
+        self.text_widget.tag_config('chord_clash', foreground=self.theme.bright_red, underline=True)
+        self.text_widget.tag_config('chord_match', background=self.lighten_color(self.theme.background, 0.25))
+        self.text_widget.tag_config('elided', elide=True)
+        self.text_widget.tag_config('folded', foreground=self.theme.normal_blue)
         self.text_widget.tag_raise('search_highlight')
         self.text_widget.tag_raise('search_current')
 
         self.text_widget.bind('<<Copy>>', self.handle_copy)
 
         self.root.bind('/', self.open_search)
-        self.root.bind('n', lambda e: self.next_match())
-        self.root.bind('N', lambda e: self.prev_match())
+        self.root.bind('n', lambda e: self.on_match_key(e, self.next_match))
+        self.root.bind('N', lambda e: self.on_match_key(e, self.prev_match))
+        self.root.bind('k', lambda e: self.on_match_key(e, self.open_chord_mode))
         self.root.bind('<Escape>', self.handle_escape)
 
         # Scrolling keybindings
@@ -132,46 +312,50 @@ class ShortcutsViewer:
         self.text_widget.bind('<Button-1>', self.on_mouse_click)
         self.text_widget.bind('<Leave>', self.on_mouse_leave)
 
-        self.load_shortcuts()
+        # Re-wrap when the window is resized
+        self.text_widget.bind('<Configure>', self.on_configure)
+
+        with tracer.phase('load_shortcuts'):
+            self.load_shortcuts(pipeline)
+        if pipeline is not None:
+            pipeline.finish()
 
         self.text_widget.config(state=tk.DISABLED)
 
     def lighten_color(self, hex_color: str, factor: float) -> str:
-        hex_color = hex_color.lstrip('#')
-        r = int(hex_color[0:2], 16)
-        g = int(hex_color[2:4], 16)
-        b = int(hex_color[4:6], 16)
-
-        r = min(255, int(r + (255 - r) * factor))
-        g = min(255, int(g + (255 - g) * factor))
-        b = min(255, int(b + (255 - b) * factor))
-
-        return f'#{r:02x}{g:02x}{b:02x}'
-
-    def wrap_command_text(self, command: str, max_width: int = 60) -> list:
-        if not self.wrap_mode or self.wrap_mode == tk.NONE:
-            return [command]
-
-        if len(command) <= max_width:
-            return [command]
-
-        lines = []
-        current_line = ""
-        words = command.split()
-
-        for word in words:
-            test_line = f"{current_line} {word}".strip()
-            if len(test_line) <= max_width:
-                current_line = test_line
-            else:
-                if current_line:
-                    lines.append(current_line)
-                current_line = word
-
-        if current_line:
-            lines.append(current_line)
-
-        return lines if lines else [command]
+        return self.theme.shade(hex_color, factor)
+
+    def wrap_command_text(self, command: str, max_width: int = None) -> list:
+        if max_width is None:
+            max_width = self.layout[1] if self.layout else self.column_layout(0)[1]
+        return wrap_command_text(command, max_width, self.wrap_mode != tk.NONE, self.metrics.measure)
+
+    def content_width(self) -> int:
+        """Width in pixels available to text in the text widget."""
+        width = self.text_widget.winfo_width()
+        if width <= 1:
+            # Not mapped yet; assume the initial geometry
+            width = INITIAL_WIDTH - self.text_widget.vbar.winfo_reqwidth()
+        return width - 2 * int(self.text_widget.cget('padx'))
+
+    def column_layout(self, widest_keybinding: int, tab: int = None) -> tuple:
+        """(tab stop, command wrap width) in pixels for the current width."""
+        content = self.content_width()
+        if tab is None:
+            tab = min(widest_keybinding + self.metrics.measure(KEYBINDING_GAP),
+                      int(content * MAX_KEYBINDING_COLUMN))
+        max_width = content - tab - self.metrics.measure(WRAP_INDICATOR)
+        return tab, max(max_width, self.metrics.measure("m" * 10))
+
+    def set_layout(self, layout: tuple):
+        tab = layout[0]
+        if self.layout is None or self.layout[0] != tab:
+            self.text_widget.configure(tabs=(tab,))
+            self.text_widget.tag_config('command', lmargin2=tab)
+        self.layout = layout
+
+    def layout_document(self, groups: list, layout: tuple):
+        return build_document(groups, self.wrap_mode != tk.NONE, layout[1], self.metrics.measure)
 
     def handle_copy(self, event=None):
         try:
@@ -185,267 +369,1344 @@ class ShortcutsViewer:
         except tk.TclError:
             pass
 
-    def load_shortcuts(self):
+    def shortcut_texts(self):
+        """What i3 has loaded, keyed by path, or None to read the files on disk."""
+        if self.i3_source is None or not self.config.i3_ipc:
+            return None
+        return self.i3_source.texts_for(default_shortcuts_path())
+
+    def cache_lookup(self):
+        """Return (cache, key, content_hash, cached entry or None)."""
+        filepath = default_shortcuts_path()
+        if not filepath.exists():
+            raise FileNotFoundError(f"Shortcuts file not found: {filepath}")
+
+        with tracer.phase('layout cache lookup'):
+            texts = self.shortcut_texts()
+            content = filepath.read_bytes() if texts is None else texts_content(texts)
+            cache = LayoutCache()
+            settings = settings_key(self.config, self.theme, self.content_width())
+            key, content_hash = cache.make_key(content, settings)
+            return cache, key, content_hash, cache.load(key, content_hash)
+
+    def read_shortcuts(self):
+        """Return (groups, document, layout), from the layout cache when possible."""
+        cache, key, content_hash, cached = self.cache_lookup()
+        if cached is not None:
+            groups, document, self.include_paths = cached
+            return groups, document, self.column_layout(document.keybinding_width)
+
+        with tracer.phase('parse_shortcuts_file'):
+            groups, graph = parse_include_graph(default_shortcuts_path(), self.shortcut_texts())
+        self.include_paths = graph.dependencies()
+        layout = self.column_layout(keybinding_width(groups, self.metrics.measure))
+        document = self.layout_document(groups, layout)
+        cache.store(key, content_hash, groups, document, self.include_paths)
+        return groups, document, layout
+
+    def load_shortcuts(self, pipeline=None):
         try:
-            groups = parse_shortcuts_file()
-
-            if not groups:
-                self.text_widget.insert(tk.END, "No shortcuts found.\n")
+            if pipeline is not None:
+                cache, _, content_hash, cached = pipeline.layout()
+            else:
+                cache, _, content_hash, cached = self.cache_lookup()
+            if cached is None:
+                self.start_stream(cache, content_hash)
                 return
 
-            for i, group in enumerate(groups):
-                if i > 0:
-                    self.text_widget.insert(tk.END, "\n")
-
-                self.text_widget.insert(tk.END, f"{group.name}\n", 'header')
-                self.text_widget.insert(tk.END, "─" * 80 + "\n", 'separator')
-
-                for keybinding, command in group.shortcuts:
-                    # Record the start position of this shortcut row
-                    start_pos = self.text_widget.index(tk.INSERT)
-                    start_line = int(start_pos.split('.')[0])
-
-                    command_lines = self.wrap_command_text(command)
-
-                    self.text_widget.insert(tk.END, keybinding, 'keybinding')
-                    self.text_widget.insert(tk.END, "\t")
-                    self.text_widget.insert(tk.END, f"{command_lines[0]}\n", 'command')
+            self.groups, self.document, self.include_paths = cached
+            self.set_layout(self.column_layout(self.document.keybinding_width))
+            self.shortcut_rows = self.document.rows
+            self.row_index = RowIndex(self.shortcut_rows)
+            self.search_index = SearchIndex(self.document)
+
+            virtualize = self.config.virtualize
+            if virtualize is None:
+                virtualize = len(self.document.lines) > VIRTUALIZE_THRESHOLD
+
+            if virtualize:
+                self.virtual = VirtualTextView(self.text_widget, self.text_widget.vbar, self.document,
+                                               on_render=self.on_virtual_render,
+                                               on_scroll=self.on_view_scrolled)
+                self.virtual.render(1)
+            else:
+                self.render_calls = apply_document(self.text_widget, self.document)
+                if tracer.enabled:
+                    tracer.count('render widget calls', self.render_calls)
+            self.schedule_chord_index()
+            self.schedule_recent()
+            if self.folded:
+                self.update_elision()
 
-                    for continuation_line in command_lines[1:]:
-                        self.text_widget.insert(tk.END, "\t")
-                        self.text_widget.insert(tk.END, "↳ ", 'wrap_indicator')
-                        self.text_widget.insert(tk.END, f"{continuation_line}\n", 'command')
+        except Exception as e:
+            self.report_load_error(e)
 
-                    # Record the end position of this shortcut row
-                    end_pos = self.text_widget.index(tk.INSERT)
-                    end_line = int(end_pos.split('.')[0])
+    def report_load_error(self, error):
+        if isinstance(error, FileNotFoundError):
+            show_error(str(error))
+        else:
+            show_error(f"Failed to load shortcuts: {error}")
+        self.root.destroy()
+
+    def start_stream(self, cache, content_hash):
+        """Parse and render progressively: the first screenful right away,
+        the rest in time-sliced idle chunks."""
+        self.stream_started = time.monotonic()
+        self.stream_graph = IncludeGraph()
+        self.stream = iter_shortcut_groups(default_shortcuts_path(), self.stream_graph,
+                                           self.shortcut_texts())
+        # The key is recomputed at the end, for the width the stream ends up laid out at
+        self.stream_cache = (cache, content_hash)
+        # The widest keybinding is only known at the end; reflow() fixes up the columns then
+        self.set_layout(self.column_layout(0, PROVISIONAL_TAB))
+        self.stream_builder = DocumentBuilder(self.wrap_mode != tk.NONE, self.layout[1],
+                                              self.metrics.measure)
+
+        self.groups = []
+        self.document = self.stream_builder.document
+        # Rows appear in these as the builder appends them
+        self.shortcut_rows = self.document.rows
+        self.row_index = RowIndex(self.shortcut_rows)
+        self.search_index = SearchIndex(self.document)
+        self.rendered_lines = 0
+        self.rendered_rows = 0
+
+        self.stream_step(first_screen=True)
+
+    def stream_step(self, first_screen=False):
+        self.stream_id = None
+        start = time.monotonic()
+        done = False
 
-                    # Store the shortcut row info (start_line, end_line, command)
-                    self.shortcut_rows.append((start_line, end_line - 1, command))
+        try:
+            while True:
+                group = next(self.stream, None)
+                if group is None:
+                    done = True
+                    self.stream_builder.finish()
+                    break
+
+                self.groups.append(group)
+                self.stream_builder.add_group(group)
+                if first_screen:
+                    if len(self.document.lines) >= FIRST_SCREEN_LINES:
+                        break
+                elif time.monotonic() - start >= FRAME_BUDGET:
+                    break
+        except Exception as e:
+            self.stream = None
+            self.report_load_error(e)
+            return
 
-                self.text_widget.insert(tk.END, "\n")
+        self.extend_rendered()
 
-        except FileNotFoundError as e:
-            messagebox.showerror("Error", str(e))
-            self.root.destroy()
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load shortcuts: {e}")
-            self.root.destroy()
+        if done:
+            self.finish_stream()
+        else:
+            self.stream_id = self.root.after_idle(self.stream_step)
+
+    def extend_rendered(self):
+        """Render lines, rows and index entries added since the last chunk."""
+        document = self.document
+        new_rows = len(document.rows) > self.rendered_rows
+        self.rendered_rows = len(document.rows)
+        self.search_index.extend(document)
+
+        virtualize = self.config.virtualize
+        if virtualize is None:
+            virtualize = len(document.lines) > VIRTUALIZE_THRESHOLD
+
+        if virtualize and not self.virtual:
+            top_line = self.document_line(int(self.text_widget.index('@0,0').split('.')[0]))
+            state = self.text_widget.cget('state')
+            self.text_widget.config(state=tk.NORMAL)
+            self.text_widget.delete('1.0', tk.END)
+            self.text_widget.config(state=state)
+            self.virtual = VirtualTextView(self.text_widget, self.text_widget.vbar, document,
+                                           on_render=self.on_virtual_render,
+                                           on_scroll=self.on_view_scrolled)
+            self.virtual.render(top_line - self.virtual.margin)
+            self.text_widget.yview(f"{top_line - self.virtual.offset}.0")
+        elif self.virtual:
+            self.virtual.document_extended()
+        elif len(document.lines) > self.rendered_lines:
+            state = self.text_widget.cget('state')
+            self.text_widget.config(state=tk.NORMAL)
+            first = self.rendered_lines + 1
+            calls = apply_document(self.text_widget, document, first, target=first)
+            self.render_calls += calls
+            if tracer.enabled:
+                tracer.count('render widget calls', calls)
+            self.text_widget.config(state=state)
+        self.rendered_lines = len(document.lines)
+        if self.folded and new_rows:
+            self.update_elision()
+
+        if self.hover_position is not None and new_rows:
+            self.update_hover()
+
+        if self.search_key and self.search_key[0]:
+            # Let the active search pick up the new content without jumping
+            self.search_refresh = True
+            self.background_search.submit(self.search_index, *self.search_key)
+
+    def finish_stream(self):
+        cache, content_hash = self.stream_cache
+        self.stream = None
+        tracer.span('parse_shortcuts_file (streamed)', self.stream_started, time.monotonic())
+        self.include_paths = self.stream_graph.dependencies()
+        # Size the keybinding column now that every binding has been seen
+        self.reflow()
+        # The window may have been resized while streaming
+        key = cache.hash_key(content_hash, settings_key(self.config, self.theme, self.content_width()))
+        cache.store(key, content_hash, self.groups, self.document, self.include_paths)
+        self.schedule_chord_index()
+        self.schedule_recent()
+        if self.on_loaded:
+            self.on_loaded(self)
+
+    def cancel_stream(self):
+        if self.stream_id is not None:
+            self.root.after_cancel(self.stream_id)
+            self.stream_id = None
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+    def close(self):
+        """Stop timers that would otherwise fire into destroyed widgets."""
+        self.cancel_stream()
+        self.close_chord_mode()
+        if self.chord_index_id is not None:
+            self.root.after_cancel(self.chord_index_id)
+            self.chord_index_id = None
+        if self.recent_id is not None:
+            self.root.after_cancel(self.recent_id)
+            self.recent_id = None
+        if self.status_id is not None:
+            self.root.after_cancel(self.status_id)
+            self.status_id = None
+        self.background_search.cancel()
+        self.scroller.stop()
+        if self.reflow_id is not None:
+            self.root.after_cancel(self.reflow_id)
+            self.reflow_id = None
+        if self.hover_update_id is not None:
+            self.root.after_cancel(self.hover_update_id)
+            self.hover_update_id = None
+        if self.highlight_id is not None:
+            self.root.after_cancel(self.highlight_id)
+            self.highlight_id = None
 
     def open_search(self, event=None):
-        self.search_frame.pack(fill=tk.X, side=tk.TOP, before=self.text_widget)
+        below = self.text_widget
+        if self.recent_frame is not None and self.recent_frame.winfo_manager():
+            below = self.recent_frame
+        self.search_frame.pack(fill=tk.X, side=tk.TOP, before=below)
         self.search_entry.focus()
         return "break"
 
     def close_search(self, event=None):
         self.search_frame.pack_forget()
         self.search_entry.delete(0, tk.END)
+        self.background_search.cancel()
+        self.search_key = None
         self.clear_search_highlights()
+        if self.filter_mode:
+            self.update_elision()
         self.text_widget.focus()
         return "break"
 
     def handle_escape(self, event=None):
-        if self.search_frame.winfo_ismapped():
+        if self.chord_frame is not None and self.chord_frame.winfo_manager():
+            self.close_chord_mode()
+        elif self.search_frame.winfo_ismapped():
             self.close_search()
+        elif self.daemon:
+            self.hide()
         else:
             self.root.destroy()
         return "break"
 
+    def show(self):
+        self.root.deiconify()
+        self.root.lift()
+        self.root.focus_force()
+        self.text_widget.focus_set()
+
+    def hide(self):
+        if self.search_frame.winfo_ismapped():
+            self.close_search()
+        self.close_chord_mode()
+        self.scroller.stop()
+        self.on_mouse_leave(None)
+        self.root.withdraw()
+
+    def is_shown(self) -> bool:
+        return self.root.state() == 'normal'
+
+    def settings_paths(self) -> list:
+        return self.theme.sources + config_locations(self.script_dir)
+
+    def shortcuts_paths(self) -> list:
+        if self.shortcut_texts() is not None:
+            # Changes are picked up when i3 reloads, not when the files are saved
+            return []
+        return [default_shortcuts_path()] + self.include_paths
+
+    def reload_shortcuts(self):
+        """Replace the displayed shortcuts without rebuilding the window."""
+        self.cancel_stream()
+        self.background_search.cancel()
+        self.search_key = None
+        self.clear_search_highlights()
+        self.clear_chord_match()
+        self.chord_index = None
+        self.clash_rows = []
+        self.hidden_lines, self.folded_headers = [], []
+        self.current_hover_row = None
+        self.shortcut_rows = Rows()
+        self.row_index = RowIndex(self.shortcut_rows)
+        if self.virtual:
+            self.virtual.destroy()
+            self.virtual = None
+        self.text_widget.config(state=tk.NORMAL)
+        self.text_widget.delete('1.0', tk.END)
+        self.load_shortcuts()
+        try:
+            self.text_widget.config(state=tk.DISABLED)
+        except tk.TclError:
+            # load_shortcuts reported an error and destroyed the window
+            pass
+
+    def live_reload(self):
+        """Re-read the shortcuts and patch only the lines that changed.
+
+        Scroll position, hover and the active search are carried over.
+        """
+        if self.document is None or self.stream is not None:
+            self.reload_shortcuts()
+            return
+
+        try:
+            groups, document, layout = self.read_shortcuts()
+        except Exception:
+            # Most likely caught mid-save; the next change event retries
+            return
+
+        if layout != self.layout:
+            # Bring the current text to the new columns first, so the diff is only about content
+            self.reflow(layout)
+
+        ops = diff_documents(self.document, self.groups, document, groups)
+        self.groups = groups
+        if not ops:
+            self.document = document
+            return
+
+        self.replace_document(document, ops)
+
+    def replace_document(self, document, ops):
+        """Switch to document, which differs from the shown one only in the
+        line ranges of ops. Scroll position, hover and search are kept."""
+        top_line = self.document_line(int(self.text_widget.index('@0,0').split('.')[0]))
+        if self.current_hover_row is not None:
+            self.untag_row('hover_highlight', self.current_hover_row)
+            self.current_hover_row = None
+        # Tagged positions are about to go stale; the search below re-tags
+        self.remove_search_highlights()
+        self.search_matches = []
+
+        self.clear_chord_match()
+        self.document = document
+        if self.virtual:
+            # Hidden lines are worked out again for the new document below
+            self.virtual.set_hidden([])
+            self.virtual.set_document(document, map_line(ops, top_line))
+        else:
+            state = self.text_widget.cget('state')
+            self.text_widget.config(state=tk.NORMAL)
+            for old_start, old_end, new_start, new_end in reversed(ops):
+                self.text_widget.delete(f"{old_start}.0", f"{old_end}.0")
+                if new_end > new_start:
+                    apply_document(self.text_widget, document, new_start, new_end - 1, target=old_start)
+            self.text_widget.config(state=state)
+            self.text_widget.yview(f"{map_line(ops, top_line)}.0")
+
+        self.shortcut_rows = document.rows
+        self.row_index = RowIndex(self.shortcut_rows)
+        self.search_index = SearchIndex(document)
+        self.schedule_chord_index()
+        self.schedule_recent()
+
+        if self.hover_position is not None:
+            self.update_hover()
+
+        if self.search_key and self.search_key[0]:
+            self.background_search.cancel()
+            query, mode = self.search_key
+            try:
+                self.apply_search_result(self.search_index.search(query, mode), keep_current=True)
+            except re.error as e:
+                self.apply_search_result(None, e)
+        self.update_elision()
+
+    def on_configure(self, event):
+        if self.reflow_id is not None:
+            self.root.after_cancel(self.reflow_id)
+        self.reflow_id = self.root.after(REFLOW_DEBOUNCE_MS, self.reflow)
+
+    def reflow(self, layout: tuple = None):
+        """Re-wrap for the current width and widest keybinding, re-rendering
+        only the rows whose wrapping changed."""
+        if self.reflow_id is not None:
+            self.root.after_cancel(self.reflow_id)
+            self.reflow_id = None
+        if self.document is None or self.stream is not None or not self.groups:
+            return
+
+        if layout is None:
+            layout = self.column_layout(self.document.keybinding_width)
+        if layout == self.layout:
+            return
+
+        rewrap = self.wrap_mode != tk.NONE and layout[1] != self.layout[1]
+        self.set_layout(layout)
+        if not rewrap:
+            return
+
+        document = self.layout_document(self.groups, layout)
+        ops = diff_layout(self.document, document)
+        if ops:
+            self.replace_document(document, ops)
+        else:
+            self.document = document
+
+    def view_state(self) -> dict:
+        query = self.search_entry.get() if self.search_frame.winfo_ismapped() else None
+        return {'top': self.yview()[0], 'query': query, 'mode': self.search_mode,
+                'filter': self.filter_mode, 'folded': self.folded}
+
+    def restore_view_state(self, state: dict):
+        self.folded = state['folded']
+        self.filter_mode = state['filter']
+        self.update_search_label()
+        self.update_elision()
+        self.yview_moveto(state['top'])
+        if state['query'] is not None:
+            while self.search_mode != state['mode']:
+                self.cycle_search_mode()
+            self.open_search()
+            self.search_entry.insert(0, state['query'])
+            self.on_search_change()
+
     def clear_search_highlights(self):
-        self.text_widget.tag_remove('search_highlight', '1.0', tk.END)
-        self.text_widget.tag_remove('search_current', '1.0', tk.END)
+        self.remove_search_highlights()
         self.search_matches = []
         self.current_match_index = -1
+        self.match_order = []
+        self.match_position = -1
         self.search_info.config(text="")
 
-    def on_search_change(self, event=None):
-        self.clear_search_highlights()
-        query = self.search_entry.get()
+    def cycle_search_mode(self, event=None):
+        self.search_mode = MODES[(MODES.index(self.search_mode) + 1) % len(MODES)]
+        self.update_search_label()
+        self.on_search_change()
+        return "break"
 
-        if not query:
+    def toggle_filter(self, event=None):
+        """Switch between highlighting matches and hiding the rows without one."""
+        self.filter_mode = not self.filter_mode
+        self.update_search_label()
+        self.update_elision()
+        return "break"
+
+    def update_search_label(self):
+        label = "Filter" if self.filter_mode else "Search"
+        if self.search_mode != MODES[0]:
+            label = f"{label} ({self.search_mode})"
+        self.search_label.config(text=f"{label}:")
+
+    def update_elision(self):
+        """Elide filtered rows and folded groups, and show the rest."""
+        if self.document is None:
+            return
+        start = time.monotonic()
+        match_lines = None
+        if self.filter_mode and self.search_key and self.search_key[0]:
+            match_lines = [line for line, _, _ in self.search_matches]
+        folded = ()
+        if self.folded:
+            folded = {i for i, group in enumerate(self.groups[:len(self.document.blocks)])
+                      if group.name in self.folded}
+
+        hidden, headers = elided_lines(self.document, match_lines, folded)
+        if not (hidden or headers or self.hidden_lines or self.folded_headers):
+            # Nothing was hidden and nothing is to be
+            return
+        self.hidden_lines, self.folded_headers = hidden, headers
+
+        if self.virtual:
+            # The window is re-rendered around the top line; on_virtual_render tags it
+            top_line = self.document_line(int(self.text_widget.index('@0,0').split('.')[0]))
+            self.virtual.set_hidden(hidden)
+            self.virtual.render(self.virtual.step(top_line, -self.virtual.margin))
+            self.text_widget.yview(f"{top_line - self.virtual.offset}.0")
+        else:
+            self.apply_elision_tags()
+        if tracer.enabled:
+            tracer.observe('elide latency', time.monotonic() - start, start)
+
+    def apply_elision_tags(self):
+        """Tag the hidden lines and folded headers, as far as they are rendered."""
+        self.text_widget.tag_remove('elided', '1.0', tk.END)
+        self.text_widget.tag_remove('folded', '1.0', tk.END)
+        offset = 0
+        hidden = self.hidden_lines
+        headers = self.folded_headers
+        if self.virtual:
+            offset = self.virtual.offset
+            last = offset + self.virtual.count
+            hidden = self.virtual.hidden_between(offset + 1, last)
+            headers = headers[bisect_left(headers, offset + 1):bisect_right(headers, last)]
+
+        indices = []
+        for first, last in hidden:
+            indices.append(f"{first - offset}.0")
+            indices.append(f"{last - offset + 1}.0")
+        if indices:
+            self.text_widget.tag_add('elided', *indices)
+        indices = []
+        for line in headers:
+            indices.append(f"{line - offset}.0")
+            indices.append(f"{line - offset}.end")
+        if indices:
+            self.text_widget.tag_add('folded', *indices)
+
+    def header_block(self, line: int):
+        """Index of the group whose header is on line, or None."""
+        blocks = self.document.blocks if self.document else []
+        i = bisect_right([block[0] for block in blocks], line) - 1
+        if i >= 0 and header_line(self.document, i) == line and i < len(self.groups):
+            return i
+        return None
+
+    def toggle_fold(self, block: int):
+        name = self.groups[block].name
+        if name in self.folded:
+            self.folded.discard(name)
+        else:
+            self.folded.add(name)
+        self.update_elision()
+
+    def reveal_line(self, line: int):
+        """Unfold the group holding line, so it can be scrolled to."""
+        if not self.folded or self.document is None:
             return
+        blocks = self.document.blocks
+        i = bisect_right([block[0] for block in blocks], line) - 1
+        if 0 <= i < len(self.groups) and self.groups[i].name in self.folded \
+                and line != header_line(self.document, i):
+            self.toggle_fold(i)
+
+    def widget_index(self, line: int, col) -> str:
+        """Widget index for a document position, or None when it isn't rendered."""
+        if self.virtual:
+            return self.virtual.widget_index(line, col)
+        return f"{line}.{col}"
+
+    def document_line(self, widget_line: int) -> int:
+        if self.virtual:
+            return self.virtual.document_line(widget_line)
+        return widget_line
 
-        self.text_widget.config(state=tk.NORMAL)
+    def on_search_change(self, event=None):
+        """Submit the query for debounced matching on the search thread."""
+        query = self.search_entry.get()
+        if (query, self.search_mode) == self.search_key:
+            # Keys that don't edit the query (Return, arrows) keep the current match
+            return
+        self.search_key = (query, self.search_mode)
+        self.search_refresh = False
+        if tracer.enabled:
+            self.search_submitted = time.monotonic()
+
+        if not query or self.search_index is None:
+            self.background_search.cancel()
+            self.clear_search_highlights()
+            if self.filter_mode:
+                self.update_elision()
+            return
 
-        start = '1.0'
-        while True:
-            pos = self.text_widget.search(query, start, stopindex=tk.END, nocase=True)
-            if not pos:
-                break
+        self.background_search.submit(self.search_index, query, self.search_mode)
+
+    def apply_search_result(self, result, error=None, keep_current=False):
+        """Show the latest search result; runs on the Tk thread.
+
+        With keep_current the current match keeps its number and the view
+        doesn't move, which is what a live reload wants.
+        """
+        if self.search_submitted is not None and not self.search_refresh:
+            tracer.observe('on_search_change latency', time.monotonic() - self.search_submitted,
+                           self.search_submitted)
+            self.search_submitted = None
+        keep_current = keep_current or self.search_refresh
+        self.search_refresh = False
+        previous_position = self.match_position
+        self.clear_search_highlights()
 
-            end = f"{pos}+{len(query)}c"
-            self.text_widget.tag_add('search_highlight', pos, end)
-            self.search_matches.append(pos)
-            start = end
+        if error is not None:
+            self.search_info.config(text="Invalid regex")
+            return
 
-        self.text_widget.config(state=tk.DISABLED)
+        self.search_matches = result.matches
+        self.match_order = self.rank_matches()
+        if self.filter_mode:
+            self.update_elision()
+        self.apply_search_highlights()
 
         if self.search_matches:
-            self.current_match_index = 0
-            self.highlight_current_match()
+            if keep_current and previous_position >= 0:
+                self.match_position = min(previous_position, len(self.search_matches) - 1)
+                self.current_match_index = self.match_order[self.match_position]
+                self.highlight_current_match(scroll=False)
+            else:
+                self.match_position = 0
+                self.current_match_index = self.match_order[0]
+                self.highlight_current_match()
             self.update_search_info()
         else:
             self.search_info.config(text="No matches")
 
-    def highlight_current_match(self):
+    def rank_matches(self):
+        """Indices of search_matches, rows run most often and most recently
+        first, the rest in document order."""
+        matches = self.search_matches
+        scores = self.frecency.scores() if len(self.frecency) else None
+        if not scores:
+            return range(len(matches))
+
+        rows = self.shortcut_rows
+        commands = {command for _, command in scores}
+        ranked = []
+        for i, (line, _, _) in enumerate(matches):
+            row = self.row_index.find(line)
+            # Most matches are in commands never run; skip building their keys
+            if row is None or rows.commands[row] not in commands:
+                continue
+            score = scores.get((self.row_keybinding(row), rows.commands[row]))
+            if score:
+                ranked.append((-score, i))
+        if not ranked:
+            return range(len(matches))
+
+        ranked.sort()
+        order = [i for _, i in ranked]
+        first = set(order)
+        order.extend(i for i in range(len(matches)) if i not in first)
+        return order
+
+    def visible_lines(self) -> tuple:
+        """Document lines from the margin above the view to the margin below it."""
+        top = self.document_line(int(self.text_widget.index('@0,0').split('.')[0]))
+        bottom_index = self.text_widget.index(f"@0,{self.text_widget.winfo_height()}")
+        bottom = self.document_line(int(bottom_index.split('.')[0]))
+        margin = (bottom - top + 1) * HIGHLIGHT_MARGIN_SCREENS
+        first, last = top - margin, bottom + margin
+        if self.virtual:
+            first = max(first, self.virtual.offset + 1)
+            last = min(last, self.virtual.offset + self.virtual.count)
+        return first, last
+
+    def apply_search_highlights(self):
+        """Tag the matches around the view that aren't tagged yet.
+
+        The cost depends on the size of the window, not on how many
+        matches there are; scrolling extends the tagged ranges as it goes.
+        """
+        if self.highlight_id is not None:
+            self.root.after_cancel(self.highlight_id)
+            self.highlight_id = None
+        matches = self.search_matches
+        if not matches:
+            return
+
+        first, last = self.visible_lines()
+        lo = bisect_left(matches, (first,))
+        hi = bisect_left(matches, (last + 1,))
+        indices = []
+        for a, b in range_gaps(self.highlighted, lo, hi):
+            for line, col, length in matches[a:b]:
+                start = self.widget_index(line, col)
+                if start is not None:
+                    indices.append(start)
+                    indices.append(f"{start}+{length}c")
+        if lo < hi:
+            self.highlighted = merge_range(self.highlighted, lo, hi)
+
+        if indices:
+            self.text_widget.tag_add('search_highlight', *indices)
+            if tracer.enabled:
+                tracer.count('search highlight tags', len(indices) // 2)
+
+    def remove_search_highlights(self):
+        """Untag only the lines apply_search_highlights tagged."""
+        if self.highlight_id is not None:
+            self.root.after_cancel(self.highlight_id)
+            self.highlight_id = None
+        matches = self.search_matches
+        for lo, hi in self.highlighted:
+            start = self.widget_index(matches[lo][0], 0)
+            end = self.widget_index(matches[hi - 1][0], 'end')
+            if start is not None and end is not None:
+                self.text_widget.tag_remove('search_highlight', start, end)
+        self.highlighted = []
+        if self.current_tag is not None:
+            self.text_widget.tag_remove('search_current', *self.current_tag)
+            self.current_tag = None
+
+    def on_text_scroll(self, lo, hi):
+        self.text_widget.vbar.set(lo, hi)
+        self.on_view_scrolled()
+
+    def on_view_scrolled(self):
+        if self.search_matches and self.highlight_id is None:
+            self.highlight_id = self.root.after_idle(self.apply_search_highlights)
+
+    def highlight_current_match(self, scroll=True):
         if not self.search_matches or self.current_match_index < 0:
             return
 
-        self.text_widget.tag_remove('search_current', '1.0', tk.END)
+        if self.current_tag is not None:
+            self.text_widget.tag_remove('search_current', *self.current_tag)
+            self.current_tag = None
 
-        pos = self.search_matches[self.current_match_index]
-        query = self.search_entry.get()
-        end = f"{pos}+{len(query)}c"
+        line, col, length = self.search_matches[self.current_match_index]
+        if scroll:
+            self.reveal_line(line)
+        if self.virtual and scroll:
+            self.virtual.see(line, col)
 
-        self.text_widget.config(state=tk.NORMAL)
+        pos = self.widget_index(line, col)
+        if pos is None:
+            return
+        end = f"{pos}+{length}c"
         self.text_widget.tag_add('search_current', pos, end)
-        self.text_widget.config(state=tk.DISABLED)
-
-        self.text_widget.see(pos)
+        self.current_tag = (pos, end)
+        if scroll:
+            self.text_widget.see(pos)
+
+    def on_virtual_render(self):
+        """Re-apply hover and search tags after the virtual window moved."""
+        # Rendering replaced the widget's text, and its tags with it
+        self.highlighted = []
+        self.current_tag = None
+        if self.hidden_lines or self.folded_headers:
+            self.apply_elision_tags()
+        if self.search_matches:
+            self.apply_search_highlights()
+            if self.current_match_index >= 0:
+                line, col, length = self.search_matches[self.current_match_index]
+                pos = self.widget_index(line, col)
+                if pos is not None:
+                    self.current_tag = (pos, f"{pos}+{length}c")
+                    self.text_widget.tag_add('search_current', *self.current_tag)
+
+        if self.current_hover_row is not None:
+            self.tag_row('hover_highlight', self.current_hover_row)
+        if self.clash_rows:
+            self.apply_clash_tags()
+        if self.chord_matches:
+            self.tag_row('chord_match', self.chord_matches[self.chord_match_index])
 
     def update_search_info(self):
         if self.search_matches:
             total = len(self.search_matches)
-            current = self.current_match_index + 1
+            current = self.match_position + 1
             self.search_info.config(text=f"{current}/{total}")
         else:
             self.search_info.config(text="")
 
+    def on_match_key(self, event, step):
+        # n/N typed into the search bar are part of the query
+        if event.widget is self.search_entry:
+            return
+        step()
+
     def next_match(self):
+        self.background_search.flush()
         if not self.search_matches:
             return
 
-        self.current_match_index = (self.current_match_index + 1) % len(self.search_matches)
+        self.match_position = (self.match_position + 1) % len(self.search_matches)
+        self.current_match_index = self.match_order[self.match_position]
         self.highlight_current_match()
         self.update_search_info()
 
     def prev_match(self):
+        self.background_search.flush()
         if not self.search_matches:
             return
 
-        self.current_match_index = (self.current_match_index - 1) % len(self.search_matches)
+        self.match_position = (self.match_position - 1) % len(self.search_matches)
+        self.current_match_index = self.match_order[self.match_position]
         self.highlight_current_match()
         self.update_search_info()
 
+    def schedule_chord_index(self):
+        # Built after the first paint; it isn't needed before a key is pressed
+        if self.chord_index_id is None:
+            self.chord_index_id = self.root.after_idle(self.index_chords)
+
+    def index_chords(self):
+        """Normalize every keybinding into the chord index and flag clashes."""
+        self.chord_index_id = None
+        if self.chord_variables is None:
+            self.chord_variables = load_variables()
+        start = time.monotonic()
+        self.chord_index = ChordIndex(self.groups, self.chord_variables)
+        clashes = self.chord_index.clashes()
+        self.clash_rows = sorted(row for _, rows in clashes for row in rows)
+        if tracer.enabled:
+            tracer.span('chord index', start, time.monotonic())
+            tracer.count('chord clashes', len(clashes))
+        self.apply_clash_tags()
+
+    def apply_clash_tags(self):
+        """Mark the keybindings of clashing rows, as far as they are rendered."""
+        self.text_widget.tag_remove('chord_clash', '1.0', tk.END)
+        rows = self.shortcut_rows
+        lo, hi = 0, len(self.clash_rows)
+        if self.virtual:
+            first_line = self.virtual.offset + 1
+            last_line = self.virtual.offset + self.virtual.count
+            lo = bisect_left(self.clash_rows, bisect_left(rows.starts, first_line))
+            hi = bisect_right(self.clash_rows, bisect_right(rows.starts, last_line) - 1)
+
+        indices = []
+        for row in self.clash_rows[lo:hi]:
+            start = self.widget_index(rows.starts[row], 0)
+            if start is not None:
+                indices.append(start)
+                indices.append(f"{start}+{rows.splits[row]}c")
+        if indices:
+            self.text_widget.tag_add('chord_clash', *indices)
+
+    def open_chord_mode(self):
+        """Take the keyboard and jump to whichever binding is pressed next."""
+        if self.chord_frame is None:
+            self.chord_frame = tk.Frame(self.search_frame.master, bg=self.search_frame.cget('bg'),
+                                        takefocus=True)
+            tk.Label(self.chord_frame, text="Press a binding:", bg=self.chord_frame.cget('bg'),
+                     fg=self.theme.foreground, font=(self.theme.font_family, self.font_size),
+                     padx=10).pack(side=tk.LEFT, pady=8)
+            self.chord_info = tk.Label(self.chord_frame, text="", bg=self.chord_frame.cget('bg'),
+                                       fg=self.theme.bright_blue, font=(self.theme.font_family, 9),
+                                       padx=10)
+            self.chord_info.pack(side=tk.RIGHT, pady=8)
+            self.chord_frame.bind('<KeyPress>', self.on_chord_key)
+            # The grab must not outlive the frame, e.g. when the window manager unmaps us
+            self.chord_frame.bind('<Unmap>', lambda e: self.close_chord_mode())
+
+        if self.search_frame.winfo_ismapped():
+            self.close_search()
+        self.chord_frame.pack(fill=tk.X, side=tk.TOP, before=self.text_widget)
+        self.chord_info.config(text="" if self.chord_index else "Indexing…")
+        self.chord_frame.focus_set()
+        # i3 grabs its bindings itself; only a keyboard grab lets them through to us.
+        # It is server-wide, so it is always released on a timer as well
+        try:
+            self.root.grab_set_global()
+        except tk.TclError:
+            pass
+        self.schedule_chord_timeout()
+
+    def schedule_chord_timeout(self):
+        if self.chord_grab_id is not None:
+            self.root.after_cancel(self.chord_grab_id)
+        self.chord_grab_id = self.root.after(CHORD_GRAB_MS, self.on_chord_timeout)
+
+    def on_chord_timeout(self):
+        self.chord_grab_id = None
+        self.close_chord_mode()
+
+    def close_chord_mode(self):
+        if self.chord_grab_id is not None:
+            self.root.after_cancel(self.chord_grab_id)
+            self.chord_grab_id = None
+        try:
+            self.root.grab_release()
+        except tk.TclError:
+            pass
+        if self.chord_frame is None or not self.chord_frame.winfo_manager():
+            return
+        self.chord_frame.pack_forget()
+        self.clear_chord_match()
+        self.text_widget.focus()
+
+    def on_chord_key(self, event):
+        # Before anything that could raise, so the grab still times out
+        self.schedule_chord_timeout()
+        keysym = event.keysym
+        state = event.state if isinstance(event.state, int) else 0
+        if keysym == 'Escape' and not state & 0xFF:
+            self.close_chord_mode()
+            return "break"
+        if keysym.lower() in MODIFIER_KEYSYMS or self.chord_index is None:
+            return "break"
+
+        chord, rows = self.chord_index.find_event(state, keysym)
+        if not rows:
+            self.clear_chord_match()
+            self.chord_info.config(text=f"{format_chord((state & 0xFF, keysym.lower()))} is not bound")
+            return "break"
+
+        # Pressing the same chord again steps through its other rows
+        if rows is self.chord_matches:
+            index = (self.chord_match_index + 1) % len(rows)
+        else:
+            index = 0
+        self.show_chord_match(rows, index)
+
+        text = format_chord(chord)
+        if len(rows) > 1:
+            kind = "conflict" if self.chord_index.is_conflict(rows) else "duplicate"
+            text = f"{text}  {index + 1}/{len(rows)} {kind}"
+        self.chord_info.config(text=text)
+        return "break"
+
+    def show_chord_match(self, rows, index):
+        self.clear_chord_match()
+        self.chord_matches = rows
+        self.chord_match_index = index
+        line = self.shortcut_rows.starts[rows[index]]
+        self.reveal_line(line)
+        if self.virtual:
+            self.virtual.see(line, 0)
+        self.tag_row('chord_match', rows[index])
+        pos = self.widget_index(line, 0)
+        if pos is not None:
+            self.text_widget.see(pos)
+
+    def clear_chord_match(self):
+        if self.chord_matches:
+            row = self.chord_matches[self.chord_match_index]
+            if row < len(self.shortcut_rows):
+                self.untag_row('chord_match', row)
+        self.chord_matches = []
+        self.chord_match_index = -1
+
     def scroll_up(self, event=None):
-        self.add_scroll_velocity(-0.08)
+        self.scroll_lines(-3)
         return "break"
 
     def scroll_down(self, event=None):
-        self.add_scroll_velocity(0.08)
+        self.scroll_lines(3)
         return "break"
 
     def scroll_page_up(self, event=None):
-        self.add_scroll_velocity(-0.8)
+        self.scroll_page(-1)
         return "break"
 
     def scroll_page_down(self, event=None):
-        self.add_scroll_velocity(0.8)
+        self.scroll_page(1)
         return "break"
 
     def on_mousewheel(self, event):
         # Windows and macOS
-        delta = -0.03 * (event.delta / 120)
-        self.add_scroll_velocity(delta)
+        self.scroll_lines(-3 * event.delta / 120)
         return "break"
 
     def on_mousewheel_linux_up(self, event):
         # Linux scroll up
-        self.add_scroll_velocity(-0.08)
+        self.scroll_lines(-3)
         return "break"
 
     def on_mousewheel_linux_down(self, event):
         # Linux scroll down
-        self.add_scroll_velocity(0.08)
+        self.scroll_lines(3)
         return "break"
 
-    def add_scroll_velocity(self, delta):
-        self.scroll_velocity += delta
-        # Clamp velocity to reasonable bounds
-        self.scroll_velocity = max(-2.0, min(2.0, self.scroll_velocity))
+    def viewport_height(self) -> int:
+        padding = 2 * int(self.text_widget.cget('pady'))
+        return max(self.line_height, self.text_widget.winfo_height() - padding)
 
-        # Start animation if not already running
-        if self.scroll_animation_id is None:
-            self.animate_scroll()
-
-    def animate_scroll(self):
-        if abs(self.scroll_velocity) < 0.001:
-            # Animation complete
-            self.scroll_velocity = 0
-            self.scroll_animation_id = None
-            return
+    def scroll_lines(self, lines: float):
+        # Held keys and fast wheels build up to at most a screenful of glide
+        self.scroller.impulse(lines * self.line_height, limit=self.viewport_height())
 
-        # Get current scroll position
-        current_pos = self.text_widget.yview()[0]
+    def scroll_page(self, pages: int):
+        height = self.viewport_height()
+        self.scroller.impulse(pages * height * 0.9, limit=3 * height)
 
-        # Calculate new position
-        new_pos = current_pos + self.scroll_velocity * 0.02
-        new_pos = max(0.0, min(1.0, new_pos))
+    def scroll_pixels(self, pixels: int) -> bool:
+        """Scroll the text by pixels; False once it can't move any further."""
+        before = self.yview()
+        self.text_widget.yview_scroll(pixels, 'pixels')
+        return self.yview() != before
 
-        # Update view
-        self.text_widget.yview_moveto(new_pos)
+    def yview(self):
+        if self.virtual:
+            return self.virtual.yview()
+        return self.text_widget.yview()
 
-        # Apply friction/damping
-        self.scroll_velocity *= 0.85
-
-        # Continue animation
-        self.scroll_animation_id = self.root.after(16, self.animate_scroll)  # ~60 FPS
+    def yview_moveto(self, fraction):
+        if self.virtual:
+            self.virtual.yview_moveto(fraction)
+        else:
+            self.text_widget.yview_moveto(fraction)
+
+    def row_range(self, row_index):
+        """Widget (start, end) indices of the rendered part of a row, or None."""
+        start_line, end_line = self.shortcut_rows.starts[row_index], self.shortcut_rows.ends[row_index]
+        if self.virtual:
+            start_line = max(start_line, self.virtual.offset + 1)
+            end_line = min(end_line, self.virtual.offset + self.virtual.count)
+            if start_line > end_line:
+                return None
+        return self.widget_index(start_line, 0), self.widget_index(end_line, 'end')
+
+    def tag_row(self, tag, row_index):
+        """Tag the rendered part of a shortcut row."""
+        row_range = self.row_range(row_index)
+        if row_range:
+            self.text_widget.tag_add(tag, *row_range)
+
+    def untag_row(self, tag, row_index):
+        row_range = self.row_range(row_index)
+        if row_range:
+            self.text_widget.tag_remove(tag, *row_range)
 
     def get_row_at_position(self, x, y):
         """Get the shortcut row index at the given mouse position, or None."""
         index = self.text_widget.index(f"@{x},{y}")
-        line = int(index.split('.')[0])
-
-        for i, (start_line, end_line, command) in enumerate(self.shortcut_rows):
-            if start_line <= line <= end_line:
-                return i
-        return None
+        line = self.document_line(int(index.split('.')[0]))
+        return self.row_index.find(line)
 
     def on_mouse_motion(self, event):
-        """Handle mouse motion to highlight rows on hover."""
-        row_index = self.get_row_at_position(event.x, event.y)
+        """Record the pointer and schedule at most one hover update per frame."""
+        self.hover_stats['events'] += 1
+        if tracer.enabled:
+            tracer.count('on_mouse_motion')
+        self.hover_position = (event.x, event.y)
+        if self.hover_update_id is None:
+            self.hover_update_id = self.root.after(16, self.update_hover)
+
+    def update_hover(self):
+        """Highlight the row under the pointer, touching only the old and new rows."""
+        self.hover_update_id = None
+        if self.hover_position is None:
+            return
+
+        stats = self.hover_stats
+        stats['updates'] += 1
+        row_index = self.get_row_at_position(*self.hover_position)
+        stats['widget_calls'] += 1
 
         if row_index != self.current_hover_row:
-            # Clear previous hover highlight
-            self.text_widget.tag_remove('hover_highlight', '1.0', tk.END)
+            stats['changes'] += 1
+            if self.current_hover_row is not None:
+                self.untag_row('hover_highlight', self.current_hover_row)
+                stats['widget_calls'] += 1
 
             if row_index is not None:
                 # Highlight the new row
-                start_line, end_line, _ = self.shortcut_rows[row_index]
-                self.text_widget.tag_add('hover_highlight', f"{start_line}.0", f"{end_line}.end")
-                self.text_widget.config(cursor="hand2")
+                self.tag_row('hover_highlight', row_index)
+                if self.current_hover_row is None:
+                    self.text_widget.config(cursor="hand2")
+                    stats['widget_calls'] += 1
+                stats['widget_calls'] += 1
             else:
                 self.text_widget.config(cursor="")
+                stats['widget_calls'] += 1
 
             self.current_hover_row = row_index
 
     def on_mouse_leave(self, event):
         """Clear hover highlight when mouse leaves the widget."""
-        self.text_widget.tag_remove('hover_highlight', '1.0', tk.END)
+        if self.hover_update_id is not None:
+            self.root.after_cancel(self.hover_update_id)
+            self.hover_update_id = None
+        self.hover_position = None
+        if self.current_hover_row is not None:
+            self.untag_row('hover_highlight', self.current_hover_row)
         self.text_widget.config(cursor="")
         self.current_hover_row = None
 
     def on_mouse_click(self, event):
-        """Execute the command when clicking on a shortcut row."""
+        """Execute the command when clicking on a shortcut row; fold or
+        unfold a group when clicking its header."""
         row_index = self.get_row_at_position(event.x, event.y)
 
-        if row_index is not None:
-            _, _, command = self.shortcut_rows[row_index]
-            try:
-                # Execute the command in the background
-                subprocess.Popen(command, shell=True, start_new_session=True,
-                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to execute command: {e}")
+        if row_index is None:
+            index = self.text_widget.index(f"@{event.x},{event.y}")
+            block = self.header_block(self.document_line(int(index.split('.')[0])))
+            if block is not None:
+                self.toggle_fold(block)
+                return "break"
+        else:
+            self.launch_shortcut(self.row_keybinding(row_index), self.shortcut_rows.commands[row_index],
+                                 self.row_is_exec(row_index))
             return "break"
 
+    def row_keybinding(self, row: int) -> str:
+        rows = self.shortcut_rows
+        return self.document.lines[rows.starts[row] - 1][:rows.splits[row]]
+
+    def row_is_exec(self, row: int) -> bool:
+        """Whether row's binding used exec, rather than being an i3 command."""
+        blocks = self.document.blocks
+        i = bisect_right([block[2] for block in blocks], row) - 1
+        if not 0 <= i < len(self.groups):
+            return True
+        return bool(self.groups[i].execs[row - blocks[i][2]])
+
+    def launch_shortcut(self, keybinding: str, command: str, is_exec: bool = True):
+        start = time.monotonic()
+        # Started by the helper; failures come back through on_launch_failure
+        if self.launcher.launch(command, is_exec):
+            # Only updates memory; the log is written on the store's own thread
+            self.frecency.record(keybinding, command)
+            self.schedule_recent()
+        if tracer.enabled:
+            tracer.observe('on_mouse_click spawn', time.monotonic() - start, start)
+
+    def schedule_recent(self):
+        if self.recent_frame is not None and self.recent_id is None:
+            self.recent_id = self.root.after_idle(self.refresh_recent)
+
+    def refresh_recent(self):
+        """Fill the pinned panel with the most frecent shortcuts that are
+        still in the file."""
+        self.recent_id = None
+        if self.document is None or self.stream is not None:
+            return
+        if not self.frecency.loaded:
+            # Check back once the store's thread has read the history
+            self.recent_id = self.root.after(RECENT_POLL_MS, self.refresh_recent)
+            return
+        if self.recent_keys[0] is not self.groups:
+            self.recent_keys = (self.groups, {(modifiers + key, command): is_exec for group in self.groups
+                                              for modifiers, key, command, is_exec
+                                              in zip(group.modifiers, group.keys, group.commands,
+                                                     group.execs)})
+        present = self.recent_keys[1]
+        recent = [key for key in self.frecency.recent() if key in present]
+        recent = recent[:self.config.recent_shortcuts]
+
+        frame = self.recent_frame
+        for child in frame.winfo_children():
+            child.destroy()
+        if not recent:
+            frame.pack_forget()
+            return
+
+        bg = frame.cget('bg')
+        hover_bg = self.lighten_color(self.theme.background, 0.2)
+        font = (self.theme.font_family, self.font_size)
+        tk.Label(frame, text="Recent", bg=bg, fg=self.theme.bright_blue,
+                 font=(self.theme.font_family, self.font_size, 'bold')).grid(
+            row=0, column=0, columnspan=2, sticky=tk.W, padx=15, pady=(8, 2))
+        for row, (keybinding, command) in enumerate(recent, 1):
+            labels = (tk.Label(frame, text=keybinding, bg=bg, fg=self.theme.bright_green, font=font,
+                               cursor="hand2"),
+                      tk.Label(frame, text=command, bg=bg, fg=self.theme.foreground, font=font,
+                               cursor="hand2"))
+            for column, label in enumerate(labels):
+                label.grid(row=row, column=column, sticky=tk.W, padx=(15, 0) if column == 0 else (30, 15),
+                           pady=(0, 8) if row == len(recent) else 0)
+                label.bind('<Button-1>', lambda e, k=keybinding, c=command, x=present[(keybinding, command)]:
+                           self.launch_shortcut(k, c, x))
+                label.bind('<Enter>', lambda e, ls=labels: self.paint_labels(ls, hover_bg))
+                label.bind('<Leave>', lambda e, ls=labels: self.paint_labels(ls, bg))
+        frame.pack(fill=tk.X, side=tk.TOP, before=self.text_widget)
+
+    @staticmethod
+    def paint_labels(labels, bg: str):
+        for label in labels:
+            label.config(bg=bg)
+
+    def on_launch_failure(self, command: str, message: str):
+        # Not a message box: a modal dialog on every failed click would block the window
+        self.show_status(f"Failed to execute {command}: {message}")
+
+    def show_status(self, message: str):
+        self.status_label.config(text=message)
+        self.status_label.pack(fill=tk.X, side=tk.BOTTOM, before=self.text_widget)
+        if self.status_id is not None:
+            self.root.after_cancel(self.status_id)
+        self.status_id = self.root.after(STATUS_MS, self.hide_status)
+
+    def hide_status(self):
+        self.status_id = None
+        self.status_label.pack_forget()
+
+
+class ViewerApp:
+    """Owns the viewer window for its whole lifetime.
+
+    Source files are watched: theme or config changes rebuild the widgets,
+    shortcut changes are patched into the existing text. When the shortcuts
+    come from i3 over IPC, they are patched when i3 reloads instead. In
+    daemon mode the window starts withdrawn and is mapped on request over
+    the socket.
+    """
+
+    def __init__(self, root, script_dir=None, daemon=False, on_loaded=None, launcher=None,
+                 pipeline=None):
+        self.root = root
+        self.script_dir = script_dir
+        self.daemon = daemon
+        self.on_loaded = on_loaded
+        self.launcher = launcher or Launcher()
+        # Outlives rebuilds of the viewer, like the launcher
+        self.frecency = FrecencyStore()
+        # Only the first build uses what the pipeline read; rebuilds read afresh
+        self.pipeline = pipeline
+        self.i3_source = I3ConfigSource(root, self.on_i3_reload)
+        self.server = DaemonServer(root, self.handle_command) if daemon else None
+        self.watcher = None
+        self.viewer = None
+
+    def build(self):
+        state = None
+        if self.viewer:
+            state = self.viewer.view_state()
+            self.viewer.close()
+        for child in self.root.winfo_children():
+            child.destroy()
+        pipeline, self.pipeline = self.pipeline, None
+        self.viewer = ShortcutsViewer(self.root, self.script_dir, daemon=self.daemon,
+                                      on_loaded=self.on_viewer_loaded, launcher=self.launcher,
+                                      i3_source=self.i3_source, frecency=self.frecency,
+                                      pipeline=pipeline)
+        if not self.viewer.config.i3_ipc:
+            self.i3_source.stop()
+        if self.daemon:
+            self.root.protocol('WM_DELETE_WINDOW', self.viewer.hide)
+        if state:
+            self.viewer.restore_view_state(state)
+        self.watch()
+
+    def watch(self):
+        self.settings_signature = file_signature(self.viewer.settings_paths())
+        self.shortcuts_signature = file_signature(self.viewer.shortcuts_paths())
+        if self.watcher:
+            self.watcher.watch(self.viewer.settings_paths() + self.viewer.shortcuts_paths())
+
+    def on_viewer_loaded(self, viewer):
+        # A streamed load only knows its include files once it has finished
+        if viewer is self.viewer:
+            self.watch()
+
+    def on_files_changed(self, paths):
+        settings_paths = set(self.viewer.settings_paths())
+        if any(path in settings_paths for path in paths):
+            self.build()
+        else:
+            self.viewer.live_reload()
+            # Reloading may have changed the set of included files
+            self.watch()
+
+    def on_i3_reload(self):
+        # i3 reloaded, or went away and the files on disk take over
+        if self.viewer:
+            self.viewer.live_reload()
+            self.watch()
+
+    def refresh(self):
+        """Catch up on changes the watcher may have missed while hidden."""
+        if file_signature(self.viewer.settings_paths()) != self.settings_signature:
+            self.build()
+        elif file_signature(self.viewer.shortcuts_paths()) != self.shortcuts_signature:
+            self.viewer.live_reload()
+            self.watch()
+
+    def on_map(self, event):
+        if event.widget is not self.root:
+            return
+        self.root.unbind('<Map>')
+        tracer.mark('first window map')
+        tracer.startup_finished()
+
+    def handle_command(self, command: str):
+        if command == 'quit':
+            self.root.destroy()
+        elif command == 'hide':
+            self.viewer.hide()
+        elif command == 'show' or not self.viewer.is_shown():
+            self.refresh()
+            self.viewer.show()
+        else:
+            self.viewer.hide()
+
+    def run(self) -> bool:
+        if self.server and not self.server.start():
+            return False
+        self.watcher = FileWatcher(self.root, self.on_files_changed)
+        self.launcher.attach(self.root)
+        self.root.bind('<Map>', self.on_map)
+        try:
+            self.build()
+            self.root.mainloop()
+        finally:
+            self.watcher.stop()
+            self.launcher.stop()
+            self.frecency.flush()
+            self.i3_source.stop()
+            if self.server:
+                self.server.stop()
+        return True
+
+
+def parse_args(argv: list):
+    if not argv:
+        # The usual launch from an i3 binding; argparse isn't worth importing for it
+        return SimpleNamespace(daemon=False, trace=None, trace_format=None)
+
+    import argparse
+    arg_parser = argparse.ArgumentParser(description="View i3 shortcuts")
+    arg_parser.add_argument('--daemon', action='store_true',
+                            help="keep a hidden window running and listen for show/hide/toggle")
+    arg_parser.add_argument('--trace', nargs='?', const=DEFAULT_TRACE_PATH, metavar='PATH',
+                            help=f"record startup phases and hot-path timings to PATH "
+                                 f"(default {DEFAULT_TRACE_PATH}, or set ${TRACE_ENV})")
+    arg_parser.add_argument('--trace-format', choices=FORMATS, default=None,
+                            help="json summary (default) or Chrome trace events")
+    return arg_parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args.trace:
+        tracer.start(args.trace, args.trace_format)
+    else:
+        tracer.start_from_env()
 
-def main():
     script_dir = Path(__file__).parent.resolve()
-    root = tk.Tk()
+    if script_dir.is_file():
+        # Running from the zipapp bundle; config.toml sits next to it
+        script_dir = script_dir.parent
+    # Forked while the process is still small and holds no X connection
+    launcher = Launcher()
+    with tracer.phase('start launcher'):
+        launcher.start()
+    # Started after the fork, so the helper never inherits a thread mid-read
+    pipeline = StartupPipeline(script_dir)
+    pipeline.start()
+    with tracer.phase('create window'):
+        root = tk.Tk()
     root.attributes('-type', 'dialog')
-    viewer = ShortcutsViewer(root, script_dir)
-    root.mainloop()
+
+    if args.daemon:
+        root.withdraw()
+
+    if not ViewerApp(root, script_dir, daemon=args.daemon, launcher=launcher, pipeline=pipeline).run():
+        launcher.stop()
+        root.destroy()
+        print("i3-shortcuts-viewer: daemon already running", file=sys.stderr)
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+
+import tkinter as tk
+from bisect import bisect_right
+from typing import Callable, List, Optional, Tuple
+
+from document import Document, apply_document
+
+
+class VirtualTextView:
+    """Shows a window of a Document in a Text widget.
+
+    Only the lines around the viewport, plus a margin on each side, are
+    inserted into the widget. The scrollbar is driven from document
+    coordinates, so it behaves as if the whole document were present, and
+    the window is re-rendered when the view approaches one of its edges.
+
+    Document lines are 1-based; widget line N shows document line
+    N + offset. Lines the viewer elides (filtered or folded) don't count
+    towards the window or its margins, so the window always holds enough
+    lines to show.
+    """
+
+    def __init__(self, text_widget, scrollbar, document: Document, margin: int = 200,
+                 on_render: Optional[Callable[[], None]] = None,
+                 on_scroll: Optional[Callable[[], None]] = None):
+        self.text_widget = text_widget
+        self.scrollbar = scrollbar
+        self.document = document
+        self.margin = margin
+        self.window_size = 2 * margin + 100
+        self.on_render = on_render
+        self.on_scroll = on_scroll
+
+        self.total = max(1, len(document.lines))
+        self.offset = 0
+        self.count = 0
+        self.recenter_pending = None
+        # Elided (first, last) document line ranges, sorted and disjoint
+        self.hidden: List[Tuple[int, int]] = []
+        self.hidden_starts: List[int] = []
+        self.visible_count = 0
+
+        # Put back by destroy()
+        self.yscrollcommand = self.text_widget.cget('yscrollcommand')
+        self.text_widget.configure(yscrollcommand=self.on_widget_scroll)
+        self.scrollbar.configure(command=self.on_scrollbar)
+
+    def set_hidden(self, hidden: List[Tuple[int, int]]):
+        self.hidden = hidden
+        self.hidden_starts = [first for first, _ in hidden]
+
+    def hidden_between(self, first: int, last: int) -> List[Tuple[int, int]]:
+        """Hidden ranges clipped to lines first..last."""
+        lo = max(0, bisect_right(self.hidden_starts, first) - 1)
+        hi = bisect_right(self.hidden_starts, last)
+        return [(max(a, first), min(b, last)) for a, b in self.hidden[lo:hi] if b >= first]
+
+    def step(self, line: int, lines: int) -> int:
+        """The document line lines shown lines after line (before it if negative)."""
+        if not self.hidden:
+            return max(1, min(self.total, line + lines))
+        i = bisect_right(self.hidden_starts, line) - 1
+        if lines >= 0 and (i < 0 or self.hidden[i][1] < line):
+            i += 1
+        while lines > 0 and i < len(self.hidden):
+            first, last = self.hidden[i]
+            if line + lines < first:
+                break
+            lines -= max(0, first - 1 - line)
+            line = max(line, last)
+            i += 1
+        while lines < 0 and i >= 0:
+            first, last = self.hidden[i]
+            if line + lines > last:
+                break
+            if last >= line:
+                line = first
+            else:
+                lines += line - last - 1
+                line = first
+            i -= 1
+        return max(1, min(self.total, line + lines))
+
+    def render(self, first_line: int):
+        """Fill the widget with the window starting at document line first_line."""
+        first = max(1, min(first_line, self.step(self.total, 1 - self.window_size)))
+        last = min(len(self.document.lines), self.step(first, self.window_size - 1))
+
+        state = self.text_widget.cget('state')
+        self.text_widget.config(state=tk.NORMAL)
+        self.text_widget.delete('1.0', tk.END)
+        apply_document(self.text_widget, self.document, first, last)
+
+        self.text_widget.config(state=state)
+        self.offset = first - 1
+        self.count = max(0, last - first + 1)
+        self.visible_count = self.count - sum(b - a + 1 for a, b in self.hidden_between(first, last))
+
+        if self.on_render:
+            self.on_render()
+
+    def set_document(self, document: Document, top_line: int):
+        """Switch to a new document, keeping document line top_line at the top."""
+        self.document = document
+        self.total = max(1, len(document.lines))
+        self.render(self.step(top_line, -self.margin))
+        self.text_widget.yview(f"{top_line - self.offset}.0")
+
+    def document_extended(self):
+        """Pick up lines appended to the document while it is streaming in."""
+        self.total = max(1, len(self.document.lines))
+        end = min(len(self.document.lines), self.offset + self.window_size)
+        if self.offset + self.count < end:
+            # The window isn't full yet, so the new lines go straight in
+            state = self.text_widget.cget('state')
+            self.text_widget.config(state=tk.NORMAL)
+            apply_document(self.text_widget, self.document, self.offset + self.count + 1, end,
+                           target=self.count + 1)
+            self.text_widget.config(state=state)
+            self.count = end - self.offset
+            self.visible_count = self.count - sum(b - a + 1 for a, b in
+                                                  self.hidden_between(self.offset + 1, end))
+        self.on_widget_scroll(*self.text_widget.yview())
+
+    def contains(self, line: int) -> bool:
+        return self.offset < line <= self.offset + self.count
+
+    def widget_index(self, line: int, col) -> Optional[str]:
+        """Widget index for a document position, or None when not rendered."""
+        if not self.contains(line):
+            return None
+        return f"{line - self.offset}.{col}"
+
+    def document_line(self, widget_line: int) -> int:
+        return widget_line + self.offset
+
+    def yview(self) -> Tuple[float, float]:
+        lo, hi = self.text_widget.yview()
+        top = self.offset + lo * self.count
+        bottom = self.offset + hi * self.count
+        return top / self.total, min(1.0, bottom / self.total)
+
+    def yview_moveto(self, fraction: float):
+        fraction = max(0.0, min(1.0, fraction))
+        target = fraction * self.total
+        lo, hi = self.text_widget.yview()
+        visible = max(1.0, (hi - lo) * self.count)
+
+        if self.count == 0 or target < self.offset or target + visible > self.offset + self.count:
+            self.render(int(target) - self.margin + 1)
+
+        self.text_widget.yview_moveto((target - self.offset) / max(1, self.count))
+
+    def see(self, line: int, col=0):
+        if not self.contains(line):
+            self.render(self.step(line, -self.margin))
+        self.text_widget.see(f"{line - self.offset}.{col}")
+
+    def on_scrollbar(self, *args):
+        if args[0] == 'moveto':
+            self.yview_moveto(float(args[1]))
+        elif args[0] == 'scroll':
+            self.text_widget.yview_scroll(int(args[1]), args[2])
+
+    def on_widget_scroll(self, lo, hi):
+        top = self.offset + float(lo) * self.count
+        bottom = self.offset + float(hi) * self.count
+        self.scrollbar.set(top / self.total, min(1.0, bottom / self.total))
+
+        # Tk's fractions only count the lines that are shown
+        shown = self.visible_count
+        near_top = self.offset > 0 and float(lo) * shown < self.margin / 2
+        near_bottom = (self.offset + self.count < len(self.document.lines)
+                       and (1 - float(hi)) * shown < self.margin / 2)
+        if (near_top or near_bottom) and self.recenter_pending is None:
+            # Re-rendering from inside the scroll callback would re-enter it
+            self.recenter_pending = self.text_widget.after_idle(self.recenter)
+        if self.on_scroll:
+            self.on_scroll()
+
+    def recenter(self):
+        self.recenter_pending = None
+        index = self.text_widget.index('@0,0')
+        top_line = self.document_line(int(index.split('.')[0]))
+        # Where the top line starts, so a pixel scroll in progress doesn't snap
+        before = self.text_widget.dlineinfo(f"{index} linestart")
+        first = self.step(top_line, -self.margin)
+        if first == self.offset + 1 and self.step(first, self.window_size - 1) == self.offset + self.count:
+            # Already the best window there is, e.g. near a hidden stretch at an edge
+            return
+        self.render(first)
+        self.text_widget.yview(f"{top_line - self.offset}.0")
+        if before is not None:
+            after = self.text_widget.dlineinfo(f"{top_line - self.offset}.0")
+            if after is not None and after[1] != before[1]:
+                self.text_widget.yview_scroll(after[1] - before[1], 'pixels')
+
+    def destroy(self):
+        if self.recenter_pending is not None:
+            self.text_widget.after_cancel(self.recenter_pending)
+            self.recenter_pending = None
+        self.text_widget.configure(yscrollcommand=self.yscrollcommand or self.scrollbar.set)
+        self.scrollbar.configure(command=self.text_widget.yview)
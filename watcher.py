@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+
+import ctypes
+import os
+import struct
+from pathlib import Path
+from typing import Callable, Iterable, List, Tuple
+
+IN_MODIFY = 0x002
+IN_ATTRIB = 0x004
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+# Watching directories rather than files survives editors that save by rename
+DIRECTORY_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def file_signature(paths: Iterable[Path]) -> Tuple:
+    """Cheap change detector: (mtime, size) of each path, None when missing."""
+    signature = []
+    for path in paths:
+        try:
+            st = path.stat()
+            signature.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+class Inotify:
+    """Minimal inotify binding over ctypes. Raises OSError when unavailable."""
+
+    def __init__(self):
+        # libc is already loaded; ctypes.util.find_library would run ldconfig to find it
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        if not hasattr(self.libc, 'inotify_init1'):
+            self.libc = ctypes.CDLL('libc.so.6', use_errno=True)
+        if not hasattr(self.libc, 'inotify_init1'):
+            raise OSError("inotify is not available")
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def add_watch(self, path: Path, mask: int) -> int:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(str(path)), ctypes.c_uint32(mask))
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        return wd
+
+    def rm_watch(self, wd: int):
+        self.libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self) -> List[Tuple[int, int, str]]:
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FileWatcher:
+    """Calls back with the paths whose contents changed.
+
+    Uses inotify on the parent directories when possible and falls back to
+    polling (mtime, size) for anything inotify can't watch. A watched
+    directory is reported when an entry is created, removed or renamed in
+    it, e.g. a new file matching a glob include. Bursts of events from a
+    single save are coalesced with a short debounce.
+    """
+
+    def __init__(self, root, callback: Callable[[List[Path]], None],
+                 poll_ms: int = 1000, debounce_ms: int = 150):
+        self.root = root
+        self.callback = callback
+        self.poll_ms = poll_ms
+        self.debounce_ms = debounce_ms
+
+        self.signatures = {}
+        self.polled = set()
+        # Watched paths that are directories, whose own listing is watched too
+        self.listings = set()
+        self.dir_watches = {}  # directory -> watch descriptor
+        self.watch_dirs = {}  # watch descriptor -> directory
+        self.dirty = set()
+        self.debounce_id = None
+        self.poll_id = None
+
+        self.inotify = None
+        try:
+            self.inotify = Inotify()
+        except (OSError, AttributeError):
+            self.inotify = None
+        else:
+            import tkinter
+            self.root.tk.createfilehandler(self.inotify.fileno(), tkinter.READABLE, self.on_readable)
+
+    def watch(self, paths: Iterable[Path]):
+        """Replace the set of watched files."""
+        paths = [Path(path) for path in paths]
+        self.signatures = dict(zip(paths, file_signature(paths)))
+        self.polled = set()
+        self.listings = {path for path in paths if path.is_dir()}
+
+        wanted_dirs = {path.parent for path in paths} | self.listings
+        if self.inotify is not None:
+            for directory in list(self.dir_watches):
+                if directory not in wanted_dirs:
+                    wd = self.dir_watches.pop(directory)
+                    self.watch_dirs.pop(wd, None)
+                    self.inotify.rm_watch(wd)
+            for directory in wanted_dirs - set(self.dir_watches):
+                try:
+                    wd = self.inotify.add_watch(directory, DIRECTORY_MASK)
+                except OSError:
+                    continue
+                self.dir_watches[directory] = wd
+                self.watch_dirs[wd] = directory
+
+        for path in paths:
+            if path.parent not in self.dir_watches:
+                self.polled.add(path)
+            elif path in self.listings and path not in self.dir_watches:
+                self.polled.add(path)
+
+        if self.polled and self.poll_id is None:
+            self.poll_id = self.root.after(self.poll_ms, self.poll)
+
+    def on_readable(self, file, mask):
+        for wd, _, name in self.inotify.read_events():
+            directory = self.watch_dirs.get(wd)
+            if directory is None:
+                continue
+            path = directory / name
+            if path in self.signatures:
+                self.dirty.add(path)
+            if directory in self.listings:
+                self.dirty.add(directory)
+
+        if self.dirty and self.debounce_id is None:
+            self.debounce_id = self.root.after(self.debounce_ms, self.flush)
+
+    def flush(self):
+        self.debounce_id = None
+        candidates, self.dirty = self.dirty, set()
+        self.check(candidates)
+
+    def poll(self):
+        self.poll_id = None
+        self.check(self.polled)
+        if self.polled:
+            self.poll_id = self.root.after(self.poll_ms, self.poll)
+
+    def check(self, candidates: Iterable[Path]):
+        changed = []
+        for path in candidates:
+            if path not in self.signatures:
+                continue
+            signature = file_signature([path])[0]
+            if signature != self.signatures[path]:
+                self.signatures[path] = signature
+                changed.append(path)
+        if changed:
+            self.callback(changed)
+
+    def stop(self):
+        for after_id in (self.debounce_id, self.poll_id):
+            if after_id is not None:
+                self.root.after_cancel(after_id)
+        self.debounce_id = self.poll_id = None
+        if self.inotify is not None:
+            try:
+                self.root.tk.deletefilehandler(self.inotify.fileno())
+            except Exception:
+                pass
+            self.inotify.close()
+            self.inotify = None
+        self.polled = set()